@@ -0,0 +1,230 @@
+# accounts/avatars.py
+"""
+Ảnh đại diện lưu trong file storage thay vì base64 trong dòng User.
+
+- File gốc được đặt tên theo nội dung (sha256): avatars/<2 ký tự đầu>/<sha256>.<ext>,
+  ảnh trùng nhau chỉ lưu một lần và URL có thể cache vĩnh viễn.
+- Thumbnail WEBP vuông cho mỗi cỡ THUMBNAIL_SIZES: avatars/../<sha256>_<cỡ>.webp.
+- User.avatar_file chỉ giữ tên file; API chỉ trả URL (AvatarField, AvatarThumbnailsField).
+- AvatarField chỉ kiểm tra ảnh lúc validation và trả về PendingAvatar (tên file + bytes);
+  thumbnail được dựng và file được ghi trong User.save(), cùng transaction với dòng
+  User. Validation lỗi ở field khác thì chưa có file nào được ghi; ghi file lỗi thì
+  dòng User rollback và file vừa tạo bị xoá.
+- Cột cũ User.avatar (base64 inline) được chuyển dần bằng lệnh migrate_avatars.
+
+process() là hàm thuần (bytes vào, bytes ra, không dùng Django) để chạy được trong
+worker pool của lệnh migrate_avatars.
+"""
+import base64
+import binascii
+import hashlib
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+AVATAR_DIR = "avatars"
+THUMBNAIL_SIZES = (64, 128, 256)
+MAX_BYTES = 5 * 1024 * 1024
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+INVALID_MESSAGE = "Ảnh đại diện không hợp lệ (chấp nhận JPEG, PNG, WEBP, GIF, tối đa 5MB)."
+_DATA_URI = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+def decode_inline(text):
+    """Bytes của ảnh base64 inline (có hoặc không có tiền tố data URI); None nếu không phải base64."""
+    text = _DATA_URI.sub("", (text or "").strip(), count=1)
+    if not text or text.startswith(("http://", "https://", "/")):
+        return None
+    try:
+        return base64.b64decode(re.sub(r"\s+", "", text), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+_IMAGE_ERRORS = (UnidentifiedImageError, OSError, Image.DecompressionBombError, SyntaxError)
+
+
+def inspect(data):
+    """Kiểm tra ảnh (kích thước, định dạng) mà không giải mã điểm ảnh. Trả về (sha256, ext)."""
+    if not data or len(data) > MAX_BYTES:
+        raise InvalidAvatar(INVALID_MESSAGE)
+    try:
+        with Image.open(BytesIO(data)) as probe:
+            ext = EXTENSIONS.get(probe.format)
+            probe.verify()
+    except _IMAGE_ERRORS:
+        raise InvalidAvatar(INVALID_MESSAGE)
+    if ext is None:
+        raise InvalidAvatar(INVALID_MESSAGE)
+    return hashlib.sha256(data).hexdigest(), ext
+
+
+def thumbnails(data):
+    """{cỡ: bytes WEBP} cho mỗi cỡ THUMBNAIL_SIZES của ảnh đã qua inspect()."""
+    try:
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        result = {}
+        for size in THUMBNAIL_SIZES:
+            buffer = BytesIO()
+            ImageOps.fit(image, (size, size), Image.LANCZOS).save(buffer, "WEBP", quality=85)
+            result[size] = buffer.getvalue()
+    except _IMAGE_ERRORS:
+        raise InvalidAvatar(INVALID_MESSAGE)
+    return result
+
+
+def process(data):
+    """Kiểm tra ảnh và dựng thumbnail. Trả về (sha256, ext, {cỡ: bytes WEBP})."""
+    return (*inspect(data), thumbnails(data))
+
+
+def file_name(digest, ext):
+    return f"{AVATAR_DIR}/{digest[:2]}/{digest}.{ext}"
+
+
+def thumbnail_name(name, size):
+    return f"{name.rsplit('.', 1)[0]}_{size}.webp"
+
+
+def _write(name, content, created=None):
+    # Tên theo nội dung: đã có file thì nội dung giống hệt, không ghi lại
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(content))
+        if created is not None:
+            created.append(name)
+
+
+def write(data, digest, ext, thumbnails, created=None):
+    """
+    Ghi file gốc + thumbnail (kết quả của process()) vào storage, trả về tên file gốc.
+    `created`: list nhận tên các file thực sự được tạo mới (để dọn khi lỗi).
+    """
+    name = file_name(digest, ext)
+    for size, content in thumbnails.items():
+        _write(thumbnail_name(name, size), content, created)
+    _write(name, data, created)
+    return name
+
+
+def store(data):
+    """process() + write() ngay lập tức (lệnh quản trị, test)."""
+    return write(data, *process(data))
+
+
+class PendingAvatar(str):
+    """Tên file (theo nội dung) của ảnh đã kiểm tra nhưng CHƯA ghi vào storage."""
+
+    def __new__(cls, data, digest, ext):
+        value = super().__new__(cls, file_name(digest, ext))
+        value.data, value.digest, value.ext = data, digest, ext
+        return value
+
+
+def pending(field_file):
+    """PendingAvatar đang gán vào FileField `field_file` (vd. user.avatar_file), hoặc None."""
+    name = getattr(field_file, "name", None)
+    return name if isinstance(name, PendingAvatar) else None
+
+
+def save_with_pending(field_file, save):
+    """
+    Gọi `save()` (ghi dòng DB) rồi ghi file của PendingAvatar đang gán vào `field_file`,
+    trong cùng một transaction. Ghi file lỗi hoặc transaction lỗi: xoá các file vừa tạo
+    (file đã có từ trước, dùng chung theo nội dung, được giữ nguyên).
+    """
+    avatar = pending(field_file)
+    if avatar is None:
+        return save()
+    created = []
+    try:
+        with transaction.atomic():
+            result = save()
+            write(avatar.data, avatar.digest, avatar.ext, thumbnails(avatar.data), created)
+    except Exception:
+        for name in created:
+            default_storage.delete(name)
+        raise
+    # Đã ghi: lần save() sau không ghi lại
+    field_file.name = str(avatar)
+    return result
+
+
+def _absolute(url, context):
+    request = context.get("request")
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class AvatarField(serializers.Field):
+    """
+    Ghi: file upload hoặc chuỗi base64 (data URI) -> PendingAvatar (tên file), file được
+    ghi khi User.save(). Đọc: URL ảnh gốc. Dùng với source='avatar_file'.
+    User chưa có avatar_file trả về giá trị cũ của User.avatar như trước đây (URL ngoài
+    mà migrate_avatars giữ nguyên, hoặc base64 chưa được chuyển).
+    """
+    default_error_messages = {"invalid": INVALID_MESSAGE}
+    # Cột phải đọc thêm khi bookingcare.fieldsets thu hẹp queryset bằng only()
+    extra_sources = ("avatar",)
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "avatar_file")
+        kwargs.setdefault("required", False)
+        kwargs.setdefault("allow_null", True)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if hasattr(data, "read"):
+            content = data.read(MAX_BYTES + 1)
+        elif isinstance(data, str):
+            content = decode_inline(data)
+        else:
+            content = None
+        try:
+            return PendingAvatar(content, *inspect(content))
+        except InvalidAvatar:
+            self.fail("invalid")
+
+    def get_attribute(self, instance):
+        value = super().get_attribute(instance)
+        if not value:
+            legacy = getattr(instance, "avatar", None)
+            return _Legacy(legacy) if legacy else None
+        return value
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if isinstance(value, _Legacy):
+            return str(value)
+        return _absolute(default_storage.url(value.name if hasattr(value, "name") else value), self.context)
+
+
+class _Legacy(str):
+    """Giá trị cột cũ User.avatar, trả về nguyên văn."""
+
+
+class AvatarThumbnailsField(serializers.Field):
+    """Đọc: {cỡ: URL thumbnail}; None nếu chưa có ảnh."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "avatar_file")
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        name = value.name if hasattr(value, "name") else value
+        if not name:
+            return None
+        return {
+            str(size): _absolute(default_storage.url(thumbnail_name(name, size)), self.context)
+            for size in THUMBNAIL_SIZES
+        }
@@ -0,0 +1,91 @@
+# accounts/management/commands/migrate_avatars.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.core.management.base import BaseCommand
+
+from accounts import avatars
+from doctor import catalog
+
+User = get_user_model()
+
+
+def _process(data):
+    # Chạy trong worker: lỗi của một ảnh không làm hỏng cả lô
+    try:
+        return avatars.process(data)
+    except avatars.InvalidAvatar:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Chuyển ảnh đại diện base64 inline (User.avatar) sang file storage theo lô: "
+        "giải mã, dựng thumbnail trong worker pool, ghi file theo nội dung và xoá base64 khỏi dòng User."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Số tiến trình dựng thumbnail; 0 = chạy trong tiến trình hiện tại.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ đếm số user cần chuyển.")
+
+    def handle(self, *args, **options):
+        # Chỉ user chưa có avatar_file: ảnh đã upload theo cách mới không bị base64 cũ ghi đè
+        pending = (
+            User.objects.filter(avatar__isnull=False).exclude(avatar='')
+            .filter(Q(avatar_file='') | Q(avatar_file__isnull=True))
+        )
+        if options['dry_run']:
+            self.stdout.write(f"Có {pending.count()} user còn avatar inline.")
+            return
+
+        executor = ProcessPoolExecutor(options['workers']) if options['workers'] > 0 else None
+        mapper = executor.map if executor is not None else map
+        migrated = skipped = failed = 0
+        last_pk = 0
+        started = time.monotonic()
+        try:
+            while True:
+                rows = list(
+                    pending.filter(pk__gt=last_pk).order_by('pk')
+                    .values_list('pk', 'avatar')[:options['batch_size']]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+
+                decoded = [(pk, avatars.decode_inline(text)) for pk, text in rows]
+                # URL ngoài (không phải base64) được giữ nguyên
+                skipped += sum(data is None for _, data in decoded)
+                decoded = [(pk, data) for pk, data in decoded if data is not None]
+
+                updates = []
+                for (pk, data), result in zip(decoded, mapper(_process, [data for _, data in decoded])):
+                    if result is None:
+                        failed += 1
+                        continue
+                    updates.append(User(pk=pk, avatar_file=avatars.write(data, *result), avatar=None))
+                User.objects.bulk_update(updates, ['avatar_file', 'avatar'])
+                migrated += len(updates)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"Đã chuyển {migrated} avatar (bỏ qua {skipped}, lỗi {failed}), "
+                    f"{migrated / elapsed if elapsed else 0:.0f} ảnh/s."
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if migrated:
+            # bulk_update không phát signal: làm mới cache danh mục bác sĩ một lần
+            catalog.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Hoàn tất: chuyển {migrated}, bỏ qua {skipped} (URL), lỗi {failed} (giữ nguyên base64)."
+        ))
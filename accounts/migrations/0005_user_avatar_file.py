@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_user_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_file',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to='avatars/'),
+        ),
+    ]
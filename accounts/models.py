@@ -1,16 +1,25 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from . import avatars
+
 class User(AbstractUser):
     birthday = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=10, choices=[("male","Male"),("female","Female")])
     address = models.CharField(max_length=255, blank=True, null=True)
     phone = models.CharField(max_length=15, unique=True, null=True, blank=True)
+    # Cũ: base64 inline, được chuyển sang avatar_file bằng lệnh migrate_avatars
     avatar = models.TextField(null=True, blank=True)
+    # Tên file ảnh đại diện trong storage, xem accounts/avatars.py
+    avatar_file = models.FileField(upload_to="avatars/", max_length=255, null=True, blank=True)
     role = models.ForeignKey("Role", on_delete=models.SET_NULL, null=True, blank=True)
     recovery_token = models.CharField(max_length=255, null=True, blank=True)
     cccd = models.CharField(max_length=20, blank=True, null=True)
     ethinic_group = models.CharField(max_length=50, blank=True, null=True)
+
+    def save(self, *args, **kwargs):
+        """Lưu; ảnh đại diện mới (AvatarField) được ghi vào storage cùng transaction."""
+        return avatars.save_with_pending(self.avatar_file, lambda: super(User, self).save(*args, **kwargs))
     
     def __str__(self):
         return f"{self.username} ({self.role})"
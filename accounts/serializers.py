@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from django.db import transaction  # <<< Import Transaction
 
 from accounts.models import Role
+from accounts.avatars import AvatarField, AvatarThumbnailsField
 from patients.models import Patient  # <<< Import Patient
 from doctor.models import Doctor     # <<< Import Doctor
 
@@ -25,10 +26,11 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         write_only=True, 
         required=True, 
         validators=[validate_password]
-        validators=[validate_password]
     )
     password_confirm = serializers.CharField(write_only=True, required=True)
     role = serializers.PrimaryKeyRelatedField(queryset=Role.objects.all())
+    # Nhận file upload hoặc base64, lưu vào storage (accounts/avatars.py)
+    avatar = AvatarField()
 
     class Meta:
         model = User
@@ -164,4 +166,20 @@ class PasswordResetSerializer(serializers.Serializer):
         user.set_password(new_password)
         user.recovery_token = None # Xóa token sau khi đã dùng
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+class AvatarSerializer(serializers.ModelSerializer):
+    """Upload / đổi ảnh đại diện của user đang đăng nhập (file hoặc base64)."""
+    avatar = AvatarField(required=True, allow_null=False)
+    avatar_thumbnails = AvatarThumbnailsField()
+
+    class Meta:
+        model = User
+        fields = ['avatar', 'avatar_thumbnails']
+
+    def update(self, instance, validated_data):
+        instance.avatar_file = validated_data['avatar_file']
+        # Bỏ base64 inline cũ (nếu còn) khỏi dòng User
+        instance.avatar = None
+        instance.save(update_fields=['avatar_file', 'avatar'])
+        return instance
@@ -6,4 +6,5 @@ urlpatterns = [
     path("login/", views.loginView, name="login"),
     path("logout/", views.logoutView, name="logout"),
     path("refresh/", views.RefreshTokenView.as_view(), name="refresh_token"),
+    path("avatar/", views.AvatarView.as_view(), name="avatar"),
 ]
@@ -1,6 +1,6 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -9,7 +9,7 @@ from django.contrib.auth import get_user_model
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
-from .serializers import UserRegisterSerializer, UserLoginSerializer, PasswordResetSerializer, RoleSerializer
+from .serializers import AvatarSerializer, UserRegisterSerializer, UserLoginSerializer, PasswordResetSerializer, RoleSerializer
 
 User = get_user_model()
 
@@ -170,3 +170,26 @@ def logoutView(request):
             'error': 'LOGOUT_ERROR',
             'detail': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+class AvatarView(APIView):
+    """
+    Ảnh đại diện của user đang đăng nhập.
+    PUT: multipart (field 'avatar') hoặc JSON base64 -> lưu file + thumbnail, trả về URL.
+    DELETE: gỡ ảnh đại diện (file dùng chung theo nội dung nên không bị xoá).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request):
+        serializer = AvatarSerializer(request.user, data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        user = request.user
+        user.avatar_file = None
+        user.avatar = None
+        user.save(update_fields=['avatar_file', 'avatar'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,96 @@
+# appointments/booking.py
+"""
+Ghi lịch hẹn (đặt mới / đổi lịch) an toàn khi có nhiều request đồng thời.
+
+- Sức chứa trong ngày dùng cột Schedule.booked_count: reserve() chạy một câu
+  UPDATE có điều kiện (booked_count + cần thêm <= max_patients). DB khoá dòng
+  Schedule tới hết transaction, nên giữa kiểm tra và lúc Appointment.save()
+  cộng booked_count không có request nào khác chen vào.
+- Trùng slot do constraint `unique_doctor_date_time_when_active` đảm nhận:
+  IntegrityError được chuyển thành lỗi 400 "slot đã có người đặt" thay vì 500.
+- Đổi sang ngày / bác sĩ khác: Schedule cũ (bị trừ booked_count khi lưu) và
+  Schedule mới được khoá trước, theo thứ tự (doctor_id, date).
+- Slot đang được người khác giữ chỗ (SlotHold) bị từ chối; hold của chính
+  bệnh nhân được dùng (xoá) khi đặt.
+- Ngày chỉ có lịch lặp (ScheduleRule) chưa có dòng Schedule: lần đặt đầu tiên
+  tạo Schedule từ rule (Schedule.objects.materialize) rồi khoá như bình thường.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from . import holds
+from .models import ACTIVE_STATUSES
+from availability.models import Schedule
+
+SLOT_TAKEN_MESSAGE = "Khung giờ này đã có người đặt. Vui lòng chọn giờ khác."
+
+
+def booking_error(message, code="invalid"):
+    return serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code=code)
+
+
+def reserve(doctor_id, date, time, needed=1):
+    """
+    Khoá Schedule của (bác sĩ, ngày) và kiểm tra giờ hẹn nằm trong giờ làm việc,
+    còn đủ `needed` chỗ. Phải gọi bên trong transaction.atomic().
+    Raise ValidationError nếu không thoả.
+    """
+    capacity = Q(max_patients__isnull=True) | Q(booked_count__lte=F('max_patients') - needed)
+    lockable = Schedule.objects.filter(
+        capacity,
+        doctor_id=doctor_id, date=date, is_available=True,
+        start_time__lte=time, end_time__gte=time,
+    )
+    if lockable.update(booked_count=F('booked_count')):
+        return
+
+    # Nhánh lỗi: đọc lại để trả về thông báo chính xác
+    current = Schedule.objects.filter(doctor_id=doctor_id, date=date).first()
+    if current is None and Schedule.objects.materialize(doctor_id, date):
+        # Lần đặt đầu tiên của một ngày sinh từ lịch lặp
+        if lockable.update(booked_count=F('booked_count')):
+            return
+        current = Schedule.objects.filter(doctor_id=doctor_id, date=date).first()
+    if current is None or not current.is_available:
+        raise booking_error(f"Bác sĩ không có lịch làm việc vào ngày {date}.")
+    if not (current.start_time <= time <= current.end_time):
+        raise booking_error(
+            f"Giờ hẹn phải nằm trong khoảng làm việc của bác sĩ ({current.start_time} - {current.end_time})."
+        )
+    raise booking_error("Bác sĩ đã đạt số lượng bệnh nhân tối đa trong ngày này.")
+
+
+def book(serializer, **save_kwargs):
+    """
+    Lưu `serializer` (AppointmentSerializer đã is_valid) trong một transaction.
+    Trả về instance đã lưu hoặc raise ValidationError.
+    """
+    instance = serializer.instance
+    data = serializer.validated_data
+    doctor = data.get('doctor') or instance.doctor
+    date = data.get('date') or instance.date
+    time = data.get('time') or instance.time
+
+    # Đổi giờ trong cùng ngày không làm thay đổi số lượng đã đặt
+    same_day = (
+        instance is not None and instance.status in ACTIVE_STATUSES
+        and instance.doctor_id == doctor.id and instance.date == date
+    )
+
+    patient = save_kwargs.get('patient') or instance.patient
+
+    with transaction.atomic():
+        if instance is not None and instance.status in ACTIVE_STATUSES and not same_day:
+            Schedule.objects.lock([(instance.doctor_id, instance.date), (doctor.id, date)])
+        reserve(doctor.id, date, time, needed=0 if same_day else 1)
+        try:
+            holds.consume(patient, doctor.id, date, time)
+        except holds.SlotHeld as exc:
+            raise booking_error(str(exc), code="unique")
+        try:
+            with transaction.atomic():
+                return serializer.save(**save_kwargs)
+        except IntegrityError:
+            raise booking_error(SLOT_TAKEN_MESSAGE, code="unique")
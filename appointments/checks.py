@@ -0,0 +1,28 @@
+# appointments/checks.py
+"""
+Kiểm tra cấu hình khi triển khai (python manage.py check --deploy).
+
+slot_cache và catalog (danh mục bác sĩ) làm mất hiệu lực kết quả bằng cách tăng
+version trong cache. Với LocMemCache mỗi tiến trình có bộ nhớ riêng: version tăng
+ở worker này không được worker khác thấy và chúng tiếp tục trả kết quả cũ tới hết
+TTL. Chạy nhiều tiến trình (gunicorn --workers > 1, worker outbox) cần cache dùng
+chung như Redis (CACHE_URL=redis://...).
+"""
+from django.conf import settings
+from django.core import checks
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] != LOCMEM_BACKEND:
+        return []
+    return [
+        checks.Error(
+            "CACHES['default'] là LocMemCache (riêng từng tiến trình): version của "
+            "slot_cache / danh mục bác sĩ không được chia sẻ giữa các worker.",
+            hint="Đặt CACHE_URL=redis://<host>:6379/1, hoặc chỉ chạy một tiến trình.",
+            id='appointments.E001',
+        )
+    ]
@@ -0,0 +1,103 @@
+# appointments/holds.py
+"""
+Giữ chỗ tạm thời (slot hold) trước khi đặt lịch.
+
+Bệnh nhân giữ một slot trong HOLD_TTL sau khi xem available-slots; trong thời
+gian đó slot bị ẩn khỏi available-slots và người khác không đặt được.
+POST /api/appointments/ của chính người giữ sẽ dùng (xoá) hold.
+Mỗi bệnh nhân chỉ giữ một slot tại một thời điểm.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import slot_cache
+from .models import SlotHold
+from .occupancy import minute_of
+
+HOLD_TTL = timedelta(minutes=5)
+SLOT_HELD_MESSAGE = "Khung giờ này đang được người khác giữ chỗ. Vui lòng chọn giờ khác."
+
+
+class SlotHeld(Exception):
+    pass
+
+
+def place(patient, doctor_id, date, time):
+    """Tạo hold mới cho `patient`, thay thế hold cũ của họ. Raise SlotHeld nếu slot đang bị giữ."""
+    now = timezone.now()
+    with transaction.atomic():
+        previous = list(SlotHold.objects.filter(patient=patient).values_list('doctor_id', 'date'))
+        SlotHold.objects.filter(patient=patient).delete()
+        # Hold đã hết hạn của slot này không được chặn hold mới
+        SlotHold.objects.filter(doctor_id=doctor_id, date=date, time=time, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                hold = SlotHold.objects.create(
+                    patient=patient, doctor_id=doctor_id, date=date, time=time,
+                    expires_at=now + HOLD_TTL,
+                )
+        except IntegrityError:
+            raise SlotHeld(SLOT_HELD_MESSAGE)
+
+    for held_doctor_id, held_date in previous:
+        slot_cache.invalidate(held_doctor_id, held_date, holds_only=True)
+    slot_cache.invalidate(doctor_id, date, holds_only=True)
+    return hold
+
+
+def release(hold):
+    hold.delete()
+    slot_cache.invalidate(hold.doctor_id, hold.date, holds_only=True)
+
+
+def consume(patient, doctor_id, date, time):
+    """
+    Gọi khi ghi lịch hẹn vào (bác sĩ, ngày, giờ): raise SlotHeld nếu slot đang
+    bị người khác giữ, xoá hold của chính `patient` nếu có.
+    """
+    hold = (
+        SlotHold.objects
+        .filter(doctor_id=doctor_id, date=date, time=time)
+        .values_list('id', 'patient_id', 'expires_at')
+        .first()
+    )
+    if hold is None:
+        return
+    hold_id, holder_id, expires_at = hold
+    if holder_id != patient.id and expires_at > timezone.now():
+        raise SlotHeld(SLOT_HELD_MESSAGE)
+    SlotHold.objects.filter(id=hold_id).delete()
+
+
+def active_holds(doctor_id, date):
+    """((minute, expires_at), ...) của các hold còn hạn trong ngày."""
+    return tuple(
+        (minute_of(time), expires_at)
+        for time, expires_at in SlotHold.objects
+        .filter(doctor_id=doctor_id, date=date, expires_at__gt=timezone.now())
+        .values_list('time', 'expires_at')
+    )
+
+
+def held_minutes_range(doctor_ids, date_from, date_to):
+    """{(doctor_id, date): {minute, ...}} của các hold còn hạn, một truy vấn."""
+    result = {}
+    rows = SlotHold.objects.filter(
+        doctor_id__in=doctor_ids, date__range=(date_from, date_to), expires_at__gt=timezone.now()
+    ).values_list('doctor_id', 'date', 'time')
+    for doctor_id, date, time in rows:
+        result.setdefault((doctor_id, date), set()).add(minute_of(time))
+    return result
+
+
+def sweep_expired(batch_size=1000):
+    """Xoá các hold đã hết hạn theo từng lô, trả về số dòng đã xoá."""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(SlotHold.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += SlotHold.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,123 @@
+# appointments/idempotency.py
+"""
+Idempotency-Key cho các request ghi lịch hẹn (tạo, hủy, xác nhận, hoàn thành, đổi lịch).
+
+Client (app mobile) gửi header `Idempotency-Key: <uuid>` và dùng lại đúng key
+đó khi retry. Request đầu tiên chiếm key, chạy view và lưu phản hồi 2xx; các
+lần gửi lại được phát lại phản hồi đã lưu mà không chạy lại validation, không
+ghi Appointment, không gửi lại thông báo.
+
+- Dấu vân tay (fingerprint) gồm method, path và sha256 của body (dạng JSON chuẩn
+  hoá): dùng lại key với body khác trả về 422.
+- View chạy và key được chốt (lưu phản hồi / xoá) trong CÙNG một transaction: tiến
+  trình chết giữa chừng thì mọi thay đổi của view cùng rollback, key chỉ còn ở
+  trạng thái "đang xử lý". Key đang xử lý quá IN_PROGRESS_TIMEOUT (dài hơn timeout
+  của worker) được coi là bỏ dở và có thể chiếm lại.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+KEY_TTL = timedelta(hours=24)
+IN_PROGRESS_TIMEOUT = timedelta(minutes=5)
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.sha256(body.encode()).hexdigest()
+    return f"{f'{request.method} {request.path}'[:190]} {digest}"
+
+
+def _claim(user, key, fingerprint):
+    """Chiếm key; trả về (bản ghi đã chiếm, None) hoặc (None, bản ghi đang có)."""
+    now = timezone.now()
+    IdempotencyKey.objects.filter(
+        Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lte=now - IN_PROGRESS_TIMEOUT),
+        user=user, key=key,
+    ).delete()
+    try:
+        with transaction.atomic():
+            claimed = IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=fingerprint, expires_at=now + KEY_TTL
+            )
+        return claimed, None
+    except IntegrityError:
+        return None, IdempotencyKey.objects.filter(user=user, key=key).first()
+
+
+def idempotent(view_method):
+    """Decorator cho handler của ViewSet; không có header thì chạy bình thường."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"Idempotency-Key tối đa {MAX_KEY_LENGTH} ký tự."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = _fingerprint(request)
+        claimed, existing = _claim(request.user, key, fingerprint)
+        if claimed is None:
+            if existing is None:
+                # Bản ghi vừa bị xoá (hết hạn / lỗi) giữa lúc chiếm và lúc đọc
+                return Response(
+                    {"detail": "Request với Idempotency-Key này đang được xử lý."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if existing.fingerprint != fingerprint:
+                return Response(
+                    {"detail": "Idempotency-Key đã được dùng cho một request khác."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if existing.status_code is None:
+                return Response(
+                    {"detail": "Request với Idempotency-Key này đang được xử lý."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            response = Response(existing.response_body, status=existing.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        claimed = IdempotencyKey.objects.filter(pk=claimed.pk)
+        try:
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    claimed.update(status_code=response.status_code, response_body=response.data)
+                else:
+                    claimed.delete()
+        except Exception:
+            # Lỗi không được lưu lại, client có thể retry với cùng key
+            claimed.delete()
+            raise
+        return response
+
+    return wrapper
+
+
+def sweep_expired(batch_size=1000):
+    """Xoá các key đã hết hạn theo từng lô, trả về số dòng đã xoá."""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,28 @@
+# appointments/management/commands/refresh_next_available.py
+from django.core.management.base import BaseCommand
+
+from appointments import next_available
+from doctor.models import Doctor
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại Doctor.next_available_at cho các bác sĩ có giá trị đã qua hoặc chưa có. "
+        "Chạy định kỳ (vd. mỗi 5 phút); --all sau khi triển khai hoặc import dữ liệu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Tính lại cho mọi bác sĩ.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['all']:
+            ids = list(Doctor.objects.order_by('id').values_list('id', flat=True))
+            updated = sum(
+                next_available.refresh(ids[start:start + batch_size])
+                for start in range(0, len(ids), batch_size)
+            )
+        else:
+            updated = next_available.refresh_stale(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Đã cập nhật next_available_at cho {updated} bác sĩ."))
@@ -0,0 +1,15 @@
+# appointments/management/commands/sweep_idempotency_keys.py
+from django.core.management.base import BaseCommand
+
+from appointments import idempotency
+
+
+class Command(BaseCommand):
+    help = "Xoá các Idempotency-Key đã hết hạn theo từng lô."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = idempotency.sweep_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã xoá {deleted} Idempotency-Key hết hạn."))
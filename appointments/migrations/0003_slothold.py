@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_appointment_doctor__e7d63f_idx_and_more'),
+        ('doctor', '0004_delete_schedule'),
+        ('patients', '0004_remove_patient_address_remove_patient_birthday_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='doctor.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='patients.patient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='appointment_expires_950d15_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'date', 'time'), name='unique_slot_hold')],
+            },
+        ),
+    ]
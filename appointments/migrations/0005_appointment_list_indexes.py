@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_idempotencykey'),
+        ('doctor', '0004_delete_schedule'),
+        ('patients', '0004_remove_patient_address_remove_patient_birthday_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date', 'time'], name='appointment_patient_2fc0fe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'time'], name='appointment_date_397cae_idx'),
+        ),
+    ]
@@ -1,7 +1,15 @@
-from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.db.models import Q
 from patients.models import Patient
 from doctor.models import Doctor
+from availability.models import Schedule
+
+ACTIVE_STATUSES = ("pending", "confirmed")
+# Các field quyết định lịch hẹn có chiếm chỗ trong Schedule.booked_count hay không
+_SLOT_FIELDS = {'doctor', 'doctor_id', 'date', 'status'}
+_UNKNOWN = object()
 
 class Appointment(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
@@ -22,6 +30,8 @@ class Appointment(models.Model):
         indexes = [
             models.Index(fields=['doctor', 'date']),
             models.Index(fields=['doctor', 'date', 'time']),
+            models.Index(fields=['patient', 'date', 'time']),
+            models.Index(fields=['date', 'time']),
             models.Index(fields=['status']),
         ]
         constraints = [
@@ -32,3 +42,100 @@ class Appointment(models.Model):
             ),
         ]
 
+    # (doctor_id, date) mà lịch hẹn đang được tính vào Schedule.booked_count, None nếu không tính
+    _counted_slot = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'doctor_id', 'date', 'status'} <= set(field_names):
+            instance._counted_slot = instance._active_slot()
+        else:
+            instance._counted_slot = _UNKNOWN
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._counted_slot = self._active_slot()
+
+    def _active_slot(self):
+        if self.status in ACTIVE_STATUSES:
+            return (self.doctor_id, self.date)
+        return None
+
+    def save(self, *args, **kwargs):
+        """Lưu và cập nhật Schedule.booked_count khi lịch hẹn vào/rời trạng thái hoạt động."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not _SLOT_FIELDS & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = self._counted_slot
+            if previous is _UNKNOWN:
+                stored = Appointment.objects.filter(pk=self.pk).values_list('doctor_id', 'date', 'status').first()
+                previous = (stored[0], stored[1]) if stored and stored[2] in ACTIVE_STATUSES else None
+            super().save(*args, **kwargs)
+            current = self._active_slot()
+            if previous != current:
+                if previous is not None:
+                    Schedule.objects.adjust_booked_count(*previous, -1)
+                if current is not None:
+                    Schedule.objects.adjust_booked_count(*current, 1)
+            self._counted_slot = current
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._counted_slot is _UNKNOWN:
+                self.refresh_from_db(fields=['doctor', 'date', 'status'])
+            if self._counted_slot is not None:
+                Schedule.objects.adjust_booked_count(*self._counted_slot, -1)
+            return super().delete(*args, **kwargs)
+
+
+
+class SlotHold(models.Model):
+    """
+    Giữ chỗ tạm thời một slot (bác sĩ, ngày, giờ) trong vài phút, trong lúc bệnh
+    nhân hoàn tất đặt lịch. Hết hạn sau `expires_at`; dòng hết hạn được dọn bằng
+    lệnh sweep_slot_holds (xem appointments.holds).
+    """
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='slot_holds')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='slot_holds')
+    date = models.DateField()
+    time = models.TimeField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['doctor', 'date', 'time'],
+                name='unique_slot_hold',
+            ),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Phản hồi đầu tiên của một request có header Idempotency-Key, lưu theo
+    (user, key) để phát lại khi client gửi lại (xem appointments.idempotency).
+    status_code = None nghĩa là request đầu tiên vẫn đang xử lý.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
@@ -0,0 +1,84 @@
+# appointments/next_available.py
+"""
+Cột Doctor.next_available_at: thời điểm bắt đầu slot trống sớm nhất của bác sĩ
+(slot NEXT_SLOT_MINUTES phút, trong HORIZON_DAYS ngày tới), dùng để lọc / sắp xếp
+danh mục bác sĩ mà không phải dựng occupancy cho mọi bác sĩ mỗi request.
+
+Cập nhật tăng dần: slot_cache.invalidate() (được gọi ở mọi thay đổi lịch hẹn /
+Schedule) gọi refresh_after_change() sau commit. Thay đổi ở ngày SAU ngày của
+next_available_at hiện tại không thể làm giá trị sớm nhất thay đổi nên được bỏ
+qua; chỉ khi ngày thay đổi <= ngày đó mới tính lại cho bác sĩ (2 truy vấn).
+Giá trị trôi về quá khứ theo thời gian: chạy refresh_next_available định kỳ.
+Hold (giữ chỗ tạm thời) không được tính vì chỉ tồn tại vài phút; thay đổi hold
+không gọi refresh_after_change().
+
+Danh mục bác sĩ (doctor.catalog) hiển thị next_available_at nên chỉ bị làm mất
+hiệu lực khi giá trị của một bác sĩ ĐANG có trong danh mục thực sự đổi.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from doctor.models import Doctor
+from .occupancy import SlotOccupancy, earliest_bookable_minute
+
+NEXT_SLOT_MINUTES = 30
+HORIZON_DAYS = 60
+
+
+def compute(doctor_ids, now=None):
+    """{doctor_id: datetime | None} cho các bác sĩ trong `doctor_ids`."""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    occupancies = SlotOccupancy.load_range(
+        today, today + timedelta(days=HORIZON_DAYS - 1), doctor_ids=list(doctor_ids)
+    )
+    result = dict.fromkeys(doctor_ids)
+    for (doctor_id, day), occupancy in sorted(occupancies.items()):
+        if result[doctor_id] is not None or occupancy.is_full:
+            continue
+        minute = next(occupancy.iter_free_minutes(NEXT_SLOT_MINUTES, earliest_bookable_minute(day, now)), None)
+        if minute is not None:
+            result[doctor_id] = timezone.make_aware(datetime.combine(day, time(minute // 60, minute % 60)))
+    return result
+
+
+def refresh(doctor_ids, now=None):
+    """Tính lại và chỉ ghi các bác sĩ có giá trị thay đổi. Trả về số dòng đã ghi."""
+    from doctor import catalog
+
+    doctor_ids = set(doctor_ids)
+    if not doctor_ids:
+        return 0
+    current = dict(Doctor.objects.filter(id__in=doctor_ids).values_list('id', 'next_available_at'))
+    computed = compute(current, now)
+    changed = [doctor_id for doctor_id, value in computed.items() if current[doctor_id] != value]
+    for doctor_id in changed:
+        # QuerySet.update: không phát post_save (không đánh chỉ mục tìm kiếm lại)
+        Doctor.objects.filter(id=doctor_id).update(next_available_at=computed[doctor_id])
+    listed = Doctor.objects.filter(id__in=changed, is_available=True, verificationStatus="VERIFIED")
+    if changed and listed.exists():
+        catalog.invalidate()
+    return len(changed)
+
+
+def refresh_after_change(doctor_id, dates, now=None):
+    """Gọi sau khi lịch hẹn / Schedule của `doctor_id` ở các ngày `dates` thay đổi."""
+    if not dates:
+        return 0
+    now = now or timezone.now()
+    current = Doctor.objects.filter(id=doctor_id).values_list('next_available_at', flat=True).first()
+    if current is not None and current > now and min(dates) > timezone.localdate(current):
+        return 0
+    return refresh([doctor_id], now)
+
+
+def refresh_stale(batch_size=500, now=None):
+    """Tính lại cho các bác sĩ có next_available_at đã qua hoặc chưa có. Trả về số dòng đã ghi."""
+    now = now or timezone.now()
+    ids = list(
+        Doctor.objects.filter(is_available=True, verificationStatus="VERIFIED")
+        .exclude(next_available_at__gt=now)
+        .order_by('id').values_list('id', flat=True)
+    )
+    return sum(refresh(ids[start:start + batch_size], now) for start in range(0, len(ids), batch_size))
@@ -0,0 +1,201 @@
+# appointments/occupancy.py
+"""
+Chỉ mục chiếm chỗ (occupancy) theo cặp (bác sĩ, ngày).
+
+Schedule của ngày và các giờ đã có lịch hẹn đang hoạt động được đọc trong
+MỘT câu truy vấn (LEFT JOIN), sau đó các giờ đã đặt được nén vào một bitset
+theo phút trong ngày. `available_slots` dùng cấu trúc này thay vì tự truy vấn
+Schedule / count() / values_list(); sức chứa lấy từ cột Schedule.booked_count.
+`load_range` dựng occupancy cho nhiều bác sĩ x nhiều ngày, vẫn chỉ một truy vấn.
+
+Ngày không có dòng Schedule được suy ra từ ScheduleRule (lịch lặp hằng tuần):
+ngày đó chưa có lịch hẹn nào (lịch hẹn đầu tiên sẽ tạo Schedule), nên occupancy
+trống. Dòng Schedule luôn được ưu tiên, kể cả ngày nghỉ is_available=False.
+"""
+from datetime import timedelta
+
+from django.db.models import F, FilteredRelation, Q
+from django.utils import timezone
+
+from .models import ACTIVE_STATUSES
+from availability.models import Schedule, ScheduleRule
+
+MINUTES_PER_DAY = 24 * 60
+
+# Nhãn "HH:MM" dựng sẵn cho mọi phút trong ngày, tránh strftime khi liệt kê slot.
+SLOT_LABELS = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(MINUTES_PER_DAY))
+
+
+def minute_of(time_value):
+    return time_value.hour * 60 + time_value.minute
+
+
+def earliest_bookable_minute(day, now=None):
+    """
+    Phút sớm nhất trong `day` còn có thể đặt lịch (so với giờ hiện tại).
+    Trả về 0 cho ngày tương lai và MINUTES_PER_DAY cho ngày đã qua.
+    """
+    now = timezone.localtime(now)
+    today = now.date()
+    if day > today:
+        return 0
+    if day < today:
+        return MINUTES_PER_DAY
+    minute = now.hour * 60 + now.minute
+    if now.second or now.microsecond:
+        minute += 1
+    return minute
+
+
+class SlotOccupancy:
+    """
+    Trạng thái chiếm chỗ của một bác sĩ trong một ngày làm việc.
+
+    `booked_mask` là bitset: bit thứ m bật khi giờ (m // 60):(m % 60) đã có
+    lịch hẹn pending/confirmed. `booked_count` lấy từ cột Schedule.booked_count.
+    """
+    __slots__ = (
+        "doctor_id", "date", "start_time", "end_time", "max_patients",
+        "booked_mask", "booked_count",
+    )
+
+    def __init__(self, doctor_id, date, start_time, end_time, max_patients, booked_count=0, booked_times=()):
+        self.doctor_id = doctor_id
+        self.date = date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.max_patients = max_patients
+        self.booked_count = booked_count
+        self.booked_mask = 0
+        for booked_time in booked_times:
+            self.add(booked_time)
+
+    @staticmethod
+    def _rows(queryset):
+        """
+        (doctor_id, date, is_available, start_time, end_time, max_patients, booked_count, booked_time)
+        của các Schedule, LEFT JOIN lịch hẹn. Gồm cả ngày nghỉ để ngày đó không bị suy ra từ rule.
+        """
+        return (
+            queryset
+            .annotate(active=FilteredRelation(
+                'doctor__appointment',
+                condition=Q(
+                    doctor__appointment__date=F('date'),
+                    doctor__appointment__status__in=ACTIVE_STATUSES,
+                ),
+            ))
+            .order_by()
+            .values_list(
+                'doctor_id', 'date', 'is_available', 'start_time', 'end_time', 'max_patients',
+                'booked_count', 'active__time'
+            )
+        )
+
+    @staticmethod
+    def _bookable(queryset):
+        return queryset.filter(doctor__is_available=True, doctor__verificationStatus="VERIFIED")
+
+    @classmethod
+    def load(cls, doctor_id, date, bookable_doctor=False):
+        """
+        Dựng occupancy từ một câu truy vấn duy nhất; chỉ khi ngày chưa có Schedule
+        mới truy vấn thêm ScheduleRule.
+        Trả về None nếu bác sĩ không làm việc trong ngày.
+        bookable_doctor=True: chỉ nhận bác sĩ đang hoạt động và đã xác minh.
+        """
+        queryset = Schedule.objects.filter(doctor_id=doctor_id, date=date)
+        if bookable_doctor:
+            queryset = cls._bookable(queryset)
+        result, seen = cls._load(queryset)
+        if (doctor_id, date) in seen:
+            return result.get((doctor_id, date))
+
+        rules = ScheduleRule.objects.for_date(date).filter(doctor_id=doctor_id)
+        if bookable_doctor:
+            rules = cls._bookable(rules)
+        rule = rules.first()
+        return cls.from_rule(rule, date) if rule is not None else None
+
+    @classmethod
+    def load_range(cls, date_from, date_to, doctor_ids=None, specialty_id=None):
+        """
+        Occupancy của nhiều bác sĩ trong khoảng [date_from, date_to]: một truy vấn
+        Schedule + một truy vấn ScheduleRule cho các ngày chưa có Schedule.
+        Chỉ gồm bác sĩ đang hoạt động và đã xác minh. Trả về dict {(doctor_id, date): occupancy}.
+        """
+        def scoped(queryset):
+            queryset = cls._bookable(queryset)
+            if doctor_ids is not None:
+                queryset = queryset.filter(doctor_id__in=doctor_ids)
+            if specialty_id is not None:
+                queryset = queryset.filter(doctor__specialty_id=specialty_id)
+            return queryset
+
+        result, seen = cls._load(scoped(Schedule.objects.filter(date__range=(date_from, date_to))))
+        rules = scoped(ScheduleRule.objects.covering(date_from, date_to)).order_by('valid_from')
+        for rule in rules:
+            day = date_from + timedelta(days=(rule.weekday - date_from.weekday()) % 7)
+            while day <= date_to:
+                key = (rule.doctor_id, day)
+                if key not in seen and rule.applies_to(day):
+                    seen.add(key)
+                    result[key] = cls.from_rule(rule, day)
+                day += timedelta(days=7)
+        return result
+
+    @classmethod
+    def from_rule(cls, rule, date):
+        """Occupancy của ngày suy ra từ rule: chưa có Schedule nên chưa có lịch hẹn nào."""
+        return cls(rule.doctor_id, date, rule.start_time, rule.end_time, rule.max_patients)
+
+    @classmethod
+    def load_many(cls, queryset):
+        """Dựng occupancy cho mọi Schedule làm việc trong queryset, trả về dict {(doctor_id, date): occupancy}."""
+        return cls._load(queryset)[0]
+
+    @classmethod
+    def _load(cls, queryset):
+        """Trả về (occupancy của các ngày làm việc, tập (doctor_id, date) có dòng Schedule)."""
+        result = {}
+        seen = set()
+        for row in cls._rows(queryset):
+            doctor_id, date, is_available, start_time, end_time, max_patients, booked_count, booked_time = row
+            seen.add((doctor_id, date))
+            if not is_available:
+                continue
+            occupancy = result.get((doctor_id, date))
+            if occupancy is None:
+                occupancy = result[(doctor_id, date)] = cls(
+                    doctor_id, date, start_time, end_time, max_patients, booked_count
+                )
+            if booked_time is not None:
+                occupancy.add(booked_time)
+        return result, seen
+
+    def add(self, booked_time):
+        self.booked_mask |= 1 << minute_of(booked_time)
+
+    @property
+    def is_full(self):
+        return self.max_patients is not None and self.booked_count >= self.max_patients
+
+    def covers(self, time_value):
+        return self.start_time <= time_value <= self.end_time
+
+    def is_booked(self, time_value):
+        return bool(self.booked_mask >> minute_of(time_value) & 1)
+
+    def iter_free_minutes(self, slot_duration, not_before=0):
+        """Sinh phút bắt đầu của các slot còn trống, bước slot_duration phút."""
+        mask = self.booked_mask
+        minute = minute_of(self.start_time)
+        last_start = minute_of(self.end_time) - slot_duration
+        while minute <= last_start:
+            if minute >= not_before and not mask >> minute & 1:
+                yield minute
+            minute += slot_duration
+
+    def free_slots(self, slot_duration, not_before=0):
+        """Danh sách nhãn "HH:MM" của các slot còn trống."""
+        return [SLOT_LABELS[m] for m in self.iter_free_minutes(slot_duration, not_before)]
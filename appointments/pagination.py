@@ -0,0 +1,7 @@
+# appointments/pagination.py
+from bookingcare.pagination import KeysetPagination
+
+
+class AppointmentCursorPagination(KeysetPagination):
+    """Phân trang lịch hẹn theo khoá (date, time, id), mới nhất trước."""
+    ordering = ('-date', '-time', '-id')
@@ -2,12 +2,12 @@ from rest_framework import serializers
 from django.utils import timezone
 from datetime import datetime
 
-from .models import Appointment
+from .models import Appointment, SlotHold
 from doctor.models import Doctor
-from availability.models import Schedule
 from patients.models import Patient
 from accounts.models import User
 from specialities.models import Speciality 
+from bookingcare.fieldsets import SparseFieldsMixin
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -36,7 +36,7 @@ class SimplePatientSerializer(serializers.ModelSerializer):
         model = Patient
         fields = ['id', 'user', 'health_insurance_number']
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     patient = SimplePatientSerializer(read_only=True)
     doctor = SimpleDoctorSerializer(read_only=True)
     
@@ -53,19 +53,21 @@ class AppointmentSerializer(serializers.ModelSerializer):
             'status', 'notes', 'created_at'
         ]
         read_only_fields = ('patient', 'status', 'created_at', 'updated_at')
+        # Trùng slot do constraint trong DB xử lý (xem booking.book), bỏ validator exists() mặc định
+        validators = []
 
     def validate(self, data):
         """
-        Validation logic chính:
-        1. Không đặt lịch trong quá khứ.
-        2. Bác sĩ phải có lịch làm việc (Schedule) vào ngày đó.
-        3. Giờ đặt phải nằm trong giờ làm việc của bác sĩ.
-        4. Giờ đó chưa có ai đặt (hoặc chưa được xác nhận).
-        5. Lịch của bác sĩ không vượt quá số lượng bệnh nhân tối đa.
+        Validation không cần truy vấn DB: không đặt lịch trong quá khứ.
+        Các ràng buộc phụ thuộc dữ liệu (Schedule, giờ làm việc, trùng slot,
+        max_patients) được kiểm tra khi ghi, trong appointments.booking.book,
+        với Schedule đã bị khoá và constraint unique_doctor_date_time_when_active.
         """
-        date = data['date']
-        time = data['time']
-        doctor = data['doctor']
+        # PATCH có thể chỉ gửi một trong hai: lấy phần còn lại từ lịch hẹn đang sửa
+        date = data.get('date', getattr(self.instance, 'date', None))
+        time = data.get('time', getattr(self.instance, 'time', None))
+        if date is None or time is None:
+            return data
 
         try:
             appointment_datetime = timezone.make_aware(datetime.combine(date, time))
@@ -79,37 +81,50 @@ class AppointmentSerializer(serializers.ModelSerializer):
         if appointment_datetime < timezone.now():
             raise serializers.ValidationError("Không thể đặt lịch hẹn trong quá khứ.")
 
-        try:
-            schedule = Schedule.objects.get(
-                doctor=doctor, 
-                date=date, 
-                is_available=True
-            )
-        except Schedule.DoesNotExist:
-            raise serializers.ValidationError(f"Bác sĩ không có lịch làm việc vào ngày {date}.")
+        return data
 
-        if not (schedule.start_time <= time <= schedule.end_time):
-            raise serializers.ValidationError(
-                f"Giờ hẹn phải nằm trong khoảng làm việc của bác sĩ ({schedule.start_time} - {schedule.end_time})."
-            )
+class SlotHoldSerializer(serializers.ModelSerializer):
+    doctor_id = serializers.PrimaryKeyRelatedField(
+        queryset=Doctor.objects.filter(is_available=True, verificationStatus="VERIFIED"),
+        source='doctor',
+        label="Doctor"
+    )
 
-        existing_appointment = Appointment.objects.filter(
-            doctor=doctor,
-            date=date,
-            time=time,
-            status__in=["pending", "confirmed"]
-        ).exists()
+    class Meta:
+        model = SlotHold
+        fields = ['id', 'doctor_id', 'date', 'time', 'expires_at', 'created_at']
+        read_only_fields = ('expires_at', 'created_at')
+        # Trùng slot do constraint unique_slot_hold xử lý (xem holds.place)
+        validators = []
 
-        if existing_appointment:
-            raise serializers.ValidationError("Khung giờ này đã có người đặt. Vui lòng chọn giờ khác.")
+    def validate(self, data):
+        slot = datetime.combine(data['date'], data['time'])
+        if timezone.make_aware(slot) < timezone.now():
+            raise serializers.ValidationError("Không thể giữ chỗ cho thời điểm trong quá khứ.")
+        return data
 
-        day_appointment_count = Appointment.objects.filter(
-            doctor=doctor,
-            date=date,
-            status__in=["pending", "confirmed"]
-        ).count()
+class BulkAppointmentActionSerializer(serializers.Serializer):
+    """Thao tác hàng loạt của bác sĩ: chọn theo danh sách id HOẶC theo (date, status)."""
+    MAX_IDS = 200
 
-        if schedule.max_patients is not None and day_appointment_count >= schedule.max_patients:
-            raise serializers.ValidationError("Bác sĩ đã đạt số lượng bệnh nhân tối đa trong ngày này.")
+    action = serializers.ChoiceField(choices=['confirm', 'cancel', 'complete'])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        allow_empty=False, max_length=MAX_IDS
+    )
+    date = serializers.DateField(required=False)
+    status = serializers.ChoiceField(
+        choices=[choice for choice, _ in Appointment._meta.get_field('status').choices],
+        required=False
+    )
 
-        return data
\ No newline at end of file
+    def validate(self, data):
+        has_ids = 'ids' in data
+        has_selector = 'date' in data
+        if has_ids == has_selector:
+            raise serializers.ValidationError("Cần truyền 'ids' hoặc 'date' (kèm 'status' tùy chọn), không truyền cả hai.")
+        if 'status' in data and not has_selector:
+            raise serializers.ValidationError("'status' chỉ dùng cùng với 'date'.")
+        if has_ids:
+            data['ids'] = list(dict.fromkeys(data['ids']))
+        return data
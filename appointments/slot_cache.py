@@ -0,0 +1,106 @@
+# appointments/slot_cache.py
+"""
+Cache kết quả available-slots theo (doctor_id, date, slot_duration).
+
+Mỗi cặp (bác sĩ, ngày) có một số phiên bản (version) trong cache; key của
+kết quả chứa version nên chỉ cần tăng version khi có thay đổi Appointment /
+Schedule của ngày đó là mọi kết quả cũ tự hết hiệu lực. Ngoài ra mỗi bác sĩ có
+một version chung, tăng khi lịch lặp (ScheduleRule) thay đổi vì một rule ảnh
+hưởng tới mọi ngày của bác sĩ.
+
+Giá trị cache là (is_full, free_minutes, holds) CHƯA áp dụng mốc "bây giờ":
+view lọc bỏ slot đã qua và hold đã hết hạn (holds = ((minute, expires_at), ...))
+sau khi đọc cache.
+
+invalidate() / invalidate_doctor() là điểm mọi thay đổi chỗ trống đi qua nên
+cũng cập nhật Doctor.next_available_at (xem next_available.py) sau commit, trừ
+thay đổi chỉ về giữ chỗ (holds_only=True) vì hold không được tính vào giá trị đó.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+SLOT_CACHE_TTL = 300
+VERSION_TTL = 24 * 60 * 60
+
+
+def _version_key(doctor_id, date):
+    return f"slots:version:{doctor_id}:{date.isoformat()}"
+
+
+def _doctor_version_key(doctor_id):
+    return f"slots:doctor-version:{doctor_id}"
+
+
+def _entry_key(doctor_id, date, slot_duration, version):
+    return f"slots:{doctor_id}:{date.isoformat()}:{slot_duration}:{version}"
+
+
+def _current_version(doctor_id, date):
+    keys = (_version_key(doctor_id, date), _doctor_version_key(doctor_id))
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Khởi tạo bằng thời gian (ns) để không trùng với version cũ đã bị evict
+            cache.add(key, time.time_ns(), VERSION_TTL)
+            versions[key] = cache.get(key)
+    return ".".join(str(versions[key]) for key in keys)
+
+
+def get_slots(doctor_id, date, slot_duration):
+    """
+    Trả về (version, giá trị) với giá trị là (is_full, free_minutes, holds) hoặc None
+    nếu chưa có. Khi miss, truyền đúng `version` này cho set_slots(): nếu có thay đổi
+    tăng version trong lúc tính lại thì kết quả (có thể đã cũ) được ghi dưới version
+    cũ, không ai đọc tới.
+    """
+    version = _current_version(doctor_id, date)
+    return version, cache.get(_entry_key(doctor_id, date, slot_duration, version))
+
+
+def set_slots(doctor_id, date, slot_duration, version, is_full, free_minutes, holds=()):
+    cache.set(
+        _entry_key(doctor_id, date, slot_duration, version),
+        (is_full, tuple(free_minutes), tuple(holds)),
+        SLOT_CACHE_TTL,
+    )
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), VERSION_TTL)
+
+
+def bump_version(doctor_id, date):
+    """Làm mất hiệu lực mọi kết quả đã cache của (bác sĩ, ngày)."""
+    _bump(_version_key(doctor_id, date))
+
+
+def bump_doctor_version(doctor_id):
+    """Làm mất hiệu lực mọi kết quả đã cache của bác sĩ, ở mọi ngày."""
+    _bump(_doctor_version_key(doctor_id))
+
+
+def invalidate(doctor_id, *dates, holds_only=False):
+    """
+    Tăng version sau khi transaction hiện tại commit thành công.
+    holds_only=True (đặt / nhả giữ chỗ): không tính lại next_available_at.
+    """
+    from . import next_available
+
+    dates = {d for d in dates if d is not None}
+    for date in dates:
+        transaction.on_commit(lambda date=date: bump_version(doctor_id, date))
+    if not holds_only:
+        transaction.on_commit(lambda: next_available.refresh_after_change(doctor_id, dates))
+
+
+def invalidate_doctor(doctor_id):
+    """Tăng version chung của bác sĩ sau khi transaction hiện tại commit thành công."""
+    from . import next_available
+
+    transaction.on_commit(lambda: bump_doctor_version(doctor_id))
+    transaction.on_commit(lambda: next_available.refresh([doctor_id]))
@@ -0,0 +1,114 @@
+# appointments/transitions.py
+"""
+Chuyển trạng thái lịch hẹn bằng một câu UPDATE có điều kiện:
+
+    UPDATE appointment SET status=..., updated_at=...
+    WHERE id=... AND status IN (...) AND doctor_id=... AND date=...
+
+Điều kiện trạng thái nằm trong câu lệnh nên hai request đồng thời (vd. hai tab
+của bác sĩ bấm "xác nhận" và "hoàn thành") không thể cùng thành công; rowcount 0
+nghĩa là lịch hẹn đã bị request khác thay đổi. Chỉ ghi status/updated_at.
+
+UPDATE hàng loạt không đi qua Appointment.save(), nên Schedule.booked_count được
+điều chỉnh tại đây. Cả apply() và apply_bulk() đều khoá Schedule TRƯỚC lịch hẹn:
+cùng thứ tự khoá với booking.reserve() (Schedule rồi Appointment) để tránh deadlock.
+apply_bulk() khoá mọi Schedule liên quan một lượt theo (doctor_id, date)
+(Schedule.objects.lock) rồi mới khoá các dòng lịch hẹn để biết chính xác trạng thái
+từng id.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import ACTIVE_STATUSES, Appointment
+from availability.models import Schedule
+
+CANCELABLE = ("pending", "confirmed")
+CONFIRMABLE = ("pending",)
+COMPLETABLE = ("confirmed",)
+
+CHANGED_MESSAGE = "Lịch hẹn vừa được thay đổi bởi thao tác khác. Vui lòng tải lại và thử lại."
+
+
+class _NotApplied(Exception):
+    pass
+
+
+def _delta(allowed_from, target):
+    was_active = {status in ACTIVE_STATUSES for status in allowed_from}
+    if len(was_active) != 1:
+        raise ValueError("allowed_from phải cùng là trạng thái hoạt động hoặc cùng không hoạt động.")
+    return int(target in ACTIVE_STATUSES) - int(was_active.pop())
+
+
+def apply(appointment, target, allowed_from, message):
+    """
+    Chuyển `appointment` sang `target` nếu trạng thái trong DB thuộc `allowed_from`.
+    Thành công: cập nhật instance trong bộ nhớ. Thất bại: nạp lại instance từ DB và
+    raise ValidationError(`message` định dạng với {status} hiện tại).
+    Gọi bên trong transaction.atomic() để các ghi chép đi kèm (thông báo, hồ sơ khám)
+    commit cùng lúc.
+    """
+    delta = _delta(allowed_from, target)
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            if delta:
+                Schedule.objects.adjust_booked_count(appointment.doctor_id, appointment.date, delta)
+            updated = Appointment.objects.filter(
+                pk=appointment.pk, status__in=allowed_from,
+                doctor_id=appointment.doctor_id, date=appointment.date,
+            ).update(status=target, updated_at=now)
+            if not updated:
+                raise _NotApplied
+    except _NotApplied:
+        appointment.refresh_from_db(fields=['doctor', 'date', 'time', 'status'])
+        if appointment.status in allowed_from:
+            # Trạng thái vẫn hợp lệ nhưng ngày/bác sĩ vừa bị đổi (reschedule đồng thời)
+            raise serializers.ValidationError(CHANGED_MESSAGE, code="conflict")
+        raise serializers.ValidationError(message.format(status=appointment.status))
+
+    appointment.status = target
+    appointment.updated_at = now
+    appointment._counted_slot = appointment._active_slot()
+    return appointment
+
+
+def apply_bulk(queryset, target, allowed_from):
+    """
+    Chuyển mọi lịch hẹn trong `queryset` có trạng thái thuộc `allowed_from` sang
+    `target` bằng MỘT câu UPDATE. Phải gọi bên trong transaction.atomic().
+
+    Khi booked_count thay đổi, các Schedule của những (bác sĩ, ngày) trong `queryset`
+    được khoá trước theo thứ tự (doctor_id, date); sau đó các dòng lịch hẹn được khoá
+    (select_for_update) khi đọc để kết quả từng id chính xác.
+    Trả về (applied, skipped): danh sách instance đã chuyển (đã cập nhật trong bộ nhớ)
+    và danh sách instance bị bỏ qua vì sai trạng thái.
+    """
+    delta = _delta(allowed_from, target)
+    locked = set()
+    if delta:
+        locked = set(queryset.order_by().values_list('doctor_id', 'date').distinct())
+        Schedule.objects.lock(locked)
+    rows = list(queryset.select_for_update(of=('self',)).order_by('pk'))
+    applied = [row for row in rows if row.status in allowed_from]
+    skipped = [row for row in rows if row.status not in allowed_from]
+    if not applied:
+        return applied, skipped
+
+    now = timezone.now()
+    Appointment.objects.filter(pk__in=[row.pk for row in applied]).update(status=target, updated_at=now)
+    if delta:
+        per_day = Counter((row.doctor_id, row.date) for row in applied)
+        # Lịch hẹn vừa bị đổi ngày giữa lúc đọc cặp (bác sĩ, ngày) và lúc khoá
+        Schedule.objects.lock(set(per_day) - locked)
+        for (doctor_id, date), count in sorted(per_day.items()):
+            Schedule.objects.adjust_booked_count(doctor_id, date, delta * count)
+
+    for row in applied:
+        row.status = target
+        row.updated_at = now
+        row._counted_slot = row._active_slot()
+    return applied, skipped
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AppointmentViewSet
+from .views import AppointmentViewSet, SlotHoldViewSet
 
 router = DefaultRouter()
 router.register(r'appointments', AppointmentViewSet, basename='appointment')
+router.register(r'appointment-holds', SlotHoldViewSet, basename='slot-hold')
 
 urlpatterns = [
     path('', include(router.urls)),
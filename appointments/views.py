@@ -1,8 +1,12 @@
 # appointments/views.py
 
-from rest_framework import viewsets, status
+import json
+
+from rest_framework import mixins, viewsets, status
 from datetime import datetime, timedelta
 
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -11,15 +15,28 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import Appointment
-from .serializers import AppointmentSerializer
-from availability.models import Schedule
+from .models import ACTIVE_STATUSES, Appointment, SlotHold
+from . import booking, holds, slot_cache, transitions
+from .idempotency import idempotent
+from .pagination import AppointmentCursorPagination
+from bookingcare.fieldsets import SparseQuerysetMixin
+from .occupancy import SLOT_LABELS, SlotOccupancy, earliest_bookable_minute
+from .serializers import AppointmentSerializer, BulkAppointmentActionSerializer, SlotHoldSerializer
 from doctor.models import Doctor
 from records.models import AppointmentRecord
-from notifications.models import Notification
+from notifications import outbox
 
 CANCEL_CUTOFF_HOURS = 12
 RESCHEDULE_CUTOFF_HOURS = 12
+AVAILABLE_RANGE_MAX_DAYS = 31
+AVAILABLE_RANGE_MAX_DOCTORS = 50
+
+# action -> (trạng thái đích, trạng thái được phép chuyển, loại thông báo, mẫu thông báo)
+BULK_TRANSITIONS = {
+    'confirm': ("confirmed", transitions.CONFIRMABLE, "appointment_confirmed", "appointment_confirmed"),
+    'cancel': ("canceled", transitions.CANCELABLE, "appointment_canceled", "appointment_canceled_by_doctor"),
+    'complete': ("completed", transitions.COMPLETABLE, "appointment_completed", "appointment_completed"),
+}
 
 
 def get_aware_datetime(date_value, time_value):
@@ -29,24 +46,30 @@ def get_aware_datetime(date_value, time_value):
         return timezone.make_aware(combined, current_tz)
     return combined.astimezone(current_tz)
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet để quản lý Lịch hẹn (Appointment).
     - Bệnh nhân (Patient) có thể tạo, xem, và hủy lịch hẹn của mình.
     - Bác sĩ (Doctor) có thể xem, xác nhận, và hoàn thành lịch hẹn của mình.
+    - Tạo lịch và các thao tác đổi trạng thái hỗ trợ header Idempotency-Key.
+    - Xem danh sách / chi tiết hỗ trợ ?fields= / ?expand= (bookingcare.fieldsets).
     """
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = AppointmentCursorPagination
 
-    def _notify(self, users, message, notif_type):
-        notifications = [
-            Notification(user=user, message=message, type=notif_type)
-            for user in users if user is not None
-        ]
-        if notifications:
-            Notification.objects.bulk_create(notifications)
+    def _notify(self, users, notif_type, appointment, template=None):
+        """
+        Ghi thông báo vào outbox; gọi trong transaction của thay đổi lịch hẹn.
+        Chỉ lưu mã mẫu + params, câu hiển thị dựng lúc đọc (notifications.registry).
+        """
+        outbox.enqueue(users, notif_type, self._notification_params(appointment), template)
+
+    @classmethod
+    def _notification_params(cls, appointment):
+        return {"appointment": appointment.id, "slot": cls._format_slot(appointment)}
 
     @staticmethod
     def _format_slot(appointment):
@@ -58,22 +81,57 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         - Bệnh nhân chỉ thấy lịch của họ.
         - Bác sĩ chỉ thấy lịch của họ.
         - Admin/Staff thấy tất cả.
+        Danh sách (list) hỗ trợ lọc ?status=, ?date_from=, ?date_to= (YYYY-MM-DD)
+        và phân trang cursor theo (date, time, id).
         """
         user = self.request.user
-        
+        # Nạp sẵn patient/doctor/user/specialty cho serializer lồng nhau:
+        # số truy vấn không phụ thuộc số lịch hẹn trả về
+        queryset = Appointment.objects.select_related(
+            'patient__user', 'doctor__user', 'doctor__specialty'
+        ).order_by('-date', '-time', '-id')
+        if self.action == 'list':
+            queryset = self._filter_list(queryset)
+
         if user.is_staff:
-            return Appointment.objects.all().order_by('-date', '-time')
+            return queryset
             
         if hasattr(user, 'patient'):
             # Nếu là bệnh nhân
-            return Appointment.objects.filter(patient=user.patient).order_by('-date', '-time')
+            return queryset.filter(patient=user.patient)
         elif hasattr(user, 'doctor'):
             # Nếu là bác sĩ
-            return Appointment.objects.filter(doctor=user.doctor).order_by('-date', '-time')
+            return queryset.filter(doctor=user.doctor)
         
         # Người dùng khác (không phải patient/doctor/staff) không thấy gì
         return Appointment.objects.none()
 
+    def _filter_list(self, queryset):
+        params = self.request.query_params
+        status_values = [value for value in params.get('status', '').split(',') if value]
+        if status_values:
+            valid = {choice for choice, _ in Appointment._meta.get_field('status').choices}
+            unknown = set(status_values) - valid
+            if unknown:
+                raise ValidationError({"status": f"Trạng thái không hợp lệ: {', '.join(sorted(unknown))}."})
+            queryset = queryset.filter(status__in=status_values)
+
+        for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+            raw = params.get(param)
+            if raw:
+                try:
+                    value = parse_date(raw)
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise ValidationError({param: "Định dạng ngày không hợp lệ. Định dạng đúng: YYYY-MM-DD."})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """
         Tự động gán 'patient' là bệnh nhân đang đăng nhập khi tạo lịch hẹn.
@@ -83,19 +141,34 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Chỉ có bệnh nhân mới có thể đặt lịch hẹn.")
             
         patient = self.request.user.patient
-        serializer.save(patient=patient, status="pending")
+        with transaction.atomic():
+            booking.book(serializer, patient=patient, status="pending")
+            appointment = serializer.instance
+            doctor_user = appointment.doctor.user if appointment.doctor else None
+            self._notify([doctor_user], "appointment_created", appointment)
+        slot_cache.invalidate(appointment.doctor_id, appointment.date)
+
+    def perform_update(self, serializer):
+        """
+        PUT/PATCH đi qua booking.book như khi đặt mới: kiểm tra Schedule, giờ làm việc,
+        sức chứa và giữ chỗ; booked_count được chuyển từ ngày cũ sang ngày mới.
+        """
         appointment = serializer.instance
-        doctor_user = appointment.doctor.user if appointment.doctor else None
-        patient_name = patient.user.get_full_name() or patient.user.username
-        self._notify(
-            [doctor_user],
-            f"Bệnh nhân {patient_name} đã đặt lịch hẹn mới vào {self._format_slot(appointment)}.",
-            "appointment_created"
-        )
+        if appointment.status not in ACTIVE_STATUSES:
+            raise ValidationError("Không thể sửa lịch hẹn đã hoàn thành hoặc đã hủy.")
+
+        previous_doctor_id, previous_date = appointment.doctor_id, appointment.date
+        booking.book(serializer)
+        if previous_doctor_id != appointment.doctor_id:
+            slot_cache.invalidate(previous_doctor_id, previous_date)
+            slot_cache.invalidate(appointment.doctor_id, appointment.date)
+        else:
+            slot_cache.invalidate(appointment.doctor_id, previous_date, appointment.date)
 
     # --- Custom Actions để thay đổi trạng thái ---
 
     @action(detail=True, methods=['patch'], url_path='cancel')
+    @idempotent
     def cancel_appointment(self, request, pk=None):
         """
         Action cho phép Bệnh nhân hủy lịch hẹn của chính họ.
@@ -107,28 +180,25 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if not hasattr(user, 'patient') or appointment.patient != user.patient:
             raise PermissionDenied("Bạn không có quyền hủy lịch hẹn này.")
 
-        if appointment.status in ['completed', 'canceled']:
-            raise ValidationError(f"Không thể hủy lịch hẹn đã {appointment.status}.")
-
         appointment_datetime = get_aware_datetime(appointment.date, appointment.time)
         if appointment_datetime - timezone.now() < timedelta(hours=CANCEL_CUTOFF_HOURS):
             raise ValidationError(
                 f"Không thể hủy lịch hẹn trong vòng {CANCEL_CUTOFF_HOURS} giờ trước giờ khám."
             )
 
-        appointment.status = "canceled"
-        appointment.save()
-        serializer = self.get_serializer(appointment)
         doctor_user = appointment.doctor.user if appointment.doctor else None
-        patient_name = appointment.patient.user.get_full_name() or appointment.patient.user.username
-        self._notify(
-            [doctor_user],
-            f"Bệnh nhân {patient_name} đã hủy lịch hẹn vào {self._format_slot(appointment)}.",
-            "appointment_canceled"
-        )
+        with transaction.atomic():
+            transitions.apply(
+                appointment, "canceled", transitions.CANCELABLE,
+                "Không thể hủy lịch hẹn đã {status}."
+            )
+            self._notify([doctor_user], "appointment_canceled", appointment)
+        slot_cache.invalidate(appointment.doctor_id, appointment.date)
+        serializer = self.get_serializer(appointment)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], url_path='confirm')
+    @idempotent
     def confirm_appointment(self, request, pk=None):
         """
         Action cho phép Bác sĩ xác nhận lịch hẹn.
@@ -140,22 +210,18 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if not hasattr(user, 'doctor') or appointment.doctor != user.doctor:
             raise PermissionDenied("Bạn không có quyền xác nhận lịch hẹn này.")
 
-        if appointment.status != 'pending':
-            raise ValidationError(f"Chỉ có thể xác nhận lịch hẹn 'pending'.")
-
-        appointment.status = "confirmed"
-        appointment.save()
         patient_user = appointment.patient.user if appointment.patient else None
-        doctor_name = appointment.doctor.user.get_full_name() or appointment.doctor.user.username
-        self._notify(
-            [patient_user],
-            f"Lịch hẹn với bác sĩ {doctor_name} vào {self._format_slot(appointment)} đã được xác nhận.",
-            "appointment_confirmed"
-        )
+        with transaction.atomic():
+            transitions.apply(
+                appointment, "confirmed", transitions.CONFIRMABLE,
+                "Chỉ có thể xác nhận lịch hẹn 'pending'."
+            )
+            self._notify([patient_user], "appointment_confirmed", appointment)
         serializer = self.get_serializer(appointment)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], url_path='complete')
+    @idempotent
     def complete_appointment(self, request, pk=None):
         """
         Action cho phép Bác sĩ đánh dấu lịch hẹn là đã hoàn thành.
@@ -167,30 +233,25 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if not hasattr(user, 'doctor') or appointment.doctor != user.doctor:
             raise PermissionDenied("Bạn không có quyền hoàn thành lịch hẹn này.")
 
-        if appointment.status != 'confirmed':
-            raise ValidationError(f"Chỉ có thể hoàn thành lịch hẹn đã 'confirmed'.")
-
-        appointment.status = "completed"
-        appointment.save()
-
-        record, _ = AppointmentRecord.objects.get_or_create(appointment=appointment)
-        updated = False
-        for field in ['reason', 'description', 'status_before', 'status_after']:
-            value = request.data.get(field)
-            if value is not None:
-                setattr(record, field, value)
-                updated = True
-        if updated:
-            record.save()
+        patient_user = appointment.patient.user if appointment.patient else None
+        with transaction.atomic():
+            transitions.apply(
+                appointment, "completed", transitions.COMPLETABLE,
+                "Chỉ có thể hoàn thành lịch hẹn đã 'confirmed'."
+            )
+            record, _ = AppointmentRecord.objects.get_or_create(appointment=appointment)
+            updated = False
+            for field in ['reason', 'description', 'status_before', 'status_after']:
+                value = request.data.get(field)
+                if value is not None:
+                    setattr(record, field, value)
+                    updated = True
+            if updated:
+                record.save()
+            self._notify([patient_user], "appointment_completed", appointment)
+        slot_cache.invalidate(appointment.doctor_id, appointment.date)
 
         serializer = self.get_serializer(appointment)
-        patient_user = appointment.patient.user if appointment.patient else None
-        doctor_name = appointment.doctor.user.get_full_name() or appointment.doctor.user.username
-        self._notify(
-            [patient_user],
-            f"Buổi khám với bác sĩ {doctor_name} vào {self._format_slot(appointment)} đã hoàn thành. Vui lòng xem hồ sơ khám.",
-            "appointment_completed"
-        )
         return Response(
             {
                 "appointment": serializer.data,
@@ -199,7 +260,67 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @idempotent
+    def bulk_action(self, request):
+        """
+        Action cho phép Bác sĩ xác nhận / hủy / hoàn thành nhiều lịch hẹn trong một request.
+        Body: {"action": "confirm", "ids": [1, 2, 3]}
+          hoặc {"action": "confirm", "date": "YYYY-MM-DD", "status": "pending"}.
+        Trả về kết quả từng id: applied, skipped (sai trạng thái) hoặc not_found.
+        """
+        user = request.user
+        if not hasattr(user, 'doctor'):
+            raise PermissionDenied("Chỉ bác sĩ mới được thao tác hàng loạt trên lịch hẹn.")
+
+        serializer = BulkAppointmentActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        target, allowed_from, notif_type, template = BULK_TRANSITIONS[data['action']]
+
+        # Lọc theo user.doctor: lịch của bác sĩ khác rơi vào not_found
+        queryset = Appointment.objects.filter(doctor=user.doctor).select_related('patient__user')
+        if 'ids' in data:
+            queryset = queryset.filter(pk__in=data['ids'])
+        else:
+            queryset = queryset.filter(date=data['date'])
+            if 'status' in data:
+                queryset = queryset.filter(status=data['status'])
+
+        with transaction.atomic():
+            applied, skipped = transitions.apply_bulk(queryset, target, allowed_from)
+            if target == "completed":
+                AppointmentRecord.objects.bulk_create(
+                    [AppointmentRecord(appointment=appointment) for appointment in applied],
+                    ignore_conflicts=True
+                )
+            outbox.enqueue_many(
+                (appointment.patient.user, notif_type, template, self._notification_params(appointment))
+                for appointment in applied
+            )
+        if target not in ACTIVE_STATUSES:
+            slot_cache.invalidate(user.doctor.id, *{appointment.date for appointment in applied})
+
+        outcomes = {
+            appointment.id: {"id": appointment.id, "outcome": "applied", "status": appointment.status}
+            for appointment in applied
+        }
+        outcomes.update({
+            appointment.id: {"id": appointment.id, "outcome": "skipped", "status": appointment.status}
+            for appointment in skipped
+        })
+        ids = data['ids'] if 'ids' in data else sorted(outcomes)
+        return Response(
+            {
+                "action": data['action'],
+                "applied": len(applied),
+                "results": [outcomes.get(pk, {"id": pk, "outcome": "not_found"}) for pk in ids],
+            },
+            status=status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=['patch'], url_path='reschedule')
+    @idempotent
     def reschedule_appointment(self, request, pk=None):
         """
         Action cho phép Bệnh nhân đổi lịch hẹn sang ngày/giờ khác.
@@ -236,6 +357,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if parsed_date is None:
             raise ValidationError("Định dạng ngày không hợp lệ. Định dạng đúng: YYYY-MM-DD.")
 
+        previous_date = appointment.date
         serializer = AppointmentSerializer(
             appointment,
             data={
@@ -247,23 +369,18 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save(status="pending")
-        appointment.refresh_from_db(fields=['date', 'time', 'status'])
-
         doctor_user = appointment.doctor.user if appointment.doctor else None
         patient_user = appointment.patient.user if appointment.patient else None
-        slot_label = self._format_slot(appointment)
-
-        self._notify(
-            [doctor_user],
-            f"Bệnh nhân đã đổi lịch hẹn sang {slot_label}.",
-            "appointment_rescheduled"
-        )
-        self._notify(
-            [patient_user],
-            f"Lịch hẹn của bạn đã được đổi sang {slot_label} và đang chờ xác nhận.",
-            "appointment_rescheduled"
-        )
+        with transaction.atomic():
+            booking.book(serializer, status="pending")
+            appointment.refresh_from_db(fields=['date', 'time', 'status'])
+            params = self._notification_params(appointment)
+            # Hai thông báo (bác sĩ + bệnh nhân) trong một câu INSERT vào outbox
+            outbox.enqueue_many([
+                (doctor_user, "appointment_rescheduled", "appointment_rescheduled_doctor", params),
+                (patient_user, "appointment_rescheduled", "appointment_rescheduled_patient", params),
+            ])
+        slot_cache.invalidate(appointment.doctor_id, previous_date, appointment.date)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -275,6 +392,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             - doctor_id (bắt buộc)
             - date (YYYY-MM-DD, bắt buộc)
             - slot_duration (phút, mặc định 30)
+        Kết quả được cache theo version (xem slot_cache); mốc "bây giờ" áp dụng sau khi đọc cache.
         """
         doctor_id = request.query_params.get('doctor_id')
         date_str = request.query_params.get('date')
@@ -287,8 +405,8 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            doctor = Doctor.objects.get(id=doctor_id, is_available=True, verificationStatus="VERIFIED")
-        except Doctor.DoesNotExist:
+            doctor_id = int(doctor_id)
+        except ValueError:
             return Response(
                 {"detail": "Không tìm thấy bác sĩ hợp lệ."},
                 status=status.HTTP_404_NOT_FOUND
@@ -311,64 +429,201 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            schedule = Schedule.objects.get(
-                doctor=doctor,
-                date=appointment_date,
-                is_available=True
-            )
-        except Schedule.DoesNotExist:
-            return Response(
-                {"detail": "Bác sĩ không có lịch làm việc trong ngày đã chọn."},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        if schedule.max_patients is not None:
-            booked_count = Appointment.objects.filter(
-                doctor=doctor,
-                date=appointment_date,
-                status__in=["pending", "confirmed"]
-            ).count()
-            if booked_count >= schedule.max_patients:
+        version, cached = slot_cache.get_slots(doctor_id, appointment_date, slot_duration)
+        if cached is None:
+            # Một truy vấn duy nhất: Schedule + các giờ đã đặt của ngày
+            occupancy = SlotOccupancy.load(doctor_id, appointment_date, bookable_doctor=True)
+            if occupancy is None:
+                # Chỉ truy vấn thêm ở nhánh lỗi để phân biệt 2 thông báo
+                if not Doctor.objects.filter(id=doctor_id, is_available=True, verificationStatus="VERIFIED").exists():
+                    return Response(
+                        {"detail": "Không tìm thấy bác sĩ hợp lệ."},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
                 return Response(
-                    {
-                        "doctor_id": doctor.id,
-                        "date": appointment_date,
-                        "slots": [],
-                        "message": "Bác sĩ đã đạt số lượng bệnh nhân tối đa trong ngày."
-                    },
-                    status=status.HTTP_200_OK
+                    {"detail": "Bác sĩ không có lịch làm việc trong ngày đã chọn."},
+                    status=status.HTTP_404_NOT_FOUND
                 )
+            cached = (
+                occupancy.is_full,
+                tuple(occupancy.iter_free_minutes(slot_duration)),
+                holds.active_holds(doctor_id, appointment_date),
+            )
+            slot_cache.set_slots(doctor_id, appointment_date, slot_duration, version, *cached)
 
-        existing_times = set(
-            Appointment.objects.filter(
-                doctor=doctor,
-                date=appointment_date,
-                status__in=["pending", "confirmed"]
-            ).values_list('time', flat=True)
-        )
+        is_full, free_minutes, slot_holds = cached
+        if is_full:
+            return Response(
+                {
+                    "doctor_id": doctor_id,
+                    "date": appointment_date,
+                    "slots": [],
+                    "message": "Bác sĩ đã đạt số lượng bệnh nhân tối đa trong ngày."
+                },
+                status=status.HTTP_200_OK
+            )
 
-        tz = timezone.get_current_timezone()
-        start_dt = timezone.make_aware(datetime.combine(appointment_date, schedule.start_time), tz)
-        end_dt = timezone.make_aware(datetime.combine(appointment_date, schedule.end_time), tz)
+        # Mốc "bây giờ" áp dụng sau khi đọc cache để slot đã qua / hold hết hạn vẫn đúng
         now = timezone.now()
-        delta = timedelta(minutes=slot_duration)
-
-        slots = []
-        current = start_dt
-        while current + delta <= end_dt:
-            if current >= now:
-                slot_time = current.time()
-                if slot_time not in existing_times:
-                    slots.append(current.strftime("%H:%M"))
-            current += delta
+        not_before = earliest_bookable_minute(appointment_date, now)
+        held = {minute for minute, expires_at in slot_holds if expires_at > now}
+        slots = [
+            SLOT_LABELS[minute] for minute in free_minutes
+            if minute >= not_before and minute not in held
+        ]
 
         return Response(
             {
-                "doctor_id": doctor.id,
+                "doctor_id": doctor_id,
                 "date": appointment_date.isoformat(),
                 "slot_duration_minutes": slot_duration,
                 "slots": slots,
             },
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+    @action(detail=False, methods=['get'], url_path='available-slots/range', permission_classes=[AllowAny])
+    def available_slots_range(self, request):
+        """
+        Trả về slot trống của nhiều bác sĩ trong nhiều ngày (ví dụ: màn hình tuần).
+        Query params:
+            - doctor_ids (vd: 1,2,3, tối đa AVAILABLE_RANGE_MAX_DOCTORS id) hoặc specialty
+              (ID chuyên khoa), bắt buộc một trong hai
+            - date_from, date_to (YYYY-MM-DD, bắt buộc, tối đa AVAILABLE_RANGE_MAX_DAYS ngày)
+            - slot_duration (phút, mặc định 30)
+        Toàn bộ Schedule + lịch hẹn được đọc trong một truy vấn; kết quả được stream theo từng bác sĩ.
+        """
+        raw_ids = ",".join(request.query_params.getlist('doctor_ids'))
+        specialty_id = request.query_params.get('specialty')
+        date_from = parse_date(request.query_params.get('date_from') or '')
+        date_to = parse_date(request.query_params.get('date_to') or '')
+        slot_duration = request.query_params.get('slot_duration', 30)
+
+        if not raw_ids and not specialty_id:
+            return Response(
+                {"detail": "Cần cung cấp doctor_ids hoặc specialty."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            doctor_ids = [int(value) for value in raw_ids.split(",") if value.strip()] if raw_ids else None
+            specialty_id = int(specialty_id) if specialty_id else None
+        except ValueError:
+            return Response(
+                {"detail": "doctor_ids và specialty phải là số nguyên."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if doctor_ids is not None:
+            doctor_ids = list(dict.fromkeys(doctor_ids))
+            if len(doctor_ids) > AVAILABLE_RANGE_MAX_DOCTORS:
+                return Response(
+                    {"detail": f"doctor_ids tối đa {AVAILABLE_RANGE_MAX_DOCTORS} bác sĩ mỗi request."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            slot_duration = int(slot_duration)
+            if slot_duration <= 0:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"detail": "slot_duration phải là số nguyên dương."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if date_from is None or date_to is None:
+            return Response(
+                {"detail": "date_from và date_to là bắt buộc. Định dạng đúng: YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if date_to < date_from or (date_to - date_from).days >= AVAILABLE_RANGE_MAX_DAYS:
+            return Response(
+                {"detail": f"Khoảng ngày không hợp lệ (tối đa {AVAILABLE_RANGE_MAX_DAYS} ngày)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        occupancies = SlotOccupancy.load_range(
+            date_from, date_to, doctor_ids=doctor_ids, specialty_id=specialty_id
+        )
+
+        by_doctor = {}
+        for (doctor_id, day), occupancy in occupancies.items():
+            by_doctor.setdefault(doctor_id, []).append((day, occupancy))
+        held = holds.held_minutes_range(list(by_doctor), date_from, date_to) if by_doctor else {}
+
+        now = timezone.now()
+
+        def stream():
+            header = {
+                "date_from": date_from.isoformat(),
+                "date_to": date_to.isoformat(),
+                "slot_duration_minutes": slot_duration,
+            }
+            yield json.dumps(header, ensure_ascii=False)[:-1] + ', "doctors": ['
+            for index, doctor_id in enumerate(sorted(by_doctor)):
+                days = []
+                for day, occupancy in sorted(by_doctor[doctor_id], key=lambda item: item[0]):
+                    if occupancy.is_full:
+                        slots = []
+                    else:
+                        held_minutes = held.get((doctor_id, day), ())
+                        slots = [
+                            SLOT_LABELS[minute]
+                            for minute in occupancy.iter_free_minutes(slot_duration, earliest_bookable_minute(day, now))
+                            if minute not in held_minutes
+                        ]
+                    days.append({"date": day.isoformat(), "slots": slots})
+                chunk = json.dumps({"doctor_id": doctor_id, "days": days}, ensure_ascii=False)
+                yield chunk if index == 0 else "," + chunk
+            yield "]}"
+
+        return StreamingHttpResponse(stream(), content_type="application/json")
+
+
+class SlotHoldViewSet(mixins.CreateModelMixin,
+                      mixins.ListModelMixin,
+                      mixins.DestroyModelMixin,
+                      viewsets.GenericViewSet):
+    """
+    Giữ chỗ tạm thời một slot trước khi đặt lịch (chỉ bệnh nhân).
+    - POST: giữ slot trong holds.HOLD_TTL, thay thế hold cũ của bệnh nhân.
+    - GET: các hold còn hạn của bệnh nhân.
+    - DELETE: trả lại slot.
+    """
+    serializer_class = SlotHoldSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if hasattr(user, 'patient'):
+            return SlotHold.objects.filter(patient=user.patient, expires_at__gt=timezone.now())
+        return SlotHold.objects.none()
+
+    def create(self, request, *args, **kwargs):
+        if not hasattr(request.user, 'patient'):
+            raise PermissionDenied("Chỉ có bệnh nhân mới có thể giữ chỗ.")
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        doctor = serializer.validated_data['doctor']
+        date = serializer.validated_data['date']
+        time = serializer.validated_data['time']
+
+        occupancy = SlotOccupancy.load(doctor.id, date)
+        if occupancy is None or not occupancy.covers(time):
+            raise booking.booking_error("Giờ đã chọn không nằm trong lịch làm việc của bác sĩ.")
+        if occupancy.is_booked(time):
+            raise booking.booking_error(booking.SLOT_TAKEN_MESSAGE, code="unique")
+        if occupancy.is_full:
+            raise booking.booking_error("Bác sĩ đã đạt số lượng bệnh nhân tối đa trong ngày này.")
+
+        try:
+            hold = holds.place(request.user.patient, doctor.id, date, time)
+        except holds.SlotHeld as exc:
+            raise booking.booking_error(str(exc), code="unique")
+
+        return Response(self.get_serializer(hold).data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        holds.release(instance)
\ No newline at end of file
@@ -0,0 +1,113 @@
+# availability/capacity.py
+"""
+Bảng công suất toàn phòng khám: số lịch hẹn theo trạng thái so với max_patients,
+cho mọi bác sĩ x mọi ngày trong một khoảng.
+
+- Một câu GROUP BY (Schedule LEFT JOIN Appointment cùng bác sĩ, cùng ngày) đếm lịch
+  hẹn theo trạng thái cho từng (bác sĩ, ngày).
+- Một truy vấn ScheduleRule cho các ngày chưa có dòng Schedule (chưa có lịch hẹn).
+- Kết quả được cache ngắn hạn (CAPACITY_CACHE_TTL) theo khoảng ngày / chuyên khoa:
+  màn hình lễ tân thường xem cùng một cửa sổ "14 ngày tới".
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, F, FilteredRelation, Q
+
+from appointments.models import ACTIVE_STATUSES, Appointment
+from .models import Schedule, ScheduleRule
+
+CAPACITY_CACHE_TTL = 60
+STATUSES = [choice for choice, _ in Appointment._meta.get_field('status').choices]
+
+
+def _display_name(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def _cell(date, max_patients, counts):
+    booked = sum(counts.get(status, 0) for status in ACTIVE_STATUSES)
+    return {
+        "date": date.isoformat(),
+        "max_patients": max_patients,
+        "booked": booked,
+        **{status: counts.get(status, 0) for status in STATUSES},
+        "utilization": round(booked / max_patients, 2) if max_patients else None,
+    }
+
+
+def _scoped(queryset, specialty_id):
+    queryset = queryset.filter(doctor__is_available=True, doctor__verificationStatus="VERIFIED")
+    if specialty_id is not None:
+        queryset = queryset.filter(doctor__specialty_id=specialty_id)
+    return queryset
+
+
+def compute(date_from, date_to, specialty_id=None):
+    """
+    Lưới {doctor_id, doctor_name, days: [ô mỗi ngày làm việc]} của các bác sĩ đang
+    hoạt động và đã xác minh trong [date_from, date_to]. Ngày nghỉ (Schedule
+    is_available=False) không có ô và không bị suy ra từ rule.
+    """
+    doctor_fields = ('doctor__user__first_name', 'doctor__user__last_name', 'doctor__user__username')
+    rows = (
+        _scoped(Schedule.objects.filter(date__range=(date_from, date_to)), specialty_id)
+        .annotate(booked=FilteredRelation(
+            'doctor__appointment',
+            condition=Q(doctor__appointment__date=F('date')),
+        ))
+        .values('doctor_id', *doctor_fields, 'date', 'is_available', 'max_patients')
+        .annotate(**{
+            status: Count('booked', filter=Q(booked__status=status)) for status in STATUSES
+        })
+        .order_by()
+    )
+
+    names = {}
+    cells = {}
+    seen = set()
+    for row in rows:
+        key = (row['doctor_id'], row['date'])
+        seen.add(key)
+        if row['is_available']:
+            names[row['doctor_id']] = _display_name(*(row[field] for field in doctor_fields))
+            cells[key] = _cell(row['date'], row['max_patients'], row)
+
+    rules = (
+        _scoped(ScheduleRule.objects.covering(date_from, date_to), specialty_id)
+        .select_related('doctor__user')
+        .order_by('valid_from')
+    )
+    for rule in rules:
+        day = date_from + timedelta(days=(rule.weekday - date_from.weekday()) % 7)
+        while day <= date_to:
+            key = (rule.doctor_id, day)
+            if key not in seen and rule.applies_to(day):
+                seen.add(key)
+                user = rule.doctor.user
+                names[rule.doctor_id] = _display_name(user.first_name, user.last_name, user.username)
+                # Chưa có Schedule nên chưa có lịch hẹn nào
+                cells[key] = _cell(day, rule.max_patients, {})
+            day += timedelta(days=7)
+
+    by_doctor = {}
+    for (doctor_id, _), cell in sorted(cells.items()):
+        by_doctor.setdefault(doctor_id, []).append(cell)
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "doctors": [
+            {"doctor_id": doctor_id, "doctor_name": names[doctor_id], "days": days}
+            for doctor_id, days in by_doctor.items()
+        ],
+    }
+
+
+def capacity_grid(date_from, date_to, specialty_id=None):
+    """compute() có cache ngắn hạn (CAPACITY_CACHE_TTL giây); số liệu có thể trễ tối đa chừng đó."""
+    key = f"capacity:{date_from.isoformat()}:{date_to.isoformat()}:{specialty_id or 'all'}"
+    result = cache.get(key)
+    if result is None:
+        result = compute(date_from, date_to, specialty_id)
+        cache.set(key, result, CAPACITY_CACHE_TTL)
+    return result
@@ -0,0 +1,89 @@
+# availability/copying.py
+"""
+Sao chép lịch làm việc của một tuần nguồn sang N tuần đích cho nhiều bác sĩ.
+
+Số truy vấn không phụ thuộc số bác sĩ / số tuần:
+- 1 truy vấn đọc toàn bộ Schedule của tuần nguồn,
+- 1 truy vấn đọc các (bác sĩ, ngày) đích đã có lịch (để đếm created / updated),
+- 1 câu upsert bulk_create(update_conflicts=True) trên khoá unique (doctor, date).
+booked_count của lịch đích đã tồn tại không bị ghi đè.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from appointments import slot_cache
+from .models import Schedule
+
+COPIED_FIELDS = ['start_time', 'end_time', 'is_available', 'max_patients']
+DAYS_PER_WEEK = 7
+
+
+def copy_weeks(source_start, target_start, weeks=1, doctor_ids=None):
+    """
+    Sao chép 7 ngày bắt đầu từ `source_start` sang `weeks` tuần bắt đầu từ `target_start`.
+    `doctor_ids=None`: mọi bác sĩ có lịch trong tuần nguồn.
+    Trả về dict: created, updated, skipped (số ngày đích không có lịch nguồn)
+    và skipped_without_source {doctor_id: [ngày nguồn trống]}.
+    """
+    source_end = source_start + timedelta(days=DAYS_PER_WEEK - 1)
+    sources = Schedule.objects.filter(date__range=(source_start, source_end))
+    if doctor_ids is not None:
+        sources = sources.filter(doctor_id__in=doctor_ids)
+    sources = list(sources.only('doctor_id', 'date', *COPIED_FIELDS))
+
+    by_doctor = {doctor_id: {} for doctor_id in (doctor_ids or ())}
+    for schedule in sources:
+        by_doctor.setdefault(schedule.doctor_id, {})[(schedule.date - source_start).days] = schedule
+
+    targets = []
+    skipped_without_source = {}
+    for doctor_id, days in sorted(by_doctor.items()):
+        missing = [
+            (source_start + timedelta(days=offset)).isoformat()
+            for offset in range(DAYS_PER_WEEK) if offset not in days
+        ]
+        if missing:
+            skipped_without_source[doctor_id] = missing
+        for week in range(weeks):
+            week_start = target_start + timedelta(weeks=week)
+            for offset, source in days.items():
+                targets.append(Schedule(
+                    doctor_id=doctor_id,
+                    date=week_start + timedelta(days=offset),
+                    **{field: getattr(source, field) for field in COPIED_FIELDS},
+                ))
+
+    result = {
+        "created": 0,
+        "updated": 0,
+        "skipped": sum(len(missing) for missing in skipped_without_source.values()) * weeks,
+        "skipped_without_source": skipped_without_source,
+    }
+    if not targets:
+        return result
+
+    target_end = target_start + timedelta(weeks=weeks, days=-1)
+    with transaction.atomic():
+        existing = set(
+            Schedule.objects.filter(
+                doctor_id__in={target.doctor_id for target in targets},
+                date__range=(target_start, target_end),
+            ).values_list('doctor_id', 'date')
+        )
+        Schedule.objects.bulk_create(
+            targets,
+            update_conflicts=True,
+            unique_fields=['doctor', 'date'],
+            update_fields=COPIED_FIELDS,
+            batch_size=500,
+        )
+        dates_by_doctor = {}
+        for target in targets:
+            dates_by_doctor.setdefault(target.doctor_id, []).append(target.date)
+        for doctor_id, dates in dates_by_doctor.items():
+            slot_cache.invalidate(doctor_id, *dates)
+
+    result["updated"] = sum((target.doctor_id, target.date) in existing for target in targets)
+    result["created"] = len(targets) - result["updated"]
+    return result
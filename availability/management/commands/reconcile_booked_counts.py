@@ -0,0 +1,65 @@
+# availability/management/commands/reconcile_booked_counts.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+
+from availability.models import Schedule
+from appointments.models import ACTIVE_STATUSES, Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Đối soát Schedule.booked_count với số lịch hẹn pending/confirmed thực tế "
+        "và sửa các dòng bị lệch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Chỉ đối soát từ ngày này (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ báo cáo, không sửa")
+
+    def handle(self, *args, **options):
+        active = (
+            Appointment.objects
+            .filter(doctor=OuterRef('doctor'), date=OuterRef('date'), status__in=ACTIVE_STATUSES)
+            .order_by()
+            .values('doctor')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        drifted = (
+            Schedule.objects
+            .annotate(actual=Coalesce(Subquery(active), 0))
+            .filter(~Q(booked_count=F('actual')))
+            .order_by('id')
+        )
+        if options['date_from']:
+            date_from = parse_date(options['date_from'])
+            if date_from is None:
+                self.stderr.write("--date-from phải có định dạng YYYY-MM-DD.")
+                return
+            drifted = drifted.filter(date__gte=date_from)
+
+        fixed = 0
+        last_id = 0
+        batch_size = options['batch_size']
+        while True:
+            batch = list(drifted.filter(id__gt=last_id).values_list('id', 'booked_count', 'actual')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            for schedule_id, stored, actual in batch:
+                self.stdout.write(f"Schedule #{schedule_id}: booked_count {stored} -> {actual}")
+            if not options['dry_run']:
+                with transaction.atomic():
+                    for schedule_id, _, _ in batch:
+                        # Tính lại trong UPDATE để không ghi đè thay đổi vừa xảy ra
+                        Schedule.objects.filter(id=schedule_id).update(
+                            booked_count=Coalesce(Subquery(active), 0)
+                        )
+            fixed += len(batch)
+
+        verb = "Phát hiện" if options['dry_run'] else "Đã sửa"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {fixed} lịch làm việc bị lệch booked_count."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_booked_count(apps, schema_editor):
+    Schedule = apps.get_model('availability', 'Schedule')
+    Appointment = apps.get_model('appointments', 'Appointment')
+    active = (
+        Appointment.objects
+        .filter(doctor=OuterRef('doctor'), date=OuterRef('date'), status__in=['pending', 'confirmed'])
+        .order_by()
+        .values('doctor')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Schedule.objects.update(booked_count=Coalesce(Subquery(active), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0002_schedule_delete_availability'),
+        ('appointments', '0002_appointment_appointment_doctor__e7d63f_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_booked_count, migrations.RunPython.noop),
+    ]
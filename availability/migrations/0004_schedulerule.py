@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0003_schedule_booked_count'),
+        ('doctor', '0004_delete_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Thứ Hai'), (1, 'Thứ Ba'), (2, 'Thứ Tư'), (3, 'Thứ Năm'), (4, 'Thứ Sáu'), (5, 'Thứ Bảy'), (6, 'Chủ Nhật')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('max_patients', models.IntegerField(blank=True, default=10, null=True)),
+                ('valid_from', models.DateField()),
+                ('valid_until', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_rules', to='doctor.doctor')),
+            ],
+            options={
+                'ordering': ['weekday', 'valid_from'],
+                'indexes': [models.Index(fields=['doctor', 'weekday'], name='availabilit_doctor__49a243_idx')],
+            },
+        ),
+    ]
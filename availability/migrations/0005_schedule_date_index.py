@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('availability', '0004_schedulerule'),
+        ('doctor', '0004_delete_schedule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['date'], name='availabilit_date_a65388_idx'),
+        ),
+    ]
@@ -1,7 +1,44 @@
 # availability/models.py
 from django.db import models
+from django.db.models import F, Q
 from doctor.models import Doctor
 
+
+class ScheduleManager(models.Manager):
+    def adjust_booked_count(self, doctor_id, date, delta):
+        """Cộng/trừ booked_count của (bác sĩ, ngày) bằng F(), không để giá trị âm."""
+        queryset = self.filter(doctor_id=doctor_id, date=date)
+        if delta < 0:
+            queryset = queryset.filter(booked_count__gte=-delta)
+        return queryset.update(booked_count=F('booked_count') + delta)
+
+    def lock(self, slots):
+        """
+        Khoá (SELECT ... FOR UPDATE) các Schedule của các cặp (bác sĩ, ngày) trong `slots`
+        theo thứ tự (doctor_id, date). Mọi chỗ cần khoá nhiều Schedule đều đi qua đây
+        nên hai transaction không thể giữ khoá theo thứ tự ngược nhau (deadlock).
+        Phải gọi bên trong transaction.atomic().
+        """
+        condition = Q()
+        for doctor_id, date in set(slots):
+            condition |= Q(doctor_id=doctor_id, date=date)
+        if not condition:
+            return
+        list(self.select_for_update().filter(condition).order_by('doctor_id', 'date').values_list('pk', flat=True))
+
+    def materialize(self, doctor_id, date):
+        """
+        Tạo Schedule của (bác sĩ, ngày) từ ScheduleRule áp dụng cho ngày đó, nếu có.
+        Không làm gì nếu ngày đã có Schedule (kể cả ngày nghỉ is_available=False).
+        Trả về True nếu sau lời gọi ngày có Schedule sinh từ rule.
+        """
+        rule = ScheduleRule.objects.for_date(date).filter(doctor_id=doctor_id).first()
+        if rule is None:
+            return False
+        self.bulk_create([rule.to_schedule(date)], ignore_conflicts=True)
+        return True
+
+
 class Schedule(models.Model):
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="schedules")
     date = models.DateField()
@@ -9,11 +46,79 @@ class Schedule(models.Model):
     end_time = models.TimeField()
     is_available = models.BooleanField(default=True)
     max_patients = models.IntegerField(default=10, null=True, blank=True)
+    # Số lịch hẹn pending/confirmed trong ngày, cập nhật bằng F() mỗi khi Appointment
+    # vào/rời trạng thái hoạt động (xem Appointment.save). Lệch thì chạy:
+    # python manage.py reconcile_booked_counts
+    booked_count = models.PositiveIntegerField(default=0)
+
+    objects = ScheduleManager()
 
     class Meta:
         # Đảm bảo một bác sĩ không thể tạo 2 lịch trùng ngày
         unique_together = ('doctor', 'date') 
         ordering = ['date', 'start_time']
+        indexes = [
+            # Lọc danh sách theo ngày / khoảng ngày của staff (không kèm doctor)
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor.user.username} - {self.date} ({self.start_time}-{self.end_time})"
+
+
+class ScheduleRuleQuerySet(models.QuerySet):
+    def covering(self, date_from, date_to):
+        """Các rule có hiệu lực ít nhất một ngày trong [date_from, date_to]."""
+        return self.filter(
+            Q(valid_until__isnull=True) | Q(valid_until__gte=date_from),
+            valid_from__lte=date_to,
+        )
+
+    def for_date(self, date):
+        return self.covering(date, date).filter(weekday=date.weekday())
+
+
+class ScheduleRule(models.Model):
+    """
+    Lịch làm việc lặp lại hằng tuần (vd. thứ Hai 08:00-12:00 từ 01/11).
+    Ngày cụ thể được suy ra từ rule khi cần (available-slots, đặt lịch); dòng
+    Schedule chỉ được tạo khi bác sĩ ghi đè ngày đó (tạo Schedule, kể cả ngày nghỉ
+    is_available=False) hoặc khi có lịch hẹn đầu tiên (Schedule.objects.materialize).
+    """
+    WEEKDAYS = [
+        (0, "Thứ Hai"), (1, "Thứ Ba"), (2, "Thứ Tư"), (3, "Thứ Năm"),
+        (4, "Thứ Sáu"), (5, "Thứ Bảy"), (6, "Chủ Nhật"),
+    ]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="schedule_rules")
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    max_patients = models.IntegerField(default=10, null=True, blank=True)
+    valid_from = models.DateField()
+    valid_until = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ScheduleRuleQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['weekday', 'valid_from']
+        indexes = [
+            models.Index(fields=['doctor', 'weekday']),
+        ]
 
     def __str__(self):
-        return f"{self.doctor.user.username} - {self.date} ({self.start_time}-{self.end_time})"
\ No newline at end of file
+        return f"{self.doctor_id} - {self.get_weekday_display()} ({self.start_time}-{self.end_time})"
+
+    def applies_to(self, date):
+        return (
+            date.weekday() == self.weekday and self.valid_from <= date
+            and (self.valid_until is None or date <= self.valid_until)
+        )
+
+    def to_schedule(self, date):
+        return Schedule(
+            doctor_id=self.doctor_id, date=date,
+            start_time=self.start_time, end_time=self.end_time,
+            max_patients=self.max_patients, is_available=True,
+        )
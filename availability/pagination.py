@@ -0,0 +1,7 @@
+# availability/pagination.py
+from bookingcare.pagination import KeysetPagination
+
+
+class ScheduleCursorPagination(KeysetPagination):
+    """Phân trang lịch làm việc theo khoá (date, id), ngày sớm nhất trước."""
+    ordering = ('date', 'id')
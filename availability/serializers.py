@@ -1,6 +1,6 @@
 # availability/serializers.py
 from rest_framework import serializers
-from .models import Schedule
+from .models import Schedule, ScheduleRule
 import datetime
 
 class ScheduleSerializer(serializers.ModelSerializer):
@@ -12,10 +12,10 @@ class ScheduleSerializer(serializers.ModelSerializer):
         model = Schedule
         fields = [
             'id', 'doctor', 'doctor_name', 'date', 'start_time', 
-            'end_time', 'is_available', 'max_patients'
+            'end_time', 'is_available', 'max_patients', 'booked_count'
         ]
         # Bác sĩ không cần tự chọn mình, hệ thống sẽ tự gán
-        read_only_fields = ('doctor',) 
+        read_only_fields = ('doctor', 'booked_count')
 
     def validate(self, data):
         """
@@ -42,4 +42,83 @@ class ScheduleSerializer(serializers.ModelSerializer):
         if start and end and start >= end:
             raise serializers.ValidationError("Giờ kết thúc phải sau giờ bắt đầu.")
             
-        return data
\ No newline at end of file
+        return data
+
+class ScheduleCopyRangeSerializer(serializers.Serializer):
+    """Sao chép 1 tuần nguồn sang `weeks` tuần liên tiếp cho nhiều bác sĩ."""
+    MAX_WEEKS = 12
+
+    source_start = serializers.DateField()
+    target_start = serializers.DateField()
+    weeks = serializers.IntegerField(min_value=1, max_value=MAX_WEEKS, default=1)
+    doctor_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=1000
+    )
+
+    def validate(self, data):
+        if data['target_start'] < datetime.date.today():
+            raise serializers.ValidationError("Không thể sao chép lịch sang ngày trong quá khứ.")
+        source_end = data['source_start'] + datetime.timedelta(days=6)
+        target_end = data['target_start'] + datetime.timedelta(weeks=data['weeks'], days=-1)
+        if data['target_start'] <= source_end and data['source_start'] <= target_end:
+            raise serializers.ValidationError("Khoảng ngày đích không được trùng với tuần nguồn.")
+        if 'doctor_ids' in data:
+            data['doctor_ids'] = sorted(set(data['doctor_ids']))
+        return data
+
+
+class CapacityQuerySerializer(serializers.Serializer):
+    """Tham số bảng công suất; mặc định 14 ngày kể từ hôm nay."""
+    DEFAULT_DAYS = 14
+    MAX_DAYS = 92
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    specialty = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        date_from = data.setdefault('date_from', datetime.date.today())
+        date_to = data.setdefault('date_to', date_from + datetime.timedelta(days=self.DEFAULT_DAYS - 1))
+        if date_to < date_from:
+            raise serializers.ValidationError("date_to phải sau hoặc bằng date_from.")
+        if (date_to - date_from).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"Khoảng ngày tối đa {self.MAX_DAYS} ngày.")
+        return data
+
+
+class ScheduleRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScheduleRule
+        fields = [
+            'id', 'doctor', 'weekday', 'start_time', 'end_time',
+            'max_patients', 'valid_from', 'valid_until', 'created_at'
+        ]
+        read_only_fields = ('doctor', 'created_at')
+
+    def validate(self, data):
+        def current(field):
+            if field in data:
+                return data[field]
+            return getattr(self.instance, field, None)
+
+        start, end = current('start_time'), current('end_time')
+        if start and end and start >= end:
+            raise serializers.ValidationError("Giờ kết thúc phải sau giờ bắt đầu.")
+
+        valid_from, valid_until = current('valid_from'), current('valid_until')
+        if valid_until and valid_from and valid_until < valid_from:
+            raise serializers.ValidationError("valid_until phải sau hoặc bằng valid_from.")
+
+        # Hai rule cùng thứ trong tuần không được chồng hiệu lực
+        doctor = self.context.get('doctor') or getattr(self.instance, 'doctor', None)
+        if doctor is not None and valid_from:
+            overlapping = ScheduleRule.objects.covering(valid_from, valid_until or datetime.date.max).filter(
+                doctor=doctor, weekday=current('weekday')
+            )
+            if self.instance is not None:
+                overlapping = overlapping.exclude(pk=self.instance.pk)
+            if overlapping.exists():
+                raise serializers.ValidationError(
+                    "Đã có lịch lặp cho ngày này trong tuần trùng khoảng hiệu lực."
+                )
+        return data
@@ -1,10 +1,11 @@
 # availability/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ScheduleViewSet
+from .views import ScheduleRuleViewSet, ScheduleViewSet
 
 router = DefaultRouter()
 router.register(r'schedules', ScheduleViewSet, basename='schedule')
+router.register(r'schedule-rules', ScheduleRuleViewSet, basename='schedule-rule')
 
 urlpatterns = [
     path('', include(router.urls)),
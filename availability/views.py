@@ -2,28 +2,63 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from django.db import IntegrityError # <--- Quan trọng
+from django.db import IntegrityError, transaction # <--- Quan trọng
 from rest_framework.decorators import action
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.utils.dateparse import parse_date
-from datetime import datetime, timedelta
 
-from .models import Schedule
-from .serializers import ScheduleSerializer
+from .models import Schedule, ScheduleRule
+from . import capacity, copying
+from .pagination import ScheduleCursorPagination
+from appointments import slot_cache
+from .serializers import CapacityQuerySerializer, ScheduleCopyRangeSerializer, ScheduleRuleSerializer, ScheduleSerializer
 from doctor.models import Doctor
 
 class ScheduleViewSet(viewsets.ModelViewSet):
     serializer_class = ScheduleSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = ScheduleCursorPagination
 
     def get_queryset(self):
+        """
+        Staff thấy mọi lịch, bác sĩ thấy lịch của mình.
+        Danh sách (list) hỗ trợ lọc ?date=, ?date_from=, ?date_to= (YYYY-MM-DD), ?doctor=
+        và phân trang cursor theo (date, id).
+        """
         user = self.request.user
         if user.is_staff:
-            return Schedule.objects.all().order_by('date')
-        if hasattr(user, 'doctor'):
-            return Schedule.objects.filter(doctor=user.doctor).order_by('date')
-        return Schedule.objects.none()
+            queryset = Schedule.objects.all()
+        elif hasattr(user, 'doctor'):
+            queryset = Schedule.objects.filter(doctor=user.doctor)
+        else:
+            return Schedule.objects.none()
+        # doctor_name cần doctor.user: nạp sẵn để số truy vấn không phụ thuộc số dòng
+        queryset = queryset.select_related('doctor__user').order_by('date', 'id')
+        if self.action == 'list':
+            queryset = self._filter_list(queryset)
+        return queryset
+
+    def _filter_list(self, queryset):
+        params = self.request.query_params
+        for param, lookup in (('date', 'date'), ('date_from', 'date__gte'), ('date_to', 'date__lte')):
+            raw = params.get(param)
+            if raw:
+                try:
+                    value = parse_date(raw)
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise ValidationError({param: "Định dạng ngày không hợp lệ. Định dạng đúng: YYYY-MM-DD."})
+                queryset = queryset.filter(**{lookup: value})
+
+        doctor = params.get('doctor')
+        if doctor:
+            try:
+                queryset = queryset.filter(doctor_id=int(doctor))
+            except ValueError:
+                raise ValidationError({"doctor": "doctor phải là số nguyên."})
+        return queryset
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -31,11 +66,27 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Chỉ có bác sĩ mới được tạo lịch làm việc.")
         
         try:
-            serializer.save(doctor=user.doctor)
+            schedule = serializer.save(doctor=user.doctor)
         except IntegrityError:
             # Bắt lỗi trùng lịch từ DB và trả về lỗi đẹp
             raise ValidationError({"detail": "Lịch làm việc cho ngày này đã tồn tại."})
-        
+        slot_cache.invalidate(schedule.doctor_id, schedule.date)
+
+    def perform_update(self, serializer):
+        previous_date = serializer.instance.date
+        try:
+            schedule = serializer.save()
+        except IntegrityError:
+            raise ValidationError({"detail": "Lịch làm việc cho ngày này đã tồn tại."})
+        slot_cache.invalidate(schedule.doctor_id, previous_date, schedule.date)
+
+    def perform_destroy(self, instance):
+        # Xoá trước rồi mới invalidate: ngoài transaction on_commit chạy ngay, nếu
+        # invalidate trước thì next_available / cache slot vẫn thấy dòng chưa bị xoá
+        with transaction.atomic():
+            instance.delete()
+            slot_cache.invalidate(instance.doctor_id, instance.date)
+
     @action(detail=False, methods=['post'], url_path='copy-week')
     def copy_week(self, request):
         """
@@ -77,45 +128,120 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        created_count = 0
-        updated_count = 0
-        skipped_dates = []
-
-        for day_offset in range(7):
-            source_date = source_start + timedelta(days=day_offset)
-            target_date = target_start + timedelta(days=day_offset)
-
-            try:
-                template_schedule = Schedule.objects.get(doctor=doctor, date=source_date)
-            except Schedule.DoesNotExist:
-                skipped_dates.append(source_date.isoformat())
-                continue
-
-            defaults = {
-                'start_time': template_schedule.start_time,
-                'end_time': template_schedule.end_time,
-                'is_available': template_schedule.is_available,
-                'max_patients': template_schedule.max_patients,
-            }
-
-            _, created = Schedule.objects.update_or_create(
-                doctor=doctor,
-                date=target_date,
-                defaults=defaults
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        result = copying.copy_weeks(source_start, target_start, weeks=1, doctor_ids=[doctor.id])
 
         return Response(
             {
                 "doctor_id": doctor.id,
                 "source_start": source_start.isoformat(),
                 "target_start": target_start.isoformat(),
-                "created": created_count,
-                "updated": updated_count,
-                "skipped_without_source": skipped_dates,
+                "created": result["created"],
+                "updated": result["updated"],
+                "skipped_without_source": result["skipped_without_source"].get(doctor.id, []),
             },
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+    @action(detail=False, methods=['post'], url_path='copy-range')
+    def copy_range(self, request):
+        """
+        Sao chép lịch 1 tuần nguồn sang nhiều tuần đích, cho nhiều bác sĩ một lúc.
+        Body:
+            - source_start: ngày bắt đầu tuần nguồn (YYYY-MM-DD)
+            - target_start: ngày bắt đầu tuần đích đầu tiên (YYYY-MM-DD)
+            - weeks: số tuần đích liên tiếp (mặc định 1)
+            - doctor_ids: (admin, tùy chọn) danh sách bác sĩ; bỏ trống = mọi bác sĩ có lịch tuần nguồn
+        Bác sĩ chỉ sao chép được lịch của chính mình.
+        """
+        user = request.user
+        serializer = ScheduleCopyRangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if hasattr(user, 'doctor'):
+            if data.get('doctor_ids', [user.doctor.id]) != [user.doctor.id]:
+                raise PermissionDenied("Bác sĩ chỉ được sao chép lịch của chính mình.")
+            doctor_ids = [user.doctor.id]
+        elif user.is_staff:
+            doctor_ids = data.get('doctor_ids')
+            if doctor_ids is not None:
+                found = set(Doctor.objects.filter(id__in=doctor_ids).values_list('id', flat=True))
+                missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in found]
+                if missing:
+                    return Response(
+                        {"detail": f"Không tìm thấy bác sĩ: {', '.join(map(str, missing))}."},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+        else:
+            raise PermissionDenied("Bạn không được phép sao chép lịch làm việc.")
+
+        result = copying.copy_weeks(
+            data['source_start'], data['target_start'], weeks=data['weeks'], doctor_ids=doctor_ids
+        )
+        return Response(
+            {
+                "source_start": data['source_start'].isoformat(),
+                "target_start": data['target_start'].isoformat(),
+                "weeks": data['weeks'],
+                **result,
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'], url_path='capacity')
+    def capacity(self, request):
+        """
+        Bảng công suất toàn phòng khám (Admin/Staff): với mỗi bác sĩ x ngày làm việc,
+        số lịch hẹn theo trạng thái, booked (pending + confirmed), max_patients và
+        utilization = booked / max_patients (null nếu không giới hạn).
+        Query: ?date_from=, ?date_to= (YYYY-MM-DD, mặc định 14 ngày từ hôm nay), ?specialty=
+        """
+        if not request.user.is_staff:
+            raise PermissionDenied("Chỉ Admin/Staff được xem bảng công suất.")
+        serializer = CapacityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(capacity.capacity_grid(data['date_from'], data['date_to'], data.get('specialty')))
+
+
+class ScheduleRuleViewSet(viewsets.ModelViewSet):
+    """
+    Lịch làm việc lặp lại hằng tuần của bác sĩ.
+    - Bác sĩ quản lý rule của chính mình; Admin/Staff xem tất cả.
+    - Ngày cụ thể được suy ra từ rule khi xem slot / đặt lịch; muốn đổi giờ hoặc
+      nghỉ một ngày thì tạo Schedule cho ngày đó (ghi đè rule).
+    """
+    serializer_class = ScheduleRuleSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return ScheduleRule.objects.all()
+        if hasattr(user, 'doctor'):
+            return ScheduleRule.objects.filter(doctor=user.doctor)
+        return ScheduleRule.objects.none()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self.request.user, 'doctor'):
+            context['doctor'] = self.request.user.doctor
+        return context
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        if not hasattr(user, 'doctor'):
+            raise PermissionDenied("Chỉ có bác sĩ mới được tạo lịch lặp.")
+        rule = serializer.save(doctor=user.doctor)
+        slot_cache.invalidate_doctor(rule.doctor_id)
+
+    def perform_update(self, serializer):
+        rule = serializer.save()
+        slot_cache.invalidate_doctor(rule.doctor_id)
+
+    def perform_destroy(self, instance):
+        # Như ScheduleViewSet.perform_destroy: invalidate sau khi rule đã bị xoá
+        with transaction.atomic():
+            instance.delete()
+            slot_cache.invalidate_doctor(instance.doctor_id)
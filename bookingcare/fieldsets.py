@@ -0,0 +1,158 @@
+# bookingcare/fieldsets.py
+"""
+Sparse fieldset (?fields=) và điều khiển lồng (?expand=) cho các API đọc.
+
+    ?fields=id,user.first_name,specialty   chỉ trả các field này (dấu chấm: field lồng)
+    ?expand=doctor,doctor.user             chỉ lồng các quan hệ này; quan hệ khác trả về id
+
+Không có tham số: giữ nguyên output đầy đủ như trước. `?expand=` (rỗng) trả mọi
+quan hệ dưới dạng id. Một quan hệ được expand mà không liệt kê con thì giữ nguyên
+cách lồng mặc định của nó.
+
+SparseFieldsMixin (serializer) cắt cây field; SparseQuerysetMixin (view) suy ra từ
+cây đã cắt các cột cần đọc và quan hệ cần JOIN rồi áp dụng only() / select_related(),
+nên payload và số cột đọc từ DB cùng giảm.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_tree(value):
+    """"id,user.first_name,user.last_name" -> {"id": {}, "user": {"first_name": {}, "last_name": {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def requested(request):
+    """(cây fields | None, cây expand | None) từ query params của request GET."""
+    if request is None or request.method != 'GET':
+        return None, None
+    params = request.query_params
+    fields = parse_tree(params[FIELDS_PARAM]) if params.get(FIELDS_PARAM) else None
+    expand = parse_tree(params[EXPAND_PARAM]) if EXPAND_PARAM in params else None
+    return fields, expand
+
+
+def _nested(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def prune(fields, field_tree, expand_tree, path=''):
+    """Cắt BindingDict `fields` tại chỗ theo hai cây; field lồng được cắt đệ quy."""
+    if field_tree:
+        unknown = sorted(set(field_tree) - {name for name, field in fields.items() if not field.write_only})
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Trường không hợp lệ: {', '.join(path + name for name in unknown)}."})
+
+    for name, field in list(fields.items()):
+        if field.write_only:
+            continue
+        if field_tree and name not in field_tree:
+            del fields[name]
+            continue
+        nested = _nested(field)
+        if nested is None:
+            continue
+        if expand_tree is not None and name not in expand_tree:
+            fields[name] = serializers.PrimaryKeyRelatedField(
+                source=field.source if field.source != name else None,
+                many=nested is not field, read_only=True,
+            )
+            continue
+        prune(
+            nested.fields,
+            field_tree.get(name) if field_tree else None,
+            expand_tree.get(name) or None if expand_tree is not None else None,
+            path=f"{path}{name}.",
+        )
+
+
+def queryset_plan(fields, model, prefix=''):
+    """
+    (cột cho only(), quan hệ cho select_related()) đủ để serialize `fields`, hoặc None
+    nếu có field không suy ra được cột (SerializerMethodField, source='*', property...).
+    """
+    columns, relations = [], []
+    for field in fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            return None
+        parts = field.source.split('.')
+        current = model
+        for index, part in enumerate(parts):
+            try:
+                model_field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            if model_field.is_relation and index < len(parts) - 1:
+                relations.append(prefix + '__'.join(parts[:index + 1]))
+                current = model_field.related_model
+        name = prefix + '__'.join(parts)
+        nested = _nested(field)
+        if nested is None:
+            columns.append(name)
+            # Field đọc thêm cột khác của cùng model (vd. AvatarField -> User.avatar)
+            owner = prefix + '__'.join(parts[:-1] + [''])
+            columns.extend(owner + extra for extra in getattr(field, 'extra_sources', ()))
+            continue
+        if nested is not field:
+            return None
+        plan = queryset_plan(nested.fields, model_field.related_model, name + '__')
+        if plan is None:
+            return None
+        relations.append(name)
+        columns.extend(plan[0])
+        relations.extend(plan[1])
+    return columns, relations
+
+
+class SparseFieldsMixin:
+    """Serializer gốc áp dụng ?fields= / ?expand= của request (chỉ với GET)."""
+
+    @property
+    def fields(self):
+        # Serializer.fields là cached_property; property này che bộ nhớ đệm của nó nên tự lưu
+        fields = self.__dict__.get('_sparse_fields')
+        if fields is None:
+            fields = self.__dict__['_sparse_fields'] = super().fields
+            field_tree, expand_tree = requested(self.context.get('request'))
+            if field_tree is not None or expand_tree is not None:
+                prune(fields, field_tree, expand_tree)
+        return fields
+
+
+class SparseQuerysetMixin:
+    """
+    View: khi có ?fields= / ?expand=, thu hẹp queryset của list / retrieve bằng
+    only() + select_related() theo serializer đã cắt. Cột trong ordering của
+    pagination luôn được đọc (để dựng cursor).
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions or requested(self.request) == (None, None):
+            return queryset
+        plan = queryset_plan(self.get_serializer().fields, queryset.model)
+        if plan is None:
+            return queryset
+        columns, relations = plan
+        ordering = getattr(self.pagination_class, 'ordering', ()) if self.action == 'list' else ()
+        columns += [name.lstrip('-') for name in ordering]
+        return queryset.select_related(None).select_related(*relations).only(*columns)
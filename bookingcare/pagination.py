@@ -0,0 +1,152 @@
+# bookingcare/pagination.py
+"""
+Phân trang keyset (cursor) dùng chung cho các API danh sách.
+
+Khác PageNumberPagination (OFFSET) và CursorPagination của DRF (chỉ dùng field
+đầu tiên của ordering + offset), lớp này so sánh trên TOÀN BỘ khoá tổng hợp:
+
+    WHERE (date, time, id) < (%s, %s, %s) ORDER BY date DESC, time DESC, id DESC LIMIT n
+
+nên trang sâu có chi phí như trang đầu và dùng được index trên các cột đó.
+Field cuối cùng trong `ordering` phải là duy nhất (thường là id).
+
+Giá trị trong cursor giữ nguyên độ chính xác (datetime / time tới micro giây):
+DjangoJSONEncoder cắt còn mili giây, làm cursor đứng trước chính dòng sinh ra nó
+và bỏ sót các dòng cùng mili giây (vd. thông báo tạo bằng bulk_create).
+"""
+import base64
+import json
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-id',)
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = "Cursor không hợp lệ."
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[1]
+        if cursor is not None:
+            queryset = queryset.filter(self._after(cursor[0], reverse, queryset.db))
+
+        ordering = [self._invert(name) for name in self.ordering] if reverse else list(self.ordering)
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    # --- cursor ---
+
+    @staticmethod
+    def _encode(value):
+        # isoformat() giữ micro giây; to_python() của field đọc lại đúng giá trị
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def _link(self, obj, reverse):
+        values = [self._encode(getattr(obj, self.model._meta.get_field(name).attname)) for name in self.fields]
+        payload = json.dumps({'v': values, 'r': reverse})
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(parse.unquote(token).encode()))
+            raw_values, reverse = payload['v'], bool(payload['r'])
+            if len(raw_values) != len(self.fields):
+                raise ValueError
+            values = [
+                self.model._meta.get_field(name).to_python(raw)
+                for name, raw in zip(self.fields, raw_values)
+            ]
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _after(self, values, reverse, using='default'):
+        """
+        Điều kiện "đứng sau cursor" trên khoá tổng hợp. Mọi field cùng chiều (trường hợp
+        của các ordering hiện có): so sánh row-value (f_0, ..., f_n) < (v_0, ..., v_n),
+        dạng mà Postgres dùng được cho index range scan trên index tổng hợp. Khác chiều:
+        OR_i (f_0 = v_0 AND ... AND f_i op v_i).
+        """
+        directions = {name.startswith('-') != reverse for name in self.ordering}
+        if len(directions) == 1:
+            return self._row_after(values, directions.pop(), using)
+
+        condition = Q()
+        prefix = {}
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            lookup = f"{field}__lt" if descending else f"{field}__gt"
+            condition |= Q(**prefix, **{lookup: value})
+            prefix[field] = value
+        return condition
+
+    def _row_after(self, values, descending, using):
+        connection = connections[using]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        fields = [self.model._meta.get_field(name) for name in self.fields]
+        columns = ", ".join(f"{table}.{connection.ops.quote_name(field.column)}" for field in fields)
+        params = [field.get_db_prep_value(value, connection) for field, value in zip(fields, values)]
+        operator = "<" if descending else ">"
+        sql = f"({columns}) {operator} ({', '.join(['%s'] * len(params))})"
+        return ExpressionWrapper(RawSQL(sql, params), output_field=BooleanField())
+
+    @staticmethod
+    def _invert(name):
+        return name[1:] if name.startswith('-') else f"-{name}"
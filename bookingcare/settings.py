@@ -118,6 +118,17 @@ else:
         }
     }
 
+# Cache: mặc định locmem cho dev / test (một tiến trình). Khi chạy nhiều tiến trình
+# bắt buộc dùng cache chung qua CACHE_URL (docker-compose: redis://redis:6379/1),
+# `manage.py check --deploy` báo lỗi appointments.E001 nếu vẫn là locmem.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Broker báo thông báo mới cho luồng SSE (xem notifications.pubsub)
+NOTIFICATIONS_BROKER = env('NOTIFICATIONS_BROKER', default='notifications.pubsub.InProcessBroker')
+NOTIFICATIONS_REDIS_URL = env('NOTIFICATIONS_REDIS_URL', default='redis://localhost:6379/0')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
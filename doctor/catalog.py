@@ -0,0 +1,68 @@
+# doctor/catalog.py
+"""
+Cache danh mục bác sĩ (GET /api/doctors/ không có ?q=) dưới dạng JSON đã render sẵn.
+
+Danh mục có một số phiên bản (version) chung trong cache, tăng khi Doctor, User
+của bác sĩ hoặc Speciality được lưu / xoá (signals.py). Key của nội dung và ETag
+đều chứa version nên:
+- nội dung cũ tự hết hiệu lực khi version tăng,
+- request có If-None-Match trùng ETag hiện tại được trả 304 chỉ với một lần đọc
+  cache, không truy vấn DB.
+Thay đổi bằng QuerySet.update() không phát signal: gọi invalidate() sau đó.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+
+CATALOG_CACHE_TTL = 600
+VERSION_TTL = 24 * 60 * 60
+_VERSION_KEY = "doctors:catalog-version"
+
+
+def _entry_key(specialty_id, version):
+    return f"doctors:catalog:{specialty_id or 'all'}:{version}"
+
+
+def current_version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        # Khởi tạo bằng thời gian (ns) để không trùng với version cũ đã bị evict
+        cache.add(_VERSION_KEY, time.time_ns(), VERSION_TTL)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def etag(specialty_id, version):
+    return f'"doctors-{version}-{specialty_id or "all"}"'
+
+
+def matches(if_none_match, tag):
+    """If-None-Match có chứa `tag` (hoặc "*") hay không."""
+    if not if_none_match:
+        return False
+    tags = parse_etags(if_none_match)
+    return "*" in tags or tag in tags or f"W/{tag}" in tags
+
+
+def get_content(specialty_id, version):
+    """JSON (bytes) đã render của danh mục, hoặc None nếu chưa có."""
+    return cache.get(_entry_key(specialty_id, version))
+
+
+def set_content(specialty_id, version, content):
+    cache.set(_entry_key(specialty_id, version), content, CATALOG_CACHE_TTL)
+
+
+def bump_version():
+    """Làm mất hiệu lực mọi trang danh mục đã cache và mọi ETag đã phát."""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, time.time_ns(), VERSION_TTL)
+
+
+def invalidate():
+    """Tăng version sau khi transaction hiện tại commit thành công."""
+    transaction.on_commit(bump_version)
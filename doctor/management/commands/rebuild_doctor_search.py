@@ -0,0 +1,16 @@
+# doctor/management/commands/rebuild_doctor_search.py
+from django.core.management.base import BaseCommand
+
+from doctor import search
+from doctor.models import Doctor
+
+
+class Command(BaseCommand):
+    help = "Dựng lại chỉ mục tìm kiếm bác sĩ (sau khi import dữ liệu bằng SQL / bulk_create)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = search.refresh(Doctor.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã đánh chỉ mục {total} bác sĩ."))
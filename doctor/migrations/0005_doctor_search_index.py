@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from doctor import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor)
+    Doctor = apps.get_model('doctor', 'Doctor')
+    search.refresh(Doctor.objects.using(schema_editor.connection.alias).all())
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_user_avatar'),
+        ('doctor', '0004_delete_schedule'),
+        ('specialities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0005_doctor_search_index'),
+        ('rooms', '0001_initial'),
+        ('specialities', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='next_available_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['verificationStatus', 'is_available', 'specialty', 'price'], name='doctor_doct_verific_0dfa4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['verificationStatus', 'is_available', 'next_available_at'], name='doctor_doct_verific_a3950e_idx'),
+        ),
+    ]
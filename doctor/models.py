@@ -25,4 +25,12 @@ class Doctor(models.Model):
     )
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    description = models.TextField(null=True, blank=True)
\ No newline at end of file
+    description = models.TextField(null=True, blank=True)
+    # Slot trống sớm nhất, duy trì bởi appointments.next_available
+    next_available_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['verificationStatus', 'is_available', 'specialty', 'price']),
+            models.Index(fields=['verificationStatus', 'is_available', 'next_available_at']),
+        ]
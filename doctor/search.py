@@ -0,0 +1,165 @@
+# doctor/search.py
+"""
+Tìm kiếm toàn văn bác sĩ (?q=) theo tên, chuyên khoa và mô tả, có xếp hạng.
+
+Chỉ mục được duy trì ngoài các cột của model (signals.py gọi refresh() khi Doctor,
+User hoặc Speciality thay đổi):
+- Postgres: cột doctor_doctor.search_vector (tsvector, GIN index). Cột không khai
+  báo trên model để Doctor.save() không ghi đè giá trị đã dựng.
+- SQLite: bảng FTS5 doctor_doctor_search (rowid = doctor id).
+- CSDL khác: lọc icontains, không xếp hạng.
+
+Văn bản và từ khoá đều được bỏ dấu (fold) trước khi đánh chỉ mục / tìm, nên
+"da lieu" khớp "Da liễu". Mỗi từ khoá khớp theo tiền tố ("ngu" khớp "Nguyễn").
+Trọng số: tên > chuyên khoa > mô tả.
+"""
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "doctor_doctor_search"
+MAX_TERMS = 8
+# Trọng số bm25 (SQLite) theo thứ tự cột name, specialty, description
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+_TOKEN = re.compile(r"\w+")
+
+
+def fold(text):
+    """Chữ thường, bỏ dấu tiếng Việt ("Đa Liễu" -> "da lieu")."""
+    text = (text or "").lower().replace("đ", "d")
+    return "".join(ch for ch in unicodedata.normalize("NFD", text) if unicodedata.category(ch) != "Mn")
+
+
+def terms(query):
+    return _TOKEN.findall(fold(query))[:MAX_TERMS]
+
+
+def _backend(alias):
+    vendor = connections[alias].vendor
+    return vendor if vendor in ("postgresql", "sqlite") else None
+
+
+def create_index(schema_editor):
+    """Tạo cột / bảng chỉ mục (gọi từ migration)."""
+    backend = _backend(schema_editor.connection.alias)
+    if backend == "postgresql":
+        schema_editor.execute("ALTER TABLE doctor_doctor ADD COLUMN search_vector tsvector")
+        schema_editor.execute(
+            "CREATE INDEX doctor_doctor_search_vector_gin ON doctor_doctor USING gin (search_vector)"
+        )
+    elif backend == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, specialty, description, tokenize='unicode61')"
+        )
+
+
+def drop_index(schema_editor):
+    backend = _backend(schema_editor.connection.alias)
+    if backend == "postgresql":
+        schema_editor.execute("ALTER TABLE doctor_doctor DROP COLUMN search_vector")
+    elif backend == "sqlite":
+        schema_editor.execute(f"DROP TABLE {FTS_TABLE}")
+
+
+def _documents(queryset):
+    rows = queryset.order_by().values_list(
+        'pk', 'user__first_name', 'user__last_name', 'user__username', 'specialty__name', 'description'
+    )
+    for pk, first_name, last_name, username, specialty, description in rows:
+        name = f"{first_name or ''} {last_name or ''}".strip() or username
+        yield pk, fold(name), fold(specialty), fold(description)
+
+
+def refresh(queryset, batch_size=1000):
+    """
+    Dựng lại chỉ mục cho các bác sĩ trong `queryset` (model Doctor hoặc model lịch sử
+    trong migration). Bác sĩ không còn tồn tại thì dùng remove().
+    """
+    backend = _backend(queryset.db)
+    if backend is None:
+        return 0
+    documents = list(_documents(queryset))
+    with connections[queryset.db].cursor() as cursor:
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            if backend == "postgresql":
+                cursor.executemany(
+                    "UPDATE doctor_doctor SET search_vector = "
+                    "setweight(to_tsvector('simple', %s), 'A') || "
+                    "setweight(to_tsvector('simple', %s), 'B') || "
+                    "setweight(to_tsvector('simple', %s), 'C') WHERE id = %s",
+                    [(name, specialty, description, pk) for pk, name, specialty, description in batch],
+                )
+            else:
+                ids = [pk for pk, *_ in batch]
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(ids))})", ids
+                )
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, name, specialty, description) VALUES (%s, %s, %s, %s)",
+                    batch,
+                )
+    return len(documents)
+
+
+def remove(doctor_ids, using="default"):
+    """Xoá dòng FTS của bác sĩ đã bị xoá (Postgres: cột nằm trên chính dòng doctor)."""
+    if _backend(using) == "sqlite" and doctor_ids:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(doctor_ids))})",
+                list(doctor_ids),
+            )
+
+
+def search(queryset, query):
+    """
+    Lọc `queryset` (Doctor) theo `query` và sắp theo độ liên quan (annotation search_rank).
+    Từ khoá rỗng / chỉ có ký tự đặc biệt: trả về queryset không đổi.
+    """
+    words = terms(query)
+    if not words:
+        return queryset
+    table = queryset.model._meta.db_table
+    backend = _backend(queryset.db)
+
+    if backend == "postgresql":
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        return (
+            queryset
+            .filter(RawSQL(
+                f"{table}.search_vector @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()
+            ))
+            .annotate(search_rank=RawSQL(
+                f"ts_rank({table}.search_vector, to_tsquery('simple', %s))", [tsquery], output_field=FloatField()
+            ))
+            .order_by('-search_rank', 'id')
+        )
+
+    if backend == "sqlite":
+        match = " ".join(f'"{word}"*' for word in words)
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        return (
+            queryset
+            .filter(RawSQL(
+                f"{table}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+                [match], output_field=BooleanField(),
+            ))
+            .annotate(search_rank=RawSQL(
+                f"(SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)",
+                [match], output_field=FloatField(),
+            ))
+            .order_by('-search_rank', 'id')
+        )
+
+    condition = Q()
+    for word in words:
+        condition &= (
+            Q(user__first_name__icontains=word) | Q(user__last_name__icontains=word)
+            | Q(specialty__name__icontains=word) | Q(description__icontains=word)
+        )
+    return queryset.filter(condition)
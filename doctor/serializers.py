@@ -1,15 +1,23 @@
 from rest_framework import serializers
 from .models import Doctor
 from accounts.models import User
+from accounts.avatars import AvatarField, AvatarThumbnailsField
+from bookingcare.fieldsets import SparseFieldsMixin
 
 
 class  UserSerializer(serializers.ModelSerializer):
+    avatar = AvatarField()
+    avatar_thumbnails = AvatarThumbnailsField()
+
     class Meta:
         model = User
-        fields = ['username', 'email', 'first_name', 'last_name', 'phone', 'avatar', 'role', 'date_joined', 'is_active']
+        fields = [
+            'username', 'email', 'first_name', 'last_name', 'phone', 'avatar', 'avatar_thumbnails',
+            'role', 'date_joined', 'is_active'
+        ]
         read_only_fields = ['username', 'role', 'date_joined', 'is_active']
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
 
     class Meta:
@@ -26,8 +34,9 @@ class DoctorSerializer(serializers.ModelSerializer):
             'is_available',
             'created_at',
             'description',
+            'next_available_at',
         ]
-        read_only_fields = ['id', 'user', 'is_available', 'created_at']
+        read_only_fields = ['id', 'user', 'is_available', 'created_at', 'next_available_at']
 
     def update(self, instance, validated_data):
         """
@@ -44,6 +53,9 @@ class DoctorSerializer(serializers.ModelSerializer):
             user = instance.user
             for attr, value in user_data.items():
                 setattr(user, attr, value)
+            if 'avatar_file' in user_data:
+                # Ảnh mới (hoặc gỡ ảnh) thay thế base64 inline cũ, để migrate_avatars không ghi đè lại
+                user.avatar = None
             user.save()
 
         return instance
\ No newline at end of file
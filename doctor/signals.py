@@ -0,0 +1,71 @@
+# doctor/signals.py
+"""
+Giữ chỉ mục tìm kiếm bác sĩ (search.py) đồng bộ với tên, chuyên khoa và mô tả,
+và làm mới cache danh mục bác sĩ (catalog.py) khi hồ sơ bác sĩ thay đổi.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from specialities.models import Speciality
+from . import catalog, search
+from .models import Doctor
+
+DOCTOR_FIELDS = {'user', 'specialty', 'description'}
+# Bác sĩ ẩn / hiện trong danh mục: next_available_at cần tính lại
+BOOKABLE_FIELDS = {'is_available', 'verificationStatus'}
+USER_FIELDS = {'first_name', 'last_name', 'username'}
+# Các field của User có trong DoctorSerializer
+CATALOG_USER_FIELDS = USER_FIELDS | {'email', 'phone', 'avatar', 'avatar_file', 'role', 'is_active'}
+
+
+def _skipped(raw, update_fields, fields):
+    # update_fields không đụng tới trường được đánh chỉ mục (vd. last_login) thì bỏ qua
+    return raw or (update_fields is not None and not fields & set(update_fields))
+
+
+@receiver(post_save, sender=Doctor)
+def refresh_doctor(sender, instance, raw=False, update_fields=None, using='default', **kwargs):
+    if raw:
+        return
+    if not _skipped(raw, update_fields, DOCTOR_FIELDS):
+        search.refresh(Doctor.objects.using(using).filter(pk=instance.pk))
+    if not _skipped(raw, update_fields, BOOKABLE_FIELDS):
+        from appointments import next_available
+        transaction.on_commit(lambda: next_available.refresh([instance.pk]), using=using)
+    catalog.invalidate()
+
+
+@receiver(post_delete, sender=Doctor)
+def remove_doctor(sender, instance, using='default', **kwargs):
+    search.remove([instance.pk], using=using)
+    catalog.invalidate()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_doctor_user(sender, instance, created=False, raw=False, update_fields=None, using='default', **kwargs):
+    # User mới tạo chưa có hồ sơ bác sĩ; cập nhật last_login... không ảnh hưởng danh mục
+    if created or _skipped(raw, update_fields, CATALOG_USER_FIELDS):
+        return
+    doctors = Doctor.objects.using(using).filter(user_id=instance.pk)
+    if not doctors.exists():
+        return
+    if not _skipped(raw, update_fields, USER_FIELDS):
+        search.refresh(doctors)
+    catalog.invalidate()
+
+
+@receiver(post_save, sender=Speciality)
+def refresh_specialty(sender, instance, created=False, raw=False, update_fields=None, using='default', **kwargs):
+    if raw:
+        return
+    if not created and not _skipped(raw, update_fields, {'name'}):
+        search.refresh(Doctor.objects.using(using).filter(specialty_id=instance.pk))
+    catalog.invalidate()
+
+
+@receiver(post_delete, sender=Speciality)
+def remove_specialty(sender, instance, **kwargs):
+    # Bác sĩ của chuyên khoa bị đặt specialty=NULL bằng UPDATE, không qua Doctor.save()
+    catalog.invalidate()
@@ -3,17 +3,47 @@
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 
+from . import catalog, search
+from bookingcare.fieldsets import SparseQuerysetMixin
 from .models import Doctor
 from .serializers import DoctorSerializer
 
-class DoctorViewSet(viewsets.ModelViewSet):
+# ?ordering= -> thứ tự sắp xếp; giá trị rỗng (NULL) luôn xếp cuối
+ORDERINGS = {
+    'price': [F('price').asc()],
+    '-price': [F('price').desc()],
+    'experience': [F('experience').asc(nulls_last=True)],
+    '-experience': [F('experience').desc(nulls_last=True)],
+    'next_available_at': [F('next_available_at').asc(nulls_last=True)],
+}
+INT_FILTERS = {
+    'price_min': 'price__gte',
+    'price_max': 'price__lte',
+    'experience_min': 'experience__gte',
+}
+MAX_AVAILABLE_WITHIN_DAYS = 60
+# Tham số danh mục được cache (catalog.py); tham số khác đi nhánh truy vấn thường
+CATALOG_PARAMS = {'specialty'}
+
+class DoctorViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet để quản lý Bác sĩ.
     - Cung cấp các hành động CRUD (List, Retrieve, Update, ...).
-    - Hỗ trợ lọc theo chuyên khoa (?specialty=...)
+    - Hỗ trợ lọc theo chuyên khoa (?specialty=...), giá (?price_min=, ?price_max=),
+      kinh nghiệm (?experience_min=) và còn slot trống trong N ngày (?available_within=N)
+    - Sắp xếp ?ordering= price | -price | experience | -experience | next_available_at
+    - Tìm kiếm theo tên, chuyên khoa, mô tả (?q=...), kết quả sắp theo độ liên quan
+    - Danh mục (list không có ?q=) được cache dạng JSON đã render, có ETag / 304
+    - ?fields= / ?expand= chọn field trả về và thu hẹp truy vấn (bookingcare.fieldsets)
     - Cung cấp hành động tùy chỉnh 'my-profile' để bác sĩ tự xem hồ sơ.
     """
     
@@ -27,14 +57,86 @@ class DoctorViewSet(viewsets.ModelViewSet):
         queryset = Doctor.objects.filter(
             is_available=True, 
             verificationStatus="VERIFIED"
-        )
+        ).select_related('user')
         
         # 2. Hỗ trợ lọc theo chuyên khoa (?specialty=ID)
         specialty_id = self.request.query_params.get('specialty')
         if specialty_id:
             queryset = queryset.filter(specialty_id=specialty_id)
-            
+
+        if self.action != 'list':
+            return queryset
+
+        # 3. Tìm kiếm toàn văn (?q=...), không phân biệt dấu, sắp theo độ liên quan
+        query = self.request.query_params.get('q')
+        if query:
+            queryset = search.search(queryset, query)
+
+        # 4. Lọc theo giá / kinh nghiệm / chỗ trống; ?ordering= thay cho thứ tự liên quan
+        return self._filter_list(queryset)
+
+    def _filter_list(self, queryset):
+        params = self.request.query_params
+        for param, lookup in INT_FILTERS.items():
+            raw = params.get(param)
+            if raw:
+                try:
+                    value = int(raw)
+                except ValueError:
+                    raise ValidationError({param: f"{param} phải là số nguyên."})
+                queryset = queryset.filter(**{lookup: value})
+
+        within = params.get('available_within')
+        if within:
+            try:
+                days = int(within)
+                if not 1 <= days <= MAX_AVAILABLE_WITHIN_DAYS:
+                    raise ValueError
+            except ValueError:
+                raise ValidationError({
+                    "available_within": f"available_within phải là số ngày từ 1 đến {MAX_AVAILABLE_WITHIN_DAYS}."
+                })
+            # Slot trống sớm nhất nằm trước hết ngày thứ N (tính cả hôm nay)
+            until = timezone.localdate() + timedelta(days=days)
+            queryset = queryset.filter(next_available_at__lt=timezone.make_aware(datetime.combine(until, time.min)))
+
+        ordering = params.get('ordering')
+        if ordering:
+            if ordering not in ORDERINGS:
+                raise ValidationError({"ordering": f"ordering phải là một trong: {', '.join(ORDERINGS)}."})
+            queryset = queryset.order_by(*ORDERINGS[ordering], 'id')
         return queryset
+
+    def get_authenticators(self):
+        # Danh mục chỉ cần token hợp lệ: không nạp User từ DB để request 304 không chạm DB
+        if self.action_map.get(self.request.method.lower()) == 'list':
+            return [JWTStatelessUserAuthentication()]
+        return super().get_authenticators()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Danh mục bác sĩ, cache theo (chuyên khoa, version danh mục).
+        Trả 304 nếu If-None-Match trùng ETag hiện tại. Tìm kiếm, lọc / sắp xếp khác
+        và các định dạng khác JSON (browsable API) không dùng cache.
+        """
+        params = request.query_params
+        specialty_id = params.get('specialty') or None
+        if (set(params) - CATALOG_PARAMS or request.accepted_renderer.format != 'json'
+                or not (specialty_id or '0').isdigit()):
+            return super().list(request, *args, **kwargs)
+
+        version = catalog.current_version()
+        tag = catalog.etag(specialty_id, version)
+        headers = {'ETag': tag, 'Cache-Control': 'private, no-cache'}
+        if catalog.matches(request.headers.get('If-None-Match'), tag):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        content = catalog.get_content(specialty_id, version)
+        if content is None:
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            content = JSONRenderer().render(serializer.data)
+            catalog.set_content(specialty_id, version, content)
+        return HttpResponse(content, content_type='application/json', headers=headers)
     
     # 2. QUYỀN HẠN (Permissions)
     def get_permissions(self):
@@ -0,0 +1,34 @@
+# notifications/management/commands/drain_notification_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications import outbox
+
+
+class Command(BaseCommand):
+    help = "Chuyển thông báo từ outbox sang Notification theo lô. Dùng --loop để chạy như worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true', help="Chạy liên tục, nghỉ --interval giây khi outbox rỗng.")
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if not options['loop']:
+            processed, created = outbox.drain(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f"Đã xử lý {processed} dòng outbox, tạo {created} thông báo."
+            ))
+            return
+
+        try:
+            while True:
+                processed, created = outbox.drain_batch(batch_size)
+                if processed:
+                    self.stdout.write(f"Đã xử lý {processed} dòng outbox, tạo {created} thông báo.")
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS("Đã dừng worker outbox."))
@@ -0,0 +1,48 @@
+# notifications/management/commands/purge_notifications.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications import retention
+
+
+class Command(BaseCommand):
+    help = "Xoá (và tùy chọn lưu trữ) thông báo đã đọc cũ hơn --days ngày, theo từng lô."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=retention.DEFAULT_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0, help="Nghỉ giữa các lô (giây) để giảm tải DB.")
+        parser.add_argument('--archive', help="Ghi thông báo (JSON lines, .gz để nén) vào file trước khi xoá.")
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ đếm số dòng sẽ bị xoá.")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] <= 0:
+            raise CommandError("--days phải >= 0 và --batch-size phải > 0.")
+
+        if options['dry_run']:
+            count = retention.expired_queryset(options['days']).count()
+            self.stdout.write(f"Sẽ xoá {count} thông báo đã đọc cũ hơn {options['days']} ngày.")
+            return
+
+        archive = retention.open_archive(options['archive']) if options['archive'] else None
+        started = time.monotonic()
+        total = 0
+        try:
+            for deleted in retention.purge_read(options['days'], options['batch_size'], archive=archive):
+                total += deleted
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"Đã xoá {total} thông báo ({total / elapsed if elapsed else 0:.0f} dòng/giây)."
+                )
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            if archive is not None:
+                archive.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Hoàn tất: xoá {total} thông báo trong {elapsed:.1f}s "
+            f"({total / elapsed if elapsed else 0:.0f} dòng/giây)."
+        ))
@@ -1,9 +1,81 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from accounts.models import User
 
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    message = models.TextField()
+    # Thông báo mới lưu mã mẫu + params và được dựng câu lúc đọc (notifications.registry);
+    # message chỉ còn dùng cho thông báo cũ / nội dung tự do.
+    message = models.TextField(blank=True, default='')
+    template = models.CharField(max_length=50, blank=True, default='')
+    params = models.JSONField(default=dict, blank=True)
     type = models.CharField(max_length=50)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_read']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Tạo thông báo chưa đọc thì cộng NotificationCounter.unread của user."""
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding and not self.is_read:
+                NotificationCounter.objects.adjust(self.user_id, 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self.is_read:
+                NotificationCounter.objects.adjust(self.user_id, -1)
+            return super().delete(*args, **kwargs)
+
+
+class NotificationCounterManager(models.Manager):
+    def adjust(self, user_id, delta):
+        """Cộng/trừ số chưa đọc của user bằng F() (tạo dòng nếu chưa có), không để giá trị âm."""
+        return self.add_many({user_id: delta})
+
+    def add_many(self, deltas):
+        """`deltas` = {user_id: delta}; một câu UPDATE cho mỗi giá trị delta khác nhau."""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        self.bulk_create([self.model(user_id=user_id) for user_id in deltas], ignore_conflicts=True)
+        by_delta = defaultdict(list)
+        for user_id, delta in deltas.items():
+            by_delta[delta].append(user_id)
+        for delta, user_ids in by_delta.items():
+            self.filter(user_id__in=user_ids).update(unread=Greatest(F('unread') + delta, 0))
+
+
+class NotificationCounter(models.Model):
+    """
+    Số thông báo chưa đọc của mỗi user, phục vụ badge (GET /api/notifications/unread-count/)
+    mà không phải đếm bảng Notification. Cập nhật bằng F() khi tạo thông báo
+    (Notification.save, outbox.drain_batch), khi đổi is_read và khi mark-all-read.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    unread = models.PositiveIntegerField(default=0)
+
+    objects = NotificationCounterManager()
+
+
+class NotificationOutbox(models.Model):
+    """
+    Thông báo chờ phát. Ghi cùng transaction với thay đổi lịch hẹn (xem
+    notifications.outbox.enqueue); lệnh drain_notification_outbox chuyển sang
+    Notification theo lô rồi xoá khỏi outbox.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    message = models.TextField(blank=True, default='')
+    template = models.CharField(max_length=50, blank=True, default='')
+    params = models.JSONField(default=dict, blank=True)
+    type = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,82 @@
+# notifications/outbox.py
+"""
+Transactional outbox cho thông báo.
+
+Request chỉ chèn dòng NotificationOutbox trong CÙNG transaction với thay đổi
+nghiệp vụ (rollback thì thông báo cũng mất, commit thì chắc chắn được phát).
+Worker `python manage.py drain_notification_outbox` chuyển outbox sang
+Notification theo lô lớn; các dòng trùng (user, type, template, params) trong
+cùng một lô được gộp lại thành một thông báo. Outbox chỉ chứa mã mẫu + params
+(xem notifications.registry), câu hiển thị được dựng lúc đọc. Sau khi commit,
+các stream SSE của user liên quan được đánh thức qua notifications.pubsub.
+"""
+import json
+from collections import Counter
+
+from django.db import transaction
+
+from .models import Notification, NotificationCounter, NotificationOutbox
+from .pubsub import get_broker
+
+
+def enqueue(users, notif_type, params=None, template=None):
+    """
+    Đưa một thông báo cho nhiều user vào outbox (bỏ qua user None).
+    `template` là mã mẫu trong notifications.registry, mặc định trùng `notif_type`.
+    """
+    return enqueue_many((user, notif_type, template or notif_type, params or {}) for user in users)
+
+
+def enqueue_many(entries):
+    """Đưa nhiều thông báo (user, type, template, params) vào outbox bằng một câu INSERT."""
+    rows = [
+        NotificationOutbox(user=user, type=notif_type, template=template, params=params)
+        for user, notif_type, template, params in entries if user is not None
+    ]
+    if rows:
+        NotificationOutbox.objects.bulk_create(rows)
+    return len(rows)
+
+
+def drain_batch(batch_size=1000):
+    """
+    Chuyển tối đa `batch_size` dòng outbox (cũ nhất trước) sang Notification.
+    Trả về (số dòng outbox đã xử lý, số Notification đã tạo).
+    Trên PostgreSQL nhiều worker chạy song song được nhờ SKIP LOCKED.
+    """
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        pending = {}
+        for row in rows:
+            key = (row.user_id, row.type, row.template, json.dumps(row.params, sort_keys=True), row.message)
+            pending.setdefault(key, row)
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=row.user_id, type=row.type, template=row.template,
+                params=row.params, message=row.message,
+            )
+            for row in pending.values()
+        ])
+        NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).delete()
+        # bulk_create không gọi Notification.save(): cộng bộ đếm chưa đọc tại đây
+        created_per_user = Counter(row.user_id for row in pending.values())
+        NotificationCounter.objects.add_many(created_per_user)
+        user_ids = set(created_per_user)
+        transaction.on_commit(lambda: get_broker().publish(user_ids))
+    return len(rows), len(pending)
+
+
+def drain(batch_size=1000):
+    """Drain outbox tới khi rỗng. Trả về (số dòng outbox đã xử lý, số Notification đã tạo)."""
+    processed = created = 0
+    while True:
+        batch_processed, batch_created = drain_batch(batch_size)
+        if not batch_processed:
+            return processed, created
+        processed += batch_processed
+        created += batch_created
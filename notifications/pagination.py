@@ -0,0 +1,7 @@
+# notifications/pagination.py
+from bookingcare.pagination import KeysetPagination
+
+
+class NotificationCursorPagination(KeysetPagination):
+    """Phân trang hộp thư theo khoá (created_at, id), mới nhất trước."""
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,120 @@
+# notifications/pubsub.py
+"""
+Pub/sub báo "user X có thông báo mới" cho luồng SSE (NotificationViewSet.stream).
+
+Thông báo được tạo trong tiến trình worker (drain_notification_outbox --loop),
+còn stream chạy trong các tiến trình web, nên cần broker liên tiến trình:
+
+- RedisBroker: PUBLISH lên kênh Redis; mỗi tiến trình web có một thread nhận tin
+  và đánh thức các stream của nó. Cấu hình (docker-compose đã đặt sẵn):
+
+      NOTIFICATIONS_BROKER = "notifications.pubsub.RedisBroker"
+      NOTIFICATIONS_REDIS_URL = "redis://redis:6379/0"
+
+- InProcessBroker (mặc định, dev / test): threading.Event, chỉ đánh thức stream
+  cùng tiến trình với nơi publish. Với worker riêng, stream chỉ nhận thông báo
+  nhờ tự kiểm tra DB sau mỗi STREAM_POLL_SECONDS (polling, trễ tối đa ~15s).
+
+Broker cần có publish(user_ids) và subscribe(user_id) -> đối tượng có
+wait(timeout) -> bool và close().
+"""
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = "notifications.pubsub.InProcessBroker"
+
+
+class _Subscription:
+    def __init__(self, broker, user_id):
+        self._broker = broker
+        self.user_id = user_id
+        self.event = threading.Event()
+
+    def wait(self, timeout):
+        """Chờ tới khi có publish cho user hoặc hết timeout; trả về True nếu được đánh thức."""
+        woken = self.event.wait(timeout)
+        self.event.clear()
+        return woken
+
+    def close(self):
+        self._broker._unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscription = _Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_ids):
+        self._wake(user_ids)
+
+    def _wake(self, user_ids):
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscriptions.get(user_id, ())]
+        for subscription in targets:
+            subscription.event.set()
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Pub/sub qua kênh Redis CHANNEL, tin nhắn là danh sách user id ("3,17").
+    Thread nhận tin chỉ được bật ở tiến trình có stream (lần subscribe đầu tiên);
+    worker outbox chỉ PUBLISH. Lỗi Redis khi publish được bỏ qua: stream vẫn
+    nhận thông báo ở lần kiểm tra DB kế tiếp.
+    """
+    CHANNEL = "notifications:new"
+
+    def __init__(self):
+        import redis
+
+        super().__init__()
+        self._errors = redis.RedisError
+        self._redis = redis.Redis.from_url(settings.NOTIFICATIONS_REDIS_URL)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.CHANNEL: self._on_message})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _on_message(self, message):
+        self._wake(int(user_id) for user_id in message["data"].split(b",") if user_id)
+
+    def publish(self, user_ids):
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        try:
+            self._redis.publish(self.CHANNEL, ",".join(map(str, user_ids)))
+        except self._errors:
+            pass
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, "NOTIFICATIONS_BROKER", DEFAULT_BROKER))()
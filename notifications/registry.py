@@ -0,0 +1,85 @@
+# notifications/registry.py
+"""
+Registry mẫu thông báo: Notification chỉ lưu mã mẫu (template) + params gọn
+(vd. {"appointment": 12, "slot": "2026-10-20 09:00"}); câu hiển thị được dựng
+lúc đọc. Muốn đổi câu chữ hoặc dịch chỉ cần sửa TEMPLATES, không đụng dữ liệu.
+
+- Mỗi mẫu được tách sẵn (precompile) thành các đoạn chữ / tên tham số khi import.
+- Tên bệnh nhân / bác sĩ ({patient}, {doctor}) không lưu trong params mà lấy từ
+  lịch hẹn `params["appointment"]`; prefetch() nạp cho cả một trang thông báo
+  bằng một truy vấn.
+- Render mỗi lần đọc chỉ ghép các đoạn đã tách sẵn với giá trị tham số, không cache
+  theo params (params chứa id lịch hẹn nên gần như không bao giờ trùng).
+"""
+from string import Formatter
+
+TEMPLATES = {
+    "appointment_created": "Bệnh nhân {patient} đã đặt lịch hẹn mới vào {slot}.",
+    "appointment_canceled": "Bệnh nhân {patient} đã hủy lịch hẹn vào {slot}.",
+    "appointment_canceled_by_doctor": "Bác sĩ {doctor} đã hủy lịch hẹn vào {slot}.",
+    "appointment_confirmed": "Lịch hẹn với bác sĩ {doctor} vào {slot} đã được xác nhận.",
+    "appointment_completed": (
+        "Buổi khám với bác sĩ {doctor} vào {slot} đã hoàn thành. Vui lòng xem hồ sơ khám."
+    ),
+    "appointment_rescheduled_doctor": "Bệnh nhân đã đổi lịch hẹn sang {slot}.",
+    "appointment_rescheduled_patient": "Lịch hẹn của bạn đã được đổi sang {slot} và đang chờ xác nhận.",
+}
+
+# Tham số lấy từ lịch hẹn lúc đọc, không lưu trong params
+APPOINTMENT_FIELDS = {"patient", "doctor"}
+
+
+def _compile(text):
+    return tuple((literal, field or None) for literal, field, _, _ in Formatter().parse(text))
+
+
+COMPILED = {code: _compile(text) for code, text in TEMPLATES.items()}
+_NEEDS_APPOINTMENT = {
+    code for code, parts in COMPILED.items()
+    if any(field in APPOINTMENT_FIELDS for _, field in parts)
+}
+
+
+def _render(template, context):
+    return "".join(
+        literal + (str(context.get(field, "")) if field else "")
+        for literal, field in COMPILED[template]
+    )
+
+
+def _display_name(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def prefetch(notifications):
+    """Nạp tên bệnh nhân / bác sĩ cho các thông báo cần, bằng một truy vấn."""
+    from appointments.models import Appointment
+
+    pending = [
+        notification for notification in notifications
+        if notification.template in _NEEDS_APPOINTMENT and not hasattr(notification, '_render_names')
+    ]
+    if not pending:
+        return
+    ids = {notification.params.get("appointment") for notification in pending}
+    rows = Appointment.objects.filter(id__in=ids).values_list(
+        'id',
+        'patient__user__first_name', 'patient__user__last_name', 'patient__user__username',
+        'doctor__user__first_name', 'doctor__user__last_name', 'doctor__user__username',
+    )
+    names = {
+        row[0]: {"patient": _display_name(*row[1:4]), "doctor": _display_name(*row[4:7])}
+        for row in rows
+    }
+    for notification in pending:
+        notification._render_names = names.get(notification.params.get("appointment"), {})
+
+
+def render(notification):
+    """Câu hiển thị của thông báo; thông báo cũ (không có template) trả về message đã lưu."""
+    if notification.template not in COMPILED:
+        return notification.message
+    if notification.template in _NEEDS_APPOINTMENT:
+        prefetch([notification])
+    context = {**notification.params, **getattr(notification, '_render_names', {})}
+    return _render(notification.template, context)
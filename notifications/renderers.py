@@ -0,0 +1,20 @@
+# notifications/renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Cho phép content negotiation chấp nhận `Accept: text/event-stream`.
+    Luồng sự kiện trả về StreamingHttpResponse nên không đi qua renderer; renderer
+    chỉ dùng cho phản hồi lỗi (401, 400...) trước khi stream bắt đầu.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return f"event: error\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode(self.charset)
@@ -0,0 +1,63 @@
+# notifications/retention.py
+"""
+Dọn thông báo ĐÃ ĐỌC cũ hơn một mốc thời gian, theo từng lô nhỏ.
+
+Mỗi lô là một transaction ngắn: chọn tối đa `batch_size` id (theo id tăng dần)
+rồi DELETE ... WHERE id IN (...) AND is_read, nên không giữ khoá lâu và chạy
+được khi API đang hoạt động. Thông báo chưa đọc không bao giờ bị xoá, nên
+NotificationCounter không bị ảnh hưởng; điều kiện is_read được kiểm tra lại lúc
+DELETE phòng khi user vừa đánh dấu chưa đọc.
+
+Archive giữ cả template + params lẫn câu hiển thị đã dựng (message): thông báo
+mới chỉ lưu mã mẫu nên câu chữ phải được render trước khi dòng bị xoá.
+"""
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import registry
+from .models import Notification
+
+DEFAULT_RETENTION_DAYS = getattr(settings, "NOTIFICATION_RETENTION_DAYS", 90)
+ARCHIVE_FIELDS = ('id', 'user_id', 'type', 'template', 'params', 'message', 'created_at')
+
+
+def expired_queryset(older_than_days=DEFAULT_RETENTION_DAYS, now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+    return Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+
+def purge_read(older_than_days=DEFAULT_RETENTION_DAYS, batch_size=1000, archive=None, now=None):
+    """
+    Xoá theo lô; là generator trả về số dòng đã xoá của từng lô (để báo tiến độ).
+    `archive`: file (mở ở chế độ text) để ghi mỗi thông báo một dòng JSON trước khi xoá.
+    """
+    queryset = expired_queryset(older_than_days, now).order_by('id')
+    last_id = 0
+    while True:
+        if archive is None:
+            ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        else:
+            rows = list(queryset.filter(id__gt=last_id).only(*ARCHIVE_FIELDS)[:batch_size])
+            registry.prefetch(rows)
+            for row in rows:
+                record = {field: getattr(row, field) for field in ARCHIVE_FIELDS}
+                record['message'] = registry.render(row)
+                archive.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+            ids = [row.id for row in rows]
+        if not ids:
+            return
+        last_id = ids[-1]
+        deleted, _ = Notification.objects.filter(id__in=ids, is_read=True).delete()
+        yield deleted
+
+
+def open_archive(path):
+    """Mở file archive (gzip nếu đuôi .gz) ở chế độ ghi nối thêm."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'at', encoding='utf-8')
+    return open(path, 'a', encoding='utf-8')
@@ -1,11 +1,25 @@
 from rest_framework import serializers
 
+from . import registry
 from .models import Notification
 
 
+class NotificationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Nạp tên bệnh nhân / bác sĩ cho cả trang bằng một truy vấn trước khi dựng câu
+        items = list(data.all() if hasattr(data, 'all') else data)
+        registry.prefetch(items)
+        return super().to_representation(items)
+
+
 class NotificationSerializer(serializers.ModelSerializer):
+    message = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'user', 'message', 'type', 'is_read', 'created_at']
-        read_only_fields = ['id', 'user', 'message', 'type', 'created_at']
+        fields = ['id', 'user', 'message', 'template', 'params', 'type', 'is_read', 'created_at']
+        read_only_fields = ['id', 'user', 'message', 'template', 'params', 'type', 'created_at']
+        list_serializer_class = NotificationListSerializer
 
+    def get_message(self, obj):
+        return registry.render(obj)
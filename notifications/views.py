@@ -1,12 +1,33 @@
+import json
+import time
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework import mixins, viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import Notification
+from . import registry
+from .models import Notification, NotificationCounter
+from .pagination import NotificationCursorPagination
+from .pubsub import get_broker
+from .renderers import EventStreamRenderer
 from .serializers import NotificationSerializer
 
+# Stream tự đóng sau STREAM_MAX_SECONDS để không giữ worker mãi; EventSource tự
+# kết nối lại (sau STREAM_RETRY_MS) và gửi Last-Event-ID để tiếp tục. Mỗi stream giữ
+# một thread: chạy gunicorn với --worker-class gthread (xem Dockerfile).
+# Ngoài việc được broker đánh thức, stream tự kiểm tra DB sau mỗi STREAM_POLL_SECONDS
+# (dự phòng khi broker không liên tiến trình / Redis lỗi).
+STREAM_MAX_SECONDS = 55
+STREAM_POLL_SECONDS = 15
+STREAM_RETRY_MS = 3000
+STREAM_BATCH_SIZE = 100
+
 
 class NotificationViewSet(mixins.ListModelMixin,
                           mixins.RetrieveModelMixin,
@@ -15,11 +36,12 @@ class NotificationViewSet(mixins.ListModelMixin,
     serializer_class = NotificationSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
 
     def get_queryset(self):
         return Notification.objects.filter(
             user=self.request.user
-        ).order_by('-created_at')
+        ).order_by('-created_at', '-id')
 
     def update(self, request, *args, **kwargs):
         if 'is_read' not in request.data:
@@ -29,7 +51,77 @@ class NotificationViewSet(mixins.ListModelMixin,
             )
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        """Chỉ ghi is_read khi giá trị thực sự đổi, đồng thời cập nhật bộ đếm chưa đọc."""
+        notification = serializer.instance
+        is_read = serializer.validated_data.get('is_read', notification.is_read)
+        with transaction.atomic():
+            changed = Notification.objects.filter(
+                pk=notification.pk, is_read=not is_read
+            ).update(is_read=is_read)
+            if changed:
+                NotificationCounter.objects.adjust(notification.user_id, -1 if is_read else 1)
+        notification.is_read = is_read
+
     @action(detail=False, methods=['post'], url_path='mark-all-read')
     def mark_all_read(self, request):
-        updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+        with transaction.atomic():
+            updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+            if updated:
+                NotificationCounter.objects.adjust(request.user.id, -updated)
         return Response({"updated": updated}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """Số thông báo chưa đọc (badge), đọc từ NotificationCounter: một truy vấn theo khoá chính."""
+        unread = NotificationCounter.objects.filter(user_id=request.user.id).values_list('unread', flat=True).first()
+        return Response({"unread": unread or 0}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='stream',
+            renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def stream(self, request):
+        """
+        Server-Sent Events: đẩy thông báo mới của user theo thứ tự id.
+        Cursor là header Last-Event-ID (trình duyệt tự gửi khi kết nối lại) hoặc
+        ?last_event_id=. Không có cursor thì chỉ nhận thông báo tạo sau khi kết nối.
+        """
+        user_id = request.user.id
+        raw_cursor = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        if raw_cursor is None:
+            last_id = Notification.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+        else:
+            try:
+                last_id = int(raw_cursor)
+            except ValueError:
+                raise ValidationError({"last_event_id": "last_event_id phải là số nguyên."})
+
+        def events(cursor):
+            # Đăng ký trước khi truy vấn để không lỡ publish xảy ra giữa truy vấn và lúc chờ
+            subscription = get_broker().subscribe(user_id)
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            try:
+                yield f"retry: {STREAM_RETRY_MS}\n\n"
+                while True:
+                    batch = list(
+                        Notification.objects.filter(user_id=user_id, id__gt=cursor)
+                        .order_by('id')[:STREAM_BATCH_SIZE]
+                    )
+                    registry.prefetch(batch)
+                    for notification in batch:
+                        cursor = notification.id
+                        data = json.dumps(NotificationSerializer(notification).data, ensure_ascii=False)
+                        yield f"id: {notification.id}\nevent: notification\ndata: {data}\n\n"
+                    if len(batch) == STREAM_BATCH_SIZE:
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    if not subscription.wait(min(STREAM_POLL_SECONDS, remaining)):
+                        yield ": keep-alive\n\n"
+            finally:
+                subscription.close()
+
+        response = StreamingHttpResponse(events(last_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
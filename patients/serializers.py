@@ -1,15 +1,19 @@
 from rest_framework import serializers
 from .models import Patient
 from accounts.models import User
+from accounts.avatars import AvatarField, AvatarThumbnailsField
 
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer cho user, bao gồm cả các thông tin cá nhân"""
+    avatar = AvatarField()
+    avatar_thumbnails = AvatarThumbnailsField()
+
     class Meta:
         model = User
         fields = [
             'username', 'email', 'first_name', 'last_name', 
-            'phone', 'avatar', 'role', 'date_joined', 'is_active',
+            'phone', 'avatar', 'avatar_thumbnails', 'role', 'date_joined', 'is_active',
             'birthday', 'gender', 'address', 'cccd', 'ethinic_group'
         ]
         read_only_fields = ['username', 'role', 'date_joined', 'is_active']
@@ -44,6 +48,9 @@ class PatientSerializer(serializers.ModelSerializer):
             user = instance.user
             for attr, value in user_data.items():
                 setattr(user, attr, value)
+            if 'avatar_file' in user_data:
+                # Ảnh mới (hoặc gỡ ảnh) thay thế base64 inline cũ, để migrate_avatars không ghi đè lại
+                user.avatar = None
             user.save()
 
         return instance
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Benchmark cho /api/appointments/available-slots/.
+
+So sánh cách tính cũ (Schedule.get + count() + values_list + strftime từng bước)
+với SlotOccupancy (1 truy vấn + bitset). Chạy trên test database tạm thời nên
+không đụng vào dữ liệu thật:
+
+    DB_ENGINE=django.db.backends.sqlite3 python scripts/bench_available_slots.py
+"""
+import os
+import sys
+import time as clock
+import django
+from pathlib import Path
+from datetime import date, datetime, time, timedelta
+
+# Setup Django
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bookingcare.settings")
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from accounts.models import User
+from appointments.models import Appointment
+from appointments.occupancy import SlotOccupancy, earliest_bookable_minute
+from availability.models import Schedule
+from doctor.models import Doctor
+from patients.models import Patient
+
+ITERATIONS = 500
+BOOKED_HOURS = range(8, 17, 2)
+
+
+def legacy_available_slots(doctor_id, appointment_date, slot_duration=30):
+    """Bản sao logic cũ của AppointmentViewSet.available_slots."""
+    doctor = Doctor.objects.get(id=doctor_id, is_available=True, verificationStatus="VERIFIED")
+    schedule = Schedule.objects.get(doctor=doctor, date=appointment_date, is_available=True)
+    if schedule.max_patients is not None:
+        booked_count = Appointment.objects.filter(
+            doctor=doctor, date=appointment_date, status__in=["pending", "confirmed"]
+        ).count()
+        if booked_count >= schedule.max_patients:
+            return []
+    existing_times = set(
+        Appointment.objects.filter(
+            doctor=doctor, date=appointment_date, status__in=["pending", "confirmed"]
+        ).values_list('time', flat=True)
+    )
+    tz = timezone.get_current_timezone()
+    start_dt = timezone.make_aware(datetime.combine(appointment_date, schedule.start_time), tz)
+    end_dt = timezone.make_aware(datetime.combine(appointment_date, schedule.end_time), tz)
+    now = timezone.now()
+    delta = timedelta(minutes=slot_duration)
+    slots = []
+    current = start_dt
+    while current + delta <= end_dt:
+        if current >= now and current.time() not in existing_times:
+            slots.append(current.strftime("%H:%M"))
+        current += delta
+    return slots
+
+
+def occupancy_available_slots(doctor_id, appointment_date, slot_duration=30):
+    occupancy = SlotOccupancy.load(doctor_id, appointment_date, bookable_doctor=True)
+    if occupancy.is_full:
+        return []
+    return occupancy.free_slots(slot_duration, not_before=earliest_bookable_minute(appointment_date))
+
+
+def seed():
+    tomorrow = date.today() + timedelta(days=1)
+    doctor_user = User.objects.create_user(username="bench_doctor", password="x", gender="male")
+    doctor = Doctor.objects.create(user=doctor_user, price=0, verificationStatus="VERIFIED")
+    Schedule.objects.create(
+        doctor=doctor, date=tomorrow,
+        start_time=time(8, 0), end_time=time(17, 0), max_patients=20
+    )
+    for hour in BOOKED_HOURS:
+        user = User.objects.create_user(username=f"bench_patient_{hour}", password="x", gender="male")
+        Appointment.objects.create(
+            doctor=doctor, patient=Patient.objects.create(user=user),
+            date=tomorrow, time=time(hour, 0), status="pending"
+        )
+    return doctor.id, tomorrow
+
+
+def measure(label, func, doctor_id, appointment_date):
+    with CaptureQueriesContext(connection) as queries:
+        result = func(doctor_id, appointment_date)
+    started = clock.perf_counter()
+    for _ in range(ITERATIONS):
+        func(doctor_id, appointment_date)
+    elapsed_ms = (clock.perf_counter() - started) * 1000 / ITERATIONS
+    print(f"{label:<12} {len(queries):>3} queries  {elapsed_ms:8.3f} ms/request  {len(result)} slots")
+    return result
+
+
+if __name__ == "__main__":
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        doctor_id, appointment_date = seed()
+        legacy = measure("legacy", legacy_available_slots, doctor_id, appointment_date)
+        current = measure("occupancy", occupancy_available_slots, doctor_id, appointment_date)
+        assert legacy == current, "Hai cách tính cho kết quả khác nhau"
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
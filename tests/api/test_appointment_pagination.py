@@ -0,0 +1,80 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from appointments.models import Appointment
+
+@pytest.mark.django_db
+class TestAppointmentKeysetPagination:
+
+    @pytest.fixture
+    def patient(self):
+        patient = PatientFactory()
+        doctor = DoctorFactory()
+        start = date.today() + timedelta(days=1)
+        # Nhiều lịch cùng ngày để cursor phải so sánh cả time và id
+        for offset in range(3):
+            for hour in (8, 9, 10):
+                Appointment.objects.create(
+                    doctor=doctor, patient=patient,
+                    date=start + timedelta(days=offset), time=time(hour, 0),
+                    status='canceled' if hour == 10 else 'pending'
+                )
+        return patient
+
+    def test_walks_all_pages_in_order(self, api_client, patient):
+        api_client.force_authenticate(user=patient.user)
+        seen = []
+        url = reverse('appointment-list') + '?page_size=4'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend((a['date'], a['time'], a['id']) for a in response.data['results'])
+            url = response.data['next']
+
+        assert len(seen) == 9
+        assert len({item[2] for item in seen}) == 9
+        assert seen == sorted(seen, reverse=True)
+
+    def test_previous_link_returns_prior_page(self, api_client, patient):
+        api_client.force_authenticate(user=patient.user)
+        first = api_client.get(reverse('appointment-list'), {'page_size': 4})
+        assert first.data['previous'] is None
+
+        second = api_client.get(first.data['next'])
+        back = api_client.get(second.data['previous'])
+        assert [a['id'] for a in back.data['results']] == [a['id'] for a in first.data['results']]
+
+    def test_cursor_uses_row_value_comparison(self, api_client, patient, django_assert_max_num_queries):
+        """Trang sau cursor lọc bằng (date, time, id) < (...) thay cho chuỗi OR"""
+        api_client.force_authenticate(user=patient.user)
+        first = api_client.get(reverse('appointment-list'), {'page_size': 4})
+
+        with django_assert_max_num_queries(10) as captured:
+            api_client.get(first.data['next'])
+        page_sql = next(q['sql'] for q in captured.captured_queries if 'LIMIT' in q['sql'])
+        assert '"appointments_appointment"."date", "appointments_appointment"."time", ' \
+               '"appointments_appointment"."id") <' in page_sql
+
+    def test_status_and_date_filters(self, api_client, patient):
+        api_client.force_authenticate(user=patient.user)
+        day = date.today() + timedelta(days=2)
+        response = api_client.get(reverse('appointment-list'), {
+            'status': 'pending',
+            'date_from': day.isoformat(),
+            'date_to': day.isoformat(),
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        assert [a['time'] for a in results] == ['09:00:00', '08:00:00']
+        assert all(a['status'] == 'pending' and a['date'] == day.isoformat() for a in results)
+
+    def test_invalid_filters_and_cursor(self, api_client, patient):
+        api_client.force_authenticate(user=patient.user)
+        url = reverse('appointment-list')
+
+        assert api_client.get(url, {'status': 'unknown'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'date_from': '2026-13-40'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'cursor': 'not-a-cursor'}).status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,59 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import UserFactory, DoctorFactory, PatientFactory
+from specialities.models import Speciality
+from appointments.models import Appointment
+
+# Trần số truy vấn cho GET /api/appointments/, không phụ thuộc số lịch hẹn
+MAX_LIST_QUERIES = 4
+APPOINTMENT_COUNT = 12
+
+@pytest.mark.django_db
+class TestAppointmentListQueryBudget:
+
+    @pytest.fixture
+    def appointments(self):
+        specialty = Speciality.objects.create(name="Da liễu", description="")
+        doctor = DoctorFactory(specialty=specialty)
+        patient = PatientFactory()
+        start = date.today() + timedelta(days=1)
+        for offset in range(APPOINTMENT_COUNT):
+            Appointment.objects.create(
+                doctor=doctor, patient=patient,
+                date=start + timedelta(days=offset), time=time(9, 0), status='pending'
+            )
+        return doctor, patient
+
+    def test_staff_list_query_budget(self, api_client, appointments, django_assert_max_num_queries):
+        staff = UserFactory(is_staff=True)
+        api_client.force_authenticate(user=staff)
+        with django_assert_max_num_queries(MAX_LIST_QUERIES):
+            response = api_client.get(reverse('appointment-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == APPOINTMENT_COUNT
+
+    def test_doctor_list_query_budget(self, api_client, appointments, django_assert_max_num_queries):
+        doctor, _ = appointments
+        api_client.force_authenticate(user=doctor.user)
+        with django_assert_max_num_queries(MAX_LIST_QUERIES):
+            response = api_client.get(reverse('appointment-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['doctor']['specialty']['name'] == "Da liễu"
+
+    def test_patient_list_query_budget(self, api_client, appointments, django_assert_max_num_queries):
+        _, patient = appointments
+        api_client.force_authenticate(user=patient.user)
+        with django_assert_max_num_queries(MAX_LIST_QUERIES):
+            response = api_client.get(reverse('appointment-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == APPOINTMENT_COUNT
+
+    def test_retrieve_query_budget(self, api_client, appointments, django_assert_max_num_queries):
+        _, patient = appointments
+        appointment = Appointment.objects.filter(patient=patient).first()
+        api_client.force_authenticate(user=patient.user)
+        with django_assert_max_num_queries(MAX_LIST_QUERIES):
+            response = api_client.get(reverse('appointment-detail', kwargs={'pk': appointment.id}))
+        assert response.status_code == status.HTTP_200_OK
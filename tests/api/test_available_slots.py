@@ -0,0 +1,234 @@
+import json
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from availability.models import Schedule
+from appointments.models import Appointment
+
+@pytest.mark.django_db
+class TestAvailableSlots:
+
+    def test_booked_slots_are_hidden(self, api_client):
+        """Slot đã có lịch pending/confirmed không được trả về, slot đã hủy thì có"""
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(10, 0)
+        )
+        Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=tomorrow, time=time(8, 30), status='confirmed'
+        )
+        Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=tomorrow, time=time(9, 0), status='canceled'
+        )
+
+        url = reverse('appointment-available-slots')
+        response = api_client.get(url, {'doctor_id': doctor.id, 'date': tomorrow.isoformat()})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['slots'] == ['08:00', '09:00', '09:30']
+
+    def test_full_day_returns_no_slots(self, api_client):
+        """Đạt max_patients thì không còn slot nào"""
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(17, 0), max_patients=1
+        )
+        Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=tomorrow, time=time(9, 0), status='pending'
+        )
+
+        url = reverse('appointment-available-slots')
+        response = api_client.get(url, {'doctor_id': doctor.id, 'date': tomorrow.isoformat()})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['slots'] == []
+
+    def test_available_slots_query_count(self, api_client, django_assert_num_queries):
+        """Schedule + các giờ đã đặt: một truy vấn; hold đang giữ chỗ: một truy vấn"""
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(17, 0)
+        )
+        for hour in (9, 10, 11):
+            Appointment.objects.create(
+                doctor=doctor, patient=PatientFactory(),
+                date=tomorrow, time=time(hour, 0), status='pending'
+            )
+
+        url = reverse('appointment-available-slots')
+        with django_assert_num_queries(2):
+            response = api_client.get(url, {'doctor_id': doctor.id, 'date': tomorrow.isoformat()})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert '09:00' not in response.data['slots']
+        assert len(response.data['slots']) == 18 - 3
+
+    def test_unknown_doctor_and_missing_schedule(self, api_client):
+        """Phân biệt bác sĩ không hợp lệ và bác sĩ không có lịch"""
+        doctor = DoctorFactory()
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        url = reverse('appointment-available-slots')
+
+        response = api_client.get(url, {'doctor_id': doctor.id, 'date': tomorrow})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "không có lịch" in str(response.data)
+
+        response = api_client.get(url, {'doctor_id': doctor.id + 999, 'date': tomorrow})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "bác sĩ hợp lệ" in str(response.data)
+
+
+@pytest.mark.django_db
+class TestAvailableSlotsRange:
+
+    def test_range_returns_slots_per_doctor_and_day(self, api_client, django_assert_num_queries):
+        """Nhiều bác sĩ x nhiều ngày, số truy vấn không đổi (Schedule, lịch lặp, hold)"""
+        doctor_a = DoctorFactory()
+        doctor_b = DoctorFactory()
+        day_1 = date.today() + timedelta(days=1)
+        day_2 = date.today() + timedelta(days=2)
+        for doctor in (doctor_a, doctor_b):
+            for day in (day_1, day_2):
+                Schedule.objects.create(
+                    doctor=doctor, date=day,
+                    start_time=time(8, 0), end_time=time(9, 30)
+                )
+        Appointment.objects.create(
+            doctor=doctor_b, patient=PatientFactory(),
+            date=day_2, time=time(8, 30), status='pending'
+        )
+
+        url = reverse('appointment-available-slots-range')
+        params = {
+            'doctor_ids': f"{doctor_a.id},{doctor_b.id}",
+            'date_from': day_1.isoformat(),
+            'date_to': day_2.isoformat(),
+        }
+        with django_assert_num_queries(3):
+            response = api_client.get(url, params)
+            body = json.loads(b''.join(response.streaming_content))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [d['doctor_id'] for d in body['doctors']] == [doctor_a.id, doctor_b.id]
+        days_b = body['doctors'][1]['days']
+        assert days_b[0] == {'date': day_1.isoformat(), 'slots': ['08:00', '08:30', '09:00']}
+        assert days_b[1] == {'date': day_2.isoformat(), 'slots': ['08:00', '09:00']}
+
+    def test_range_requires_doctors_and_bounded_window(self, api_client):
+        url = reverse('appointment-available-slots-range')
+        today = date.today()
+
+        response = api_client.get(url, {'date_from': today.isoformat(), 'date_to': today.isoformat()})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = api_client.get(url, {
+            'doctor_ids': '1',
+            'date_from': today.isoformat(),
+            'date_to': (today + timedelta(days=60)).isoformat(),
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_range_caps_number_of_doctor_ids(self, api_client, django_assert_num_queries):
+        from appointments.views import AVAILABLE_RANGE_MAX_DOCTORS
+
+        url = reverse('appointment-available-slots-range')
+        today = date.today().isoformat()
+        ids = ",".join(str(pk) for pk in range(1, AVAILABLE_RANGE_MAX_DOCTORS + 2))
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url, {'doctor_ids': ids, 'date_from': today, 'date_to': today})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert str(AVAILABLE_RANGE_MAX_DOCTORS) in response.data['detail']
+
+        # Id trùng lặp chỉ tính một lần
+        response = api_client.get(url, {
+            'doctor_ids': ",".join(["1"] * (AVAILABLE_RANGE_MAX_DOCTORS + 1)), 'date_from': today, 'date_to': today
+        })
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestAvailableSlotsCache:
+
+    def test_second_read_is_served_from_cache(self, api_client, django_assert_num_queries):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(10, 0)
+        )
+        url = reverse('appointment-available-slots')
+        params = {'doctor_id': doctor.id, 'date': tomorrow.isoformat()}
+
+        first = api_client.get(url, params)
+        with django_assert_num_queries(0):
+            second = api_client.get(url, params)
+
+        assert second.data == first.data
+
+    def test_booking_invalidates_cached_slots(self, api_client, django_capture_on_commit_callbacks):
+        """Đặt lịch qua API phải làm slot biến mất khỏi kết quả đã cache"""
+        doctor = DoctorFactory()
+        patient = PatientFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(10, 0)
+        )
+        url = reverse('appointment-available-slots')
+        params = {'doctor_id': doctor.id, 'date': tomorrow.isoformat()}
+        assert '08:30' in api_client.get(url, params).data['slots']
+
+        api_client.force_authenticate(user=patient.user)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(reverse('appointment-list'), {
+                "doctor_id": doctor.id,
+                "date": tomorrow.isoformat(),
+                "time": "08:30"
+            })
+        assert response.status_code == status.HTTP_201_CREATED
+
+        assert '08:30' not in api_client.get(url, params).data['slots']
+
+    def test_schedule_update_invalidates_cached_slots(self, api_client, django_capture_on_commit_callbacks):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        schedule = Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(10, 0)
+        )
+        url = reverse('appointment-available-slots')
+        params = {'doctor_id': doctor.id, 'date': tomorrow.isoformat()}
+        assert api_client.get(url, params).data['slots'][-1] == '09:30'
+
+        api_client.force_authenticate(user=doctor.user)
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.patch(reverse('schedule-detail', kwargs={'pk': schedule.id}), {"end_time": "11:00"})
+
+        assert api_client.get(url, params).data['slots'][-1] == '10:30'
+
+    def test_result_computed_before_invalidation_is_not_served(self):
+        """set_slots ghi dưới version đã đọc ở get_slots: kết quả tính trước khi version tăng không được dùng"""
+        from appointments import slot_cache
+
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        version, cached = slot_cache.get_slots(doctor.id, tomorrow, 30)
+        assert cached is None
+
+        # Có thay đổi lịch hẹn trong lúc request này đang tính lại
+        slot_cache.bump_version(doctor.id, tomorrow)
+        slot_cache.set_slots(doctor.id, tomorrow, 30, version, False, (480,))
+
+        assert slot_cache.get_slots(doctor.id, tomorrow, 30)[1] is None
@@ -0,0 +1,172 @@
+import base64
+import os
+import pytest
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from tests.factories.user_factory import DoctorFactory, PatientFactory, UserFactory
+from accounts import avatars
+from accounts.models import User
+
+
+def png_bytes(size=(300, 200), color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestAvatarUpload:
+
+    def test_upload_stores_content_addressed_file_and_thumbnails(self, api_client, media_root):
+        user = PatientFactory().user
+        api_client.force_authenticate(user=user)
+        data = png_bytes()
+
+        response = api_client.put(
+            reverse('avatar'), {'avatar': SimpleUploadedFile('a.png', data, 'image/png')}, format='multipart'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        name = avatars.file_name(avatars.process(data)[0], 'png')
+        assert response.data['avatar'] == f"http://testserver/media/{name}"
+        assert set(response.data['avatar_thumbnails']) == {'64', '128', '256'}
+        assert (media_root / name).read_bytes() == data
+        for size in avatars.THUMBNAIL_SIZES:
+            with Image.open(media_root / avatars.thumbnail_name(name, size)) as thumb:
+                assert thumb.size == (size, size)
+        user.refresh_from_db()
+        assert user.avatar_file.name == name
+        assert user.avatar is None
+
+    def test_same_image_as_base64_reuses_file(self, api_client, media_root):
+        data = png_bytes()
+        first, second = UserFactory(), UserFactory()
+        api_client.force_authenticate(user=first)
+        url_a = api_client.put(
+            reverse('avatar'), {'avatar': SimpleUploadedFile('a.png', data, 'image/png')}, format='multipart'
+        ).data['avatar']
+
+        api_client.force_authenticate(user=second)
+        payload = {'avatar': "data:image/png;base64," + base64.b64encode(data).decode()}
+        url_b = api_client.put(reverse('avatar'), payload, format='json').data['avatar']
+
+        assert url_a == url_b
+        assert len([f for f in media_root.rglob('*') if f.is_file()]) == 1 + len(avatars.THUMBNAIL_SIZES)
+
+    def test_invalid_image_rejected(self, api_client):
+        api_client.force_authenticate(user=UserFactory())
+        response = api_client.put(
+            reverse('avatar'), {'avatar': SimpleUploadedFile('a.png', b'not an image', 'image/png')},
+            format='multipart'
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_failed_validation_writes_no_files(self, api_client, media_root):
+        """Ảnh hợp lệ nhưng field khác lỗi: không có file nào được ghi vào storage"""
+        from accounts.models import Role
+
+        role, _ = Role.objects.get_or_create(name="Patient")
+        payload = {
+            "username": "avatar_user", "email": "avatar@test.com", "role": role.id,
+            "password": "Str0ng-Passw0rd!", "password_confirm": "khac-nhau",
+            "avatar": "data:image/png;base64," + base64.b64encode(png_bytes()).decode(),
+        }
+
+        response = api_client.post(reverse('signup'), payload, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not [f for f in media_root.rglob('*') if f.is_file()]
+
+    def test_delete_clears_avatar(self, api_client):
+        user = UserFactory(avatar_file="avatars/ab/ab.png")
+        api_client.force_authenticate(user=user)
+        assert api_client.delete(reverse('avatar')).status_code == status.HTTP_204_NO_CONTENT
+        user.refresh_from_db()
+        assert not user.avatar_file
+
+    def test_profile_upload_and_removal_clear_legacy_inline_avatar(self, api_client):
+        """Đổi / gỡ ảnh qua hồ sơ bệnh nhân xoá base64 cũ: migrate_avatars không ghi đè lại"""
+        legacy = base64.b64encode(png_bytes(color=(0, 0, 255))).decode()
+        patient = PatientFactory(user__avatar=legacy)
+        api_client.force_authenticate(user=patient.user)
+        url = reverse('patient-me')
+        new_avatar = "data:image/png;base64," + base64.b64encode(png_bytes()).decode()
+
+        response = api_client.patch(url, {'user': {'avatar': new_avatar}}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        user = User.objects.get(pk=patient.user.pk)
+        assert user.avatar is None
+        uploaded = user.avatar_file.name
+
+        call_command('migrate_avatars', workers=0, stdout=StringIO())
+        assert User.objects.get(pk=user.pk).avatar_file.name == uploaded
+
+        User.objects.filter(pk=user.pk).update(avatar=legacy)
+        response = api_client.patch(url, {'user': {'avatar': None}}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        call_command('migrate_avatars', workers=0, stdout=StringIO())
+        user = User.objects.get(pk=user.pk)
+        assert not user.avatar_file
+        assert user.avatar is None
+
+    def test_legacy_avatar_is_returned_until_migrated(self, api_client, django_assert_num_queries):
+        """Chưa có avatar_file: trả về giá trị User.avatar cũ (URL ngoài / base64) như trước"""
+        doctor = DoctorFactory(user__avatar="https://cdn.example.com/a.png")
+        api_client.force_authenticate(user=PatientFactory().user)
+
+        [row] = api_client.get(reverse('doctor-list')).json()
+        assert row['user']['avatar'] == "https://cdn.example.com/a.png"
+        assert row['user']['avatar_thumbnails'] is None
+
+        # ?fields= thu hẹp cột bằng only(): cột avatar cũ được đọc cùng truy vấn, không nạp trễ
+        url = reverse('doctor-detail', kwargs={'pk': doctor.pk})
+        with django_assert_num_queries(1):
+            response = api_client.get(url, {'fields': 'id,user.avatar'})
+        assert response.json()['user']['avatar'] == "https://cdn.example.com/a.png"
+
+    def test_doctor_list_serializes_urls_only(self, api_client):
+        doctor = DoctorFactory()
+        doctor.user.avatar_file = avatars.store(png_bytes())
+        doctor.user.save()
+        api_client.force_authenticate(user=PatientFactory().user)
+
+        [row] = api_client.get(reverse('doctor-list')).json()
+        assert row['user']['avatar'].startswith("http://testserver/media/avatars/")
+        assert row['user']['avatar_thumbnails']['64'].endswith("_64.webp")
+
+
+@pytest.mark.django_db
+class TestMigrateAvatarsCommand:
+
+    @pytest.mark.parametrize('workers', [0, 2])
+    def test_converts_inline_base64_in_batches(self, media_root, workers):
+        data = png_bytes()
+        encoded = base64.b64encode(data).decode()
+        data_uri = UserFactory(avatar="data:image/png;base64," + encoded)
+        raw = UserFactory(avatar=encoded)
+        external = UserFactory(avatar="https://cdn.example.com/a.png")
+        broken = UserFactory(avatar=base64.b64encode(b"garbage").decode())
+
+        out = StringIO()
+        call_command('migrate_avatars', batch_size=2, workers=workers, stdout=out)
+
+        name = avatars.file_name(avatars.process(data)[0], 'png')
+        for user in (data_uri, raw):
+            user.refresh_from_db()
+            assert user.avatar_file.name == name
+            assert user.avatar is None
+        assert User.objects.get(pk=external.pk).avatar == "https://cdn.example.com/a.png"
+        assert User.objects.get(pk=broken.pk).avatar is not None
+        assert os.path.exists(media_root / avatars.thumbnail_name(name, 128))
+        assert "chuyển 2" in out.getvalue()
+
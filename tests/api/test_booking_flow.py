@@ -121,4 +121,131 @@ class TestBookingFlow:
 
         # Kỳ vọng: Lỗi 400 (Bác sĩ không có lịch)
         assert response.status_code == status.HTTP_400_BAD_REQUEST
-        assert "không có lịch làm việc" in str(response.data)
\ No newline at end of file
+        assert "không có lịch làm việc" in str(response.data)
+
+    def test_constraint_violation_returns_400_not_500(self, api_client):
+        """
+        Trùng slot không được kiểm tra trước bằng truy vấn: constraint trong DB
+        chặn lại và API trả về 400 thay vì 500.
+        """
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(17, 0)
+        )
+        Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=tomorrow, time=time(9, 0), status='confirmed'
+        )
+
+        api_client.force_authenticate(user=PatientFactory().user)
+        payload = {
+            "doctor_id": doctor.id,
+            "date": tomorrow.isoformat(),
+            "time": "09:00"
+        }
+        response = api_client.post(reverse('appointment-list'), payload)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['non_field_errors'][0].code == 'unique'
+        assert Appointment.objects.filter(doctor=doctor, date=tomorrow).count() == 1
+
+    def test_reschedule_same_day_when_day_is_full(self, api_client):
+        """Ngày đã đủ max_patients vẫn cho đổi giờ trong chính ngày đó"""
+        patient = PatientFactory()
+        doctor = DoctorFactory()
+        day = date.today() + timedelta(days=2)
+        Schedule.objects.create(
+            doctor=doctor, date=day,
+            start_time=time(8, 0), end_time=time(17, 0), max_patients=1
+        )
+        appointment = Appointment.objects.create(
+            doctor=doctor, patient=patient,
+            date=day, time=time(9, 0), status='pending'
+        )
+
+        api_client.force_authenticate(user=patient.user)
+        url = reverse('appointment-reschedule-appointment', kwargs={'pk': appointment.id})
+        response = api_client.patch(url, {"date": day.isoformat(), "time": "10:00"})
+
+        assert response.status_code == status.HTTP_200_OK
+        appointment.refresh_from_db()
+        assert appointment.time == time(10, 0)
+
+    def test_booked_count_follows_book_and_cancel(self, api_client):
+        """booked_count tăng khi đặt, giảm khi hủy"""
+        doctor = DoctorFactory()
+        patient = PatientFactory()
+        day = date.today() + timedelta(days=2)
+        schedule = Schedule.objects.create(
+            doctor=doctor, date=day,
+            start_time=time(8, 0), end_time=time(17, 0), max_patients=5
+        )
+
+        api_client.force_authenticate(user=patient.user)
+        response = api_client.post(reverse('appointment-list'), {
+            "doctor_id": doctor.id, "date": day.isoformat(), "time": "09:00"
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+        schedule.refresh_from_db()
+        assert schedule.booked_count == 1
+
+        url = reverse('appointment-cancel-appointment', kwargs={'pk': response.data['id']})
+        assert api_client.patch(url).status_code == status.HTTP_200_OK
+        schedule.refresh_from_db()
+        assert schedule.booked_count == 0
+
+    def test_cannot_book_when_capacity_reached(self, api_client):
+        doctor = DoctorFactory()
+        day = date.today() + timedelta(days=2)
+        Schedule.objects.create(
+            doctor=doctor, date=day,
+            start_time=time(8, 0), end_time=time(17, 0),
+            max_patients=2, booked_count=2
+        )
+
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.post(reverse('appointment-list'), {
+            "doctor_id": doctor.id, "date": day.isoformat(), "time": "09:00"
+        })
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "tối đa" in str(response.data)
+
+    def test_patch_update_moves_booked_count_and_checks_schedule(self, api_client):
+        """PATCH lịch hẹn đi qua booking.book: kiểm tra Schedule và chuyển booked_count sang ngày mới"""
+        doctor = DoctorFactory()
+        patient = PatientFactory()
+        day = date.today() + timedelta(days=2)
+        next_day = day + timedelta(days=1)
+        old_schedule = Schedule.objects.create(
+            doctor=doctor, date=day, start_time=time(8, 0), end_time=time(17, 0)
+        )
+        new_schedule = Schedule.objects.create(
+            doctor=doctor, date=next_day, start_time=time(8, 0), end_time=time(12, 0)
+        )
+        appointment = Appointment.objects.create(
+            doctor=doctor, patient=patient, date=day, time=time(9, 0), status='pending'
+        )
+        api_client.force_authenticate(user=patient.user)
+        url = reverse('appointment-detail', kwargs={'pk': appointment.id})
+
+        # Chỉ gửi time: giữ date cũ, không lỗi 500
+        response = api_client.patch(url, {"time": "10:00"})
+        assert response.status_code == status.HTTP_200_OK
+
+        # Ngoài giờ làm việc của ngày mới
+        response = api_client.patch(url, {"date": next_day.isoformat(), "time": "15:00"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # Ngày không có Schedule
+        response = api_client.patch(url, {"date": (next_day + timedelta(days=1)).isoformat()})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "không có lịch làm việc" in str(response.data)
+
+        response = api_client.patch(url, {"date": next_day.isoformat()})
+        assert response.status_code == status.HTTP_200_OK
+        old_schedule.refresh_from_db()
+        new_schedule.refresh_from_db()
+        assert (old_schedule.booked_count, new_schedule.booked_count) == (0, 1)
@@ -0,0 +1,89 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from appointments.models import Appointment
+from availability.models import Schedule
+from notifications.models import NotificationOutbox
+from records.models import AppointmentRecord
+
+@pytest.mark.django_db
+class TestBulkAppointmentActions:
+
+    @pytest.fixture
+    def day(self):
+        return date.today() + timedelta(days=1)
+
+    @pytest.fixture
+    def doctor(self, day):
+        doctor = DoctorFactory()
+        Schedule.objects.create(doctor=doctor, date=day, start_time=time(8, 0), end_time=time(17, 0))
+        return doctor
+
+    def _create(self, doctor, day, hour, status_value='pending'):
+        return Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(), date=day, time=time(hour, 0), status=status_value
+        )
+
+    def test_confirm_by_ids_reports_per_id_outcome(self, api_client, doctor, day, django_assert_max_num_queries):
+        pending = [self._create(doctor, day, hour) for hour in (8, 9, 10)]
+        canceled = self._create(doctor, day, 11, 'canceled')
+        other = self._create(DoctorFactory(), day, 8)
+        ids = [a.id for a in pending] + [canceled.id, other.id]
+
+        api_client.force_authenticate(user=doctor.user)
+        # Số truy vấn không phụ thuộc số lịch hẹn
+        with django_assert_max_num_queries(8):
+            response = api_client.post(reverse('appointment-bulk-action'), {"action": "confirm", "ids": ids}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['applied'] == 3
+        outcomes = {item['id']: item['outcome'] for item in response.data['results']}
+        assert [item['id'] for item in response.data['results']] == ids
+        assert outcomes == {
+            **{a.id: 'applied' for a in pending},
+            canceled.id: 'skipped',
+            other.id: 'not_found',
+        }
+        assert Appointment.objects.filter(id__in=[a.id for a in pending], status='confirmed').count() == 3
+        other.refresh_from_db()
+        assert other.status == 'pending'
+        assert NotificationOutbox.objects.filter(type='appointment_confirmed').count() == 3
+
+    def test_cancel_by_date_selector_releases_capacity(self, api_client, doctor, day):
+        for hour in (8, 9):
+            self._create(doctor, day, hour)
+        self._create(doctor, day, 10, 'confirmed')
+        assert Schedule.objects.get(doctor=doctor, date=day).booked_count == 3
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.post(reverse('appointment-bulk-action'), {
+            "action": "cancel", "date": day.isoformat(), "status": "pending"
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['applied'] == 2
+        assert Schedule.objects.get(doctor=doctor, date=day).booked_count == 1
+
+    def test_complete_creates_records(self, api_client, doctor, day):
+        appointments = [self._create(doctor, day, hour, 'confirmed') for hour in (8, 9)]
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.post(reverse('appointment-bulk-action'), {
+            "action": "complete", "ids": [a.id for a in appointments]
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert AppointmentRecord.objects.filter(appointment__in=appointments).count() == 2
+
+    def test_only_doctors_and_valid_selectors(self, api_client, doctor, day):
+        url = reverse('appointment-bulk-action')
+        api_client.force_authenticate(user=PatientFactory().user)
+        assert api_client.post(url, {"action": "confirm", "ids": [1]}, format='json').status_code == status.HTTP_403_FORBIDDEN
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.post(url, {"action": "confirm", "ids": [1], "date": day.isoformat()}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.post(url, {"action": "delete", "ids": [1]}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -3,7 +3,11 @@ from django.urls import reverse
 from rest_framework import status
 from datetime import date, time, timedelta
 from tests.factories.user_factory import DoctorFactory, PatientFactory
+from rest_framework.exceptions import ValidationError
+from appointments import transitions
 from appointments.models import Appointment
+from availability.models import Schedule
+from notifications.models import NotificationOutbox
 
 @pytest.mark.django_db
 class TestDoctorAppointmentActions:
@@ -122,4 +126,58 @@ class TestDoctorAppointmentActions:
         response = api_client.patch(url)
         
         # Kỳ vọng: 403 Forbidden (Permission Denied)
-        assert response.status_code == status.HTTP_403_FORBIDDEN
\ No newline at end of file
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.django_db
+class TestConditionalTransitions:
+
+    def test_stale_instance_cannot_transition(self):
+        """Hai thao tác đồng thời: instance đã cũ thì UPDATE có điều kiện không khớp dòng nào"""
+        appointment = Appointment.objects.create(
+            doctor=DoctorFactory(), patient=PatientFactory(),
+            date=date.today() + timedelta(days=1), time=time(9, 0), status='pending'
+        )
+        stale = Appointment.objects.get(pk=appointment.pk)
+        transitions.apply(appointment, "confirmed", transitions.CONFIRMABLE, "{status}")
+        transitions.apply(appointment, "completed", transitions.COMPLETABLE, "{status}")
+
+        with pytest.raises(ValidationError):
+            transitions.apply(stale, "confirmed", transitions.CONFIRMABLE, "Không thể xác nhận lịch {status}.")
+        assert stale.status == 'completed'
+        appointment.refresh_from_db()
+        assert appointment.status == 'completed'
+
+    def test_cancel_releases_booked_count(self):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        schedule = Schedule.objects.create(
+            doctor=doctor, date=tomorrow, start_time=time(8, 0), end_time=time(17, 0)
+        )
+        appointment = Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=tomorrow, time=time(9, 0), status='confirmed'
+        )
+        schedule.refresh_from_db()
+        assert schedule.booked_count == 1
+
+        transitions.apply(appointment, "canceled", transitions.CANCELABLE, "{status}")
+        schedule.refresh_from_db()
+        assert schedule.booked_count == 0
+
+    def test_confirm_does_not_overwrite_other_columns(self, api_client):
+        """Chỉ ghi status/updated_at: cột do request khác vừa sửa không bị ghi đè"""
+        doctor = DoctorFactory()
+        appointment = Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=date.today() + timedelta(days=1), time=time(9, 0), status='pending', notes="giữ nguyên"
+        )
+        Appointment.objects.filter(pk=appointment.pk).update(notes="đổi bởi request khác")
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.patch(reverse('appointment-confirm-appointment', kwargs={'pk': appointment.id}))
+
+        assert response.status_code == status.HTTP_200_OK
+        appointment.refresh_from_db()
+        assert appointment.status == 'confirmed'
+        assert appointment.notes == "đổi bởi request khác"
+        assert NotificationOutbox.objects.filter(user=appointment.patient.user, type="appointment_confirmed").count() == 1
@@ -1,8 +1,13 @@
 import pytest
+from datetime import date, datetime, time, timedelta
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from tests.factories.user_factory import DoctorFactory, PatientFactory
+from tests.factories.appointment_factory import ScheduleFactory
 from specialities.models import Speciality
+from appointments import next_available
+from doctor.models import Doctor
 
 @pytest.mark.django_db
 class TestDoctorSearchAndFilter:
@@ -25,7 +30,7 @@ class TestDoctorSearchAndFilter:
         
         assert response.status_code == status.HTTP_200_OK
         # Kiểm tra bác sĩ hợp lệ có trong danh sách
-        doctor_ids = [d['id'] for d in response.data]
+        doctor_ids = [d['id'] for d in response.json()]
         assert valid_doctor.id in doctor_ids
 
     def test_list_excludes_unverified_doctors(self, api_client):
@@ -44,7 +49,7 @@ class TestDoctorSearchAndFilter:
         response = api_client.get(reverse('doctor-list'))
         
         # 3. Verify: ID của họ không được phép có trong response
-        doctor_ids = [d['id'] for d in response.data]
+        doctor_ids = [d['id'] for d in response.json()]
         assert pending_doctor.id not in doctor_ids
         assert rejected_doctor.id not in doctor_ids
 
@@ -63,7 +68,7 @@ class TestDoctorSearchAndFilter:
         response = api_client.get(reverse('doctor-list'))
         
         # 3. Verify
-        doctor_ids = [d['id'] for d in response.data]
+        doctor_ids = [d['id'] for d in response.json()]
         assert busy_doctor.id not in doctor_ids
 
     def test_filter_doctor_by_non_existent_speciality(self, api_client):
@@ -81,7 +86,238 @@ class TestDoctorSearchAndFilter:
         assert response.status_code == status.HTTP_200_OK
         
         # FIX: Sửa logic check ID
-        if len(response.data) > 0:
+        if len(response.json()) > 0:
             # specialty trả về ID (int), không phải dict
-            specialty_ids = [d['specialty'] for d in response.data if d['specialty']]
-            assert spec_a.id not in specialty_ids
\ No newline at end of file
+            specialty_ids = [d['specialty'] for d in response.json() if d['specialty']]
+            assert spec_a.id not in specialty_ids
+
+@pytest.mark.django_db
+class TestDoctorFullTextSearch:
+
+    @pytest.fixture
+    def client(self, api_client):
+        api_client.force_authenticate(user=PatientFactory().user)
+        return api_client
+
+    def search(self, client, q):
+        response = client.get(reverse('doctor-list'), {'q': q})
+        assert response.status_code == status.HTTP_200_OK
+        return [d['id'] for d in response.json()]
+
+    def test_matches_speciality_without_diacritics(self, client):
+        derma = Speciality.objects.create(name="Da liễu", description="")
+        doctor = DoctorFactory(specialty=derma)
+        DoctorFactory(specialty=Speciality.objects.create(name="Nhi khoa", description=""))
+
+        assert self.search(client, "da lieu") == [doctor.id]
+        assert self.search(client, "Da Liễu") == [doctor.id]
+
+    def test_name_prefix_and_all_terms_required(self, client):
+        doctor = DoctorFactory(user__first_name="Trần", user__last_name="Đức Anh")
+        other = DoctorFactory(user__first_name="Trần", user__last_name="Bình")
+
+        assert self.search(client, "duc tra") == [doctor.id]
+        assert set(self.search(client, "tran")) == {doctor.id, other.id}
+
+    def test_name_match_ranked_above_description(self, client):
+        mentioned = DoctorFactory(description="Từng công tác cùng bác sĩ Hoàng tại bệnh viện.")
+        named = DoctorFactory(user__first_name="Hoàng", user__last_name="Minh")
+        DoctorFactory.create_batch(3)
+
+        assert self.search(client, "hoang") == [named.id, mentioned.id]
+
+    def test_index_follows_profile_changes(self, client):
+        specialty = Speciality.objects.create(name="Tim mạch", description="")
+        doctor = DoctorFactory(specialty=specialty, user__first_name="Lan")
+
+        doctor.user.first_name = "Hương"
+        doctor.user.save()
+        specialty.name = "Nội tiết"
+        specialty.save()
+
+        assert self.search(client, "lan") == []
+        assert self.search(client, "huong noi tiet") == [doctor.id]
+
+        doctor.delete()
+        assert self.search(client, "huong") == []
+
+    def test_filtered_by_specialty_and_visibility(self, client):
+        specialty = Speciality.objects.create(name="Răng hàm mặt", description="")
+        visible = DoctorFactory(specialty=specialty)
+        DoctorFactory(specialty=specialty, is_available=False)
+        DoctorFactory(specialty=specialty, verificationStatus="PENDING")
+
+        response = client.get(reverse('doctor-list'), {'q': 'rang', 'specialty': specialty.id})
+        assert [d['id'] for d in response.json()] == [visible.id]
+
+
+@pytest.mark.django_db
+class TestDoctorCatalogCache:
+
+    @pytest.fixture
+    def client(self, api_client):
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = AccessToken.for_user(PatientFactory().user)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return api_client
+
+    def test_conditional_get_returns_304_without_queries(self, client, django_assert_num_queries):
+        doctor = DoctorFactory()
+        url = reverse('doctor-list')
+
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert [d['id'] for d in response.json()] == [doctor.id]
+        etag = response['ETag']
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert [d['id'] for d in response.json()] == [doctor.id]
+
+    def test_saves_bump_catalog_version(self, client, django_capture_on_commit_callbacks):
+        doctor = DoctorFactory(description="Cũ")
+        url = reverse('doctor-list')
+        etag = client.get(url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            doctor.description = "Mới"
+            doctor.save()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.json()[0]['description'] == "Mới"
+
+        etag = response['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            doctor.user.email = "moi@example.com"
+            doctor.user.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.json()[0]['user']['email'] == "moi@example.com"
+
+    def test_last_login_update_keeps_catalog(self, client, django_capture_on_commit_callbacks):
+        doctor = DoctorFactory()
+        url = reverse('doctor-list')
+        etag = client.get(url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            doctor.user.save(update_fields=['last_login'])
+        assert callbacks == []
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_specialty_filter_cached_separately(self, client):
+        spec_a = Speciality.objects.create(name="Khoa A", description="")
+        spec_b = Speciality.objects.create(name="Khoa B", description="")
+        doctor_a = DoctorFactory(specialty=spec_a)
+        doctor_b = DoctorFactory(specialty=spec_b)
+        url = reverse('doctor-list')
+
+        response_a = client.get(url, {'specialty': spec_a.id})
+        response_b = client.get(url, {'specialty': spec_b.id})
+        assert [d['id'] for d in response_a.json()] == [doctor_a.id]
+        assert [d['id'] for d in response_b.json()] == [doctor_b.id]
+        assert response_a['ETag'] != response_b['ETag']
+        assert client.get(url, {'specialty': spec_b.id}, HTTP_IF_NONE_MATCH=response_a['ETag']).status_code == 200
+
+    def test_requires_valid_token(self, api_client):
+        response = api_client.get(reverse('doctor-list'))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestDoctorListFiltering:
+
+    @pytest.fixture
+    def client(self, api_client):
+        api_client.force_authenticate(user=PatientFactory().user)
+        return api_client
+
+    def ids(self, client, **params):
+        response = client.get(reverse('doctor-list'), params)
+        assert response.status_code == status.HTTP_200_OK
+        return [d['id'] for d in response.json()]
+
+    def test_price_range_and_ordering(self, client):
+        cheap = DoctorFactory(price=100000, experience=2)
+        middle = DoctorFactory(price=200000, experience=None)
+        expensive = DoctorFactory(price=500000, experience=10)
+
+        assert self.ids(client, price_min=150000, ordering='price') == [middle.id, expensive.id]
+        assert self.ids(client, price_max=200000, ordering='-price') == [middle.id, cheap.id]
+        assert self.ids(client, ordering='-experience') == [expensive.id, cheap.id, middle.id]
+        assert self.ids(client, experience_min=5) == [expensive.id]
+
+    def test_invalid_parameters_rejected(self, client):
+        url = reverse('doctor-list')
+        for params in ({'price_min': 'abc'}, {'ordering': 'user'}, {'available_within': 0}, {'available_within': 'x'}):
+            assert client.get(url, params).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_available_within_and_next_available_ordering(self, client):
+        tomorrow = date.today() + timedelta(days=1)
+        soon = DoctorFactory()
+        later = DoctorFactory()
+        never = DoctorFactory()
+        ScheduleFactory(doctor=soon, date=tomorrow, start_time=time(8, 0), end_time=time(12, 0))
+        ScheduleFactory(doctor=later, date=tomorrow + timedelta(days=10), start_time=time(8, 0), end_time=time(12, 0))
+        next_available.refresh([soon.id, later.id, never.id])
+
+        soon.refresh_from_db()
+        assert soon.next_available_at == timezone.make_aware(datetime.combine(tomorrow, time(8, 0)))
+        assert self.ids(client, available_within=7) == [soon.id]
+        assert self.ids(client, ordering='next_available_at') == [soon.id, later.id, never.id]
+
+    def test_booking_moves_next_available_incrementally(self, client, django_capture_on_commit_callbacks):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        ScheduleFactory(doctor=doctor, date=tomorrow, start_time=time(8, 0), end_time=time(9, 0), max_patients=1)
+        ScheduleFactory(doctor=doctor, date=tomorrow + timedelta(days=2), start_time=time(14, 0), end_time=time(15, 0))
+        next_available.refresh([doctor.id])
+
+        client.force_authenticate(user=PatientFactory().user)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(reverse('appointment-list'), {
+                "doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "08:00",
+            })
+        assert response.status_code == status.HTTP_201_CREATED
+
+        # Ngày mai đã đủ max_patients: slot sớm nhất chuyển sang ngày kia
+        doctor.refresh_from_db()
+        expected = timezone.make_aware(datetime.combine(tomorrow + timedelta(days=2), time(14, 0)))
+        assert doctor.next_available_at == expected
+
+    def test_change_after_next_available_day_skips_recompute(self, django_assert_num_queries):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        ScheduleFactory(doctor=doctor, date=tomorrow)
+        next_available.refresh([doctor.id])
+
+        with django_assert_num_queries(1):
+            assert next_available.refresh_after_change(doctor.id, {tomorrow + timedelta(days=3)}) == 0
+
+    def test_unlisted_doctor_change_keeps_catalog(self, django_capture_on_commit_callbacks):
+        """Bác sĩ không có trong danh mục (chưa xác minh): đổi next_available_at không làm mất cache danh mục"""
+        from doctor import catalog
+
+        doctor = DoctorFactory(verificationStatus="PENDING")
+        Doctor.objects.filter(pk=doctor.pk).update(next_available_at=timezone.now() + timedelta(days=1))
+        version = catalog.current_version()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert next_available.refresh([doctor.id]) == 1
+        assert catalog.current_version() == version
+
+    def test_unavailable_doctor_cleared(self, django_capture_on_commit_callbacks):
+        doctor = DoctorFactory()
+        ScheduleFactory(doctor=doctor, date=date.today() + timedelta(days=1))
+        next_available.refresh([doctor.id])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            doctor.is_available = False
+            doctor.save(update_fields=['is_available'])
+        assert Doctor.objects.get(pk=doctor.pk).next_available_at is None
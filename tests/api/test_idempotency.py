@@ -0,0 +1,99 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from availability.models import Schedule
+from appointments.models import Appointment, IdempotencyKey
+from notifications.models import NotificationOutbox
+
+@pytest.mark.django_db
+class TestIdempotencyKey:
+
+    def _book_payload(self):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(17, 0)
+        )
+        return doctor, {"doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "09:00"}
+
+    def test_retry_replays_first_response(self, api_client):
+        """Gửi lại cùng key: cùng phản hồi, không tạo thêm lịch hẹn/thông báo"""
+        doctor, payload = self._book_payload()
+        api_client.force_authenticate(user=PatientFactory().user)
+        url = reverse('appointment-list')
+
+        first = api_client.post(url, payload, HTTP_IDEMPOTENCY_KEY='abc-123')
+        second = api_client.post(url, payload, HTTP_IDEMPOTENCY_KEY='abc-123')
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.data == first.data
+        assert second['Idempotent-Replayed'] == 'true'
+        assert Appointment.objects.count() == 1
+        assert NotificationOutbox.objects.filter(user=doctor.user).count() == 1
+
+    def test_key_reused_for_other_request_is_rejected(self, api_client):
+        doctor, payload = self._book_payload()
+        patient = PatientFactory()
+        api_client.force_authenticate(user=patient.user)
+        created = api_client.post(reverse('appointment-list'), payload, HTTP_IDEMPOTENCY_KEY='k1')
+
+        url = reverse('appointment-cancel-appointment', kwargs={'pk': created.data['id']})
+        response = api_client.patch(url, HTTP_IDEMPOTENCY_KEY='k1')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Appointment.objects.get().status == 'pending'
+
+    def test_key_reused_with_other_body_is_rejected(self, api_client):
+        """Cùng key, cùng endpoint nhưng body khác: 422, không phát lại phản hồi cũ"""
+        doctor, payload = self._book_payload()
+        api_client.force_authenticate(user=PatientFactory().user)
+        url = reverse('appointment-list')
+
+        first = api_client.post(url, payload, HTTP_IDEMPOTENCY_KEY='k3')
+        assert first.status_code == status.HTTP_201_CREATED
+        response = api_client.post(url, {**payload, "time": "10:00"}, HTTP_IDEMPOTENCY_KEY='k3')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Appointment.objects.count() == 1
+
+    def test_stale_in_progress_key_can_be_reclaimed(self, api_client):
+        """Key kẹt ở trạng thái đang xử lý (tiến trình chết) được chiếm lại sau IN_PROGRESS_TIMEOUT"""
+        from appointments.idempotency import IN_PROGRESS_TIMEOUT
+
+        doctor, payload = self._book_payload()
+        patient = PatientFactory()
+        api_client.force_authenticate(user=patient.user)
+        url = reverse('appointment-list')
+        stuck = IdempotencyKey.objects.create(
+            user=patient.user, key='k4', fingerprint='x', expires_at=timezone.now() + timedelta(hours=1)
+        )
+        IdempotencyKey.objects.filter(pk=stuck.pk).update(created_at=timezone.now() - IN_PROGRESS_TIMEOUT)
+
+        response = api_client.post(url, payload, HTTP_IDEMPOTENCY_KEY='k4')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert IdempotencyKey.objects.get(key='k4').status_code == status.HTTP_201_CREATED
+
+    def test_failed_request_is_not_stored(self, api_client):
+        """Lỗi validation không chiếm key, retry sau khi sửa vẫn chạy"""
+        doctor, payload = self._book_payload()
+        api_client.force_authenticate(user=PatientFactory().user)
+        url = reverse('appointment-list')
+
+        bad = api_client.post(url, {**payload, "time": "20:00"}, HTTP_IDEMPOTENCY_KEY='k2')
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+        assert not IdempotencyKey.objects.exists()
+
+    def test_sweep_removes_expired_keys(self):
+        patient = PatientFactory()
+        IdempotencyKey.objects.create(
+            user=patient.user, key='old', fingerprint='POST /api/appointments/',
+            status_code=201, response_body={}, expires_at=timezone.now() - timedelta(hours=1)
+        )
+        call_command('sweep_idempotency_keys', stdout=StringIO())
+        assert not IdempotencyKey.objects.exists()
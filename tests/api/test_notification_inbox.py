@@ -0,0 +1,92 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from tests.factories.user_factory import PatientFactory
+from notifications import outbox
+from notifications.models import Notification
+
+@pytest.mark.django_db
+class TestUnreadCount:
+
+    def _unread(self, api_client):
+        response = api_client.get(reverse('notification-unread-count'))
+        assert response.status_code == status.HTTP_200_OK
+        return response.data['unread']
+
+    def test_counter_follows_create_read_and_mark_all(self, api_client):
+        user = PatientFactory().user
+        api_client.force_authenticate(user=user)
+        assert self._unread(api_client) == 0
+
+        first = Notification.objects.create(user=user, message="A", type="appointment_created")
+        outbox.enqueue([user], "appointment_confirmed", {"appointment": 1, "slot": "2026-10-20 09:00"})
+        outbox.enqueue([user], "appointment_canceled", {"appointment": 1, "slot": "2026-10-20 09:00"})
+        outbox.drain()
+        assert self._unread(api_client) == 3
+
+        url = reverse('notification-detail', kwargs={'pk': first.id})
+        api_client.patch(url, {"is_read": True})
+        api_client.patch(url, {"is_read": True})  # Không đổi giá trị: không trừ lần nữa
+        assert self._unread(api_client) == 2
+
+        api_client.patch(url, {"is_read": False})
+        assert self._unread(api_client) == 3
+
+        response = api_client.post(reverse('notification-mark-all-read'))
+        assert response.data['updated'] == 3
+        assert self._unread(api_client) == 0
+
+    def test_unread_count_is_single_query(self, api_client, django_assert_num_queries):
+        user = PatientFactory().user
+        Notification.objects.create(user=user, message="A", type="appointment_created")
+        api_client.force_authenticate(user=user)
+
+        with django_assert_num_queries(1):
+            assert self._unread(api_client) == 1
+
+
+@pytest.mark.django_db
+class TestInboxPagination:
+
+    def test_cursor_pages_newest_first(self, api_client):
+        user = PatientFactory().user
+        created = [
+            Notification.objects.create(user=user, message=f"#{index}", type="appointment_created")
+            for index in range(5)
+        ]
+        api_client.force_authenticate(user=user)
+
+        seen = []
+        url = reverse('notification-list') + '?page_size=2'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        assert seen == [notification.id for notification in reversed(created)]
+
+    def test_cursor_keeps_rows_sharing_a_millisecond(self, api_client):
+        """Cursor giữ micro giây: các thông báo tạo cùng mili giây (bulk_create) không bị bỏ sót"""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        user = PatientFactory().user
+        created_at = timezone.now().replace(microsecond=123456)
+        rows = Notification.objects.bulk_create([
+            Notification(user=user, message=f"#{index}", type="appointment_created") for index in range(3)
+        ])
+        for index, row in enumerate(rows):
+            Notification.objects.filter(pk=row.pk).update(created_at=created_at + timedelta(microseconds=index * 100))
+        api_client.force_authenticate(user=user)
+
+        seen = []
+        url = reverse('notification-list') + '?page_size=1'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        assert sorted(seen) == sorted(row.pk for row in rows)
+        assert len(seen) == 3
@@ -0,0 +1,63 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from availability.models import Schedule
+from notifications import outbox
+from notifications.models import Notification, NotificationOutbox
+
+@pytest.mark.django_db
+class TestNotificationOutbox:
+
+    def test_booking_writes_outbox_not_notification(self, api_client):
+        doctor = DoctorFactory()
+        patient = PatientFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(doctor=doctor, date=tomorrow, start_time=time(8, 0), end_time=time(17, 0))
+
+        api_client.force_authenticate(user=patient.user)
+        response = api_client.post(reverse('appointment-list'), {
+            "doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "09:00"
+        })
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert not Notification.objects.exists()
+        assert NotificationOutbox.objects.filter(user=doctor.user, type="appointment_created").count() == 1
+
+    def test_failed_booking_leaves_no_outbox_rows(self, api_client):
+        """Đặt lịch thất bại (không có Schedule) thì không có thông báo nào chờ phát"""
+        doctor = DoctorFactory()
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.post(reverse('appointment-list'), {
+            "doctor_id": doctor.id, "date": (date.today() + timedelta(days=1)).isoformat(), "time": "09:00"
+        })
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not NotificationOutbox.objects.exists()
+
+    def test_drain_moves_in_batches_and_coalesces_duplicates(self):
+        user_a = PatientFactory().user
+        user_b = PatientFactory().user
+        params = {"appointment": 1, "slot": "2026-10-20 09:00"}
+        outbox.enqueue([user_a, user_b, None], "appointment_confirmed", params)
+        outbox.enqueue([user_a], "appointment_confirmed", params)
+        outbox.enqueue([user_a], "appointment_canceled", params)
+
+        processed, created = outbox.drain(batch_size=2)
+
+        assert processed == 4
+        assert not NotificationOutbox.objects.exists()
+        assert Notification.objects.filter(user=user_b).count() == 1
+        assert Notification.objects.filter(user=user_a, type="appointment_canceled").count() == 1
+        assert created == Notification.objects.count()
+
+    def test_drain_command(self):
+        user = PatientFactory().user
+        outbox.enqueue([user], "appointment_created", {"appointment": 1, "slot": "2026-10-20 09:00"})
+
+        call_command('drain_notification_outbox', '--batch-size', '10')
+
+        assert Notification.objects.filter(user=user).count() == 1
+        assert not NotificationOutbox.objects.exists()
@@ -0,0 +1,66 @@
+import gzip
+import json
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from tests.factories.user_factory import PatientFactory
+from notifications.models import Notification, NotificationCounter
+
+@pytest.mark.django_db
+class TestPurgeNotifications:
+
+    @pytest.fixture
+    def user(self):
+        user = PatientFactory().user
+        old = timezone.now() - timedelta(days=120)
+        for index in range(5):
+            Notification.objects.create(user=user, message=f"Cũ {index}", type="appointment_created", is_read=True)
+        Notification.objects.create(user=user, message="Cũ chưa đọc", type="appointment_created")
+        Notification.objects.update(created_at=old)
+        Notification.objects.create(user=user, message="Mới đã đọc", type="appointment_created", is_read=True)
+        return user
+
+    def test_deletes_only_old_read_rows_in_batches(self, user):
+        out = StringIO()
+        call_command('purge_notifications', '--days', '90', '--batch-size', '2', stdout=out)
+
+        remaining = set(Notification.objects.values_list('message', flat=True))
+        assert remaining == {"Cũ chưa đọc", "Mới đã đọc"}
+        assert NotificationCounter.objects.get(user=user).unread == 1
+        output = out.getvalue()
+        assert output.count("Đã xoá") == 3
+        assert "Hoàn tất: xoá 5 thông báo" in output
+
+    def test_dry_run_and_archive(self, user, tmp_path):
+        out = StringIO()
+        call_command('purge_notifications', '--dry-run', stdout=out)
+        assert "Sẽ xoá 5" in out.getvalue()
+        assert Notification.objects.count() == 7
+
+        archive = tmp_path / "notifications.jsonl.gz"
+        call_command('purge_notifications', '--archive', str(archive), stdout=StringIO())
+
+        with gzip.open(archive, 'rt', encoding='utf-8') as handle:
+            rows = [json.loads(line) for line in handle]
+        assert sorted(row['message'] for row in rows) == [f"Cũ {index}" for index in range(5)]
+        assert {'template', 'params'} <= set(rows[0])
+        assert Notification.objects.count() == 2
+
+    def test_archive_renders_template_notifications(self, user, tmp_path):
+        old = timezone.now() - timedelta(days=120)
+        notification = Notification.objects.create(
+            user=user, type="appointment_rescheduled", template="appointment_rescheduled_patient",
+            params={"slot": "2026-10-20 09:00"}, is_read=True
+        )
+        Notification.objects.filter(id=notification.id).update(created_at=old)
+
+        archive = tmp_path / "notifications.jsonl"
+        call_command('purge_notifications', '--archive', str(archive), stdout=StringIO())
+
+        rows = {row['id']: row for row in map(json.loads, archive.read_text(encoding='utf-8').splitlines())}
+        assert rows[notification.id]['params'] == {"slot": "2026-10-20 09:00"}
+        assert rows[notification.id]['message'] == (
+            "Lịch hẹn của bạn đã được đổi sang 2026-10-20 09:00 và đang chờ xác nhận."
+        )
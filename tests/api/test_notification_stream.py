@@ -0,0 +1,86 @@
+import threading
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from tests.factories.user_factory import PatientFactory
+from notifications import views as notification_views
+from notifications.models import Notification
+from notifications.pubsub import InProcessBroker, RedisBroker
+
+def _events(response):
+    body = b''.join(response.streaming_content).decode()
+    return [
+        dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        for block in body.split('\n\n') if block.startswith('id:')
+    ]
+
+@pytest.mark.django_db
+class TestNotificationStream:
+
+    @pytest.fixture(autouse=True)
+    def short_stream(self, monkeypatch):
+        # Không chờ: trả về những gì có sẵn rồi đóng stream
+        monkeypatch.setattr(notification_views, 'STREAM_MAX_SECONDS', 0)
+
+    def test_resumes_after_last_event_id(self, api_client):
+        user = PatientFactory().user
+        first = Notification.objects.create(user=user, message="Cũ", type="appointment_created")
+        second = Notification.objects.create(user=user, message="Mới", type="appointment_confirmed")
+        Notification.objects.create(user=PatientFactory().user, message="Của người khác", type="appointment_created")
+
+        api_client.force_authenticate(user=user)
+        response = api_client.get(reverse('notification-stream'), HTTP_LAST_EVENT_ID=str(first.id))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/event-stream')
+        events = _events(response)
+        assert [int(event['id']) for event in events] == [second.id]
+        assert events[0]['event'] == 'notification'
+        assert '"Mới"' in events[0]['data']
+
+    def test_without_cursor_only_new_notifications(self, api_client):
+        user = PatientFactory().user
+        Notification.objects.create(user=user, message="Cũ", type="appointment_created")
+
+        api_client.force_authenticate(user=user)
+        response = api_client.get(reverse('notification-stream'), HTTP_ACCEPT='text/event-stream')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert _events(response) == []
+
+    def test_invalid_cursor(self, api_client):
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.get(reverse('notification-stream'), {'last_event_id': 'abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestInProcessBroker:
+
+    def test_publish_wakes_only_subscribed_user(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+
+        threading.Timer(0.05, broker.publish, args=([1],)).start()
+        assert subscription.wait(timeout=2) is True
+        assert other.wait(timeout=0.01) is False
+
+        subscription.close()
+        other.close()
+        assert not broker._subscriptions
+
+
+class TestRedisBroker:
+
+    def test_channel_message_wakes_local_subscription(self, settings):
+        # Không có Redis: publish bỏ qua lỗi kết nối, stream vẫn dựa vào polling
+        settings.NOTIFICATIONS_REDIS_URL = "redis://127.0.0.1:1/0"
+        broker = RedisBroker()
+        # InProcessBroker.subscribe: không bật thread nhận tin (cần Redis thật)
+        subscription = InProcessBroker.subscribe(broker, 1)
+        broker.publish([1])
+        assert subscription.wait(timeout=0.01) is False
+
+        broker._on_message({"type": "message", "channel": RedisBroker.CHANNEL, "data": b"1,2"})
+        assert subscription.wait(timeout=0.01) is True
+        subscription.close()
@@ -0,0 +1,53 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from appointments.models import Appointment
+from notifications import outbox, registry
+from notifications.models import Notification, NotificationOutbox
+
+@pytest.mark.django_db
+class TestNotificationTemplates:
+
+    def test_outbox_stores_code_and_params_only(self):
+        doctor = DoctorFactory()
+        appointment = Appointment.objects.create(
+            doctor=doctor, patient=PatientFactory(),
+            date=date.today() + timedelta(days=1), time=time(9, 0), status='pending'
+        )
+        outbox.enqueue([doctor.user], "appointment_created", {"appointment": appointment.id, "slot": "x"})
+
+        row = NotificationOutbox.objects.get()
+        assert row.template == "appointment_created"
+        assert row.params == {"appointment": appointment.id, "slot": "x"}
+        assert row.message == ""
+
+    def test_inbox_renders_names_at_read_time(self, api_client, django_assert_num_queries):
+        doctor = DoctorFactory(user__first_name="An", user__last_name="Nguyễn")
+        patient = PatientFactory(user__first_name="Bình", user__last_name="Trần")
+        day = date.today() + timedelta(days=1)
+        for hour in (9, 10, 11):
+            appointment = Appointment.objects.create(
+                doctor=doctor, patient=patient, date=day, time=time(hour, 0), status='pending'
+            )
+            Notification.objects.create(
+                user=patient.user, type="appointment_confirmed", template="appointment_confirmed",
+                params={"appointment": appointment.id, "slot": f"{day.isoformat()} {hour:02d}:00"},
+            )
+        Notification.objects.create(user=patient.user, type="legacy", message="Câu cũ đã lưu sẵn")
+
+        api_client.force_authenticate(user=patient.user)
+        # Trang thông báo + một truy vấn nạp tên cho mọi thông báo
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('notification-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        messages = [item['message'] for item in response.data['results']]
+        assert messages[0] == "Câu cũ đã lưu sẵn"
+        assert messages[1] == f"Lịch hẹn với bác sĩ An Nguyễn vào {day.isoformat()} 11:00 đã được xác nhận."
+
+    def test_every_template_renders_without_appointment(self):
+        for code in registry.TEMPLATES:
+            notification = Notification(template=code, params={"appointment": 0, "slot": "2026-10-20 09:00"})
+            assert "2026-10-20 09:00" in registry.render(notification)
@@ -2,7 +2,7 @@ import pytest
 from django.urls import reverse
 from rest_framework import status
 from datetime import date, time, timedelta
-from tests.factories.user_factory import DoctorFactory, PatientFactory
+from tests.factories.user_factory import UserFactory, DoctorFactory, PatientFactory
 from availability.models import Schedule
 
 @pytest.mark.django_db
@@ -126,4 +126,196 @@ class TestScheduleManagement:
         response = api_client.post(url, payload)
         
         # Mong đợi: 403 Forbidden
-        assert response.status_code == status.HTTP_403_FORBIDDEN
\ No newline at end of file
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_reconcile_booked_counts_fixes_drift(self):
+        """Lệnh reconcile_booked_counts đưa booked_count về số lịch hẹn thực tế"""
+        from io import StringIO
+        from django.core.management import call_command
+        from appointments.models import Appointment
+
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        schedule = Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(12, 0)
+        )
+        for hour, state in ((9, 'pending'), (10, 'confirmed'), (11, 'canceled')):
+            Appointment.objects.create(
+                doctor=doctor, patient=PatientFactory(),
+                date=tomorrow, time=time(hour, 0), status=state
+            )
+        # Mô phỏng lệch do ghi trực tiếp vào DB
+        Schedule.objects.filter(id=schedule.id).update(booked_count=7)
+
+        call_command('reconcile_booked_counts', '--dry-run', stdout=StringIO())
+        schedule.refresh_from_db()
+        assert schedule.booked_count == 7
+
+        call_command('reconcile_booked_counts', stdout=StringIO())
+        schedule.refresh_from_db()
+        assert schedule.booked_count == 2
+
+
+@pytest.mark.django_db
+class TestScheduleCopyRange:
+
+    @pytest.fixture
+    def source_start(self):
+        return date.today() + timedelta(days=1)
+
+    def _seed(self, doctor, source_start, offsets):
+        for offset in offsets:
+            Schedule.objects.create(
+                doctor=doctor, date=source_start + timedelta(days=offset),
+                start_time=time(8, 0), end_time=time(12, 0), max_patients=5
+            )
+
+    def test_staff_copies_many_doctors_and_weeks(self, api_client, source_start, django_assert_max_num_queries):
+        doctor_a = DoctorFactory()
+        doctor_b = DoctorFactory()
+        self._seed(doctor_a, source_start, range(7))
+        self._seed(doctor_b, source_start, [0, 2])
+        target_start = source_start + timedelta(weeks=1)
+        # Lịch đích đã tồn tại: được cập nhật, booked_count giữ nguyên
+        existing = Schedule.objects.create(
+            doctor=doctor_a, date=target_start, start_time=time(13, 0), end_time=time(17, 0), booked_count=2
+        )
+
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+        with django_assert_max_num_queries(8):
+            response = api_client.post(reverse('schedule-copy-range'), {
+                "source_start": source_start.isoformat(),
+                "target_start": target_start.isoformat(),
+                "weeks": 3,
+            }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 1
+        assert response.data['created'] == (7 + 2) * 3 - 1
+        assert response.data['skipped'] == 5 * 3
+        assert Schedule.objects.filter(doctor=doctor_b).count() == 2 * 4
+        existing.refresh_from_db()
+        assert (existing.start_time, existing.booked_count) == (time(8, 0), 2)
+
+    def test_doctor_copies_only_own_schedule(self, api_client, source_start):
+        doctor = DoctorFactory()
+        other = DoctorFactory()
+        self._seed(doctor, source_start, [0])
+        self._seed(other, source_start, [0])
+        url = reverse('schedule-copy-range')
+        payload = {
+            "source_start": source_start.isoformat(),
+            "target_start": (source_start + timedelta(weeks=1)).isoformat(),
+            "weeks": 2,
+        }
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.post(url, {**payload, "doctor_ids": [other.id]}, format='json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        response = api_client.post(url, payload, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 2
+        assert Schedule.objects.filter(doctor=other).count() == 1
+
+    def test_rejects_overlapping_range(self, api_client, source_start):
+        api_client.force_authenticate(user=DoctorFactory().user)
+        response = api_client.post(reverse('schedule-copy-range'), {
+            "source_start": source_start.isoformat(),
+            "target_start": (source_start + timedelta(days=3)).isoformat(),
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_copy_week_uses_bulk_upsert(self, api_client, source_start, django_assert_max_num_queries):
+        doctor = DoctorFactory()
+        self._seed(doctor, source_start, range(7))
+        api_client.force_authenticate(user=doctor.user)
+
+        with django_assert_max_num_queries(5):
+            response = api_client.post(reverse('schedule-copy-week'), {
+                "source_start": source_start.isoformat(),
+                "target_start": (source_start + timedelta(weeks=1)).isoformat(),
+            })
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 7
+        assert response.data['skipped_without_source'] == []
+
+
+@pytest.mark.django_db
+class TestScheduleList:
+
+    @pytest.fixture
+    def schedules(self):
+        doctors = [DoctorFactory() for _ in range(3)]
+        start = date.today() + timedelta(days=1)
+        for offset in range(4):
+            for doctor in doctors:
+                Schedule.objects.create(
+                    doctor=doctor, date=start + timedelta(days=offset),
+                    start_time=time(8, 0), end_time=time(12, 0)
+                )
+        return doctors, start
+
+    def test_staff_list_query_budget(self, api_client, schedules, django_assert_max_num_queries):
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+        with django_assert_max_num_queries(2):
+            response = api_client.get(reverse('schedule-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 12
+        assert response.data['results'][0]['doctor_name'] is not None
+
+    def test_date_and_doctor_filters(self, api_client, schedules):
+        doctors, start = schedules
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+        url = reverse('schedule-list')
+
+        response = api_client.get(url, {'date': start.isoformat()})
+        assert {item['date'] for item in response.data['results']} == {start.isoformat()}
+        assert len(response.data['results']) == 3
+
+        response = api_client.get(url, {
+            'date_from': (start + timedelta(days=1)).isoformat(),
+            'date_to': (start + timedelta(days=2)).isoformat(),
+            'doctor': doctors[0].id,
+        })
+        assert [item['doctor'] for item in response.data['results']] == [doctors[0].id] * 2
+
+        assert api_client.get(url, {'date': 'ngay-mai'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cursor_pagination(self, api_client, schedules):
+        api_client.force_authenticate(user=UserFactory(is_staff=True))
+        seen = []
+        url = reverse('schedule-list') + '?page_size=5'
+        while url:
+            response = api_client.get(url)
+            seen.extend((item['date'], item['id']) for item in response.data['results'])
+            url = response.data['next']
+
+        assert len(seen) == 12
+        assert seen == sorted(seen)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestScheduleDelete:
+
+    def test_delete_clears_next_available(self, api_client):
+        """Ngoài transaction (autocommit), invalidate sau khi xoá: next_available_at được xoá theo"""
+        from appointments import next_available
+        from doctor.models import Doctor
+
+        doctor = DoctorFactory()
+        schedule = Schedule.objects.create(
+            doctor=doctor, date=date.today() + timedelta(days=1),
+            start_time=time(8, 0), end_time=time(12, 0)
+        )
+        next_available.refresh([doctor.id])
+        assert Doctor.objects.get(pk=doctor.pk).next_available_at is not None
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.delete(reverse('schedule-detail', kwargs={'pk': schedule.id}))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert Doctor.objects.get(pk=doctor.pk).next_available_at is None
@@ -0,0 +1,109 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import UserFactory, DoctorFactory, PatientFactory
+from tests.factories.appointment_factory import AppointmentFactory, ScheduleFactory
+from availability.models import ScheduleRule
+
+@pytest.mark.django_db
+class TestScheduleCapacity:
+
+    @pytest.fixture
+    def staff(self, api_client):
+        staff = UserFactory(is_staff=True)
+        api_client.force_authenticate(user=staff)
+        return staff
+
+    def test_grid_counts_statuses_per_doctor_and_day(self, api_client, staff):
+        tomorrow = date.today() + timedelta(days=1)
+        doctor = DoctorFactory()
+        ScheduleFactory(doctor=doctor, date=tomorrow, max_patients=4)
+        for hour, appointment_status in ((8, 'pending'), (9, 'confirmed'), (10, 'canceled'), (11, 'completed')):
+            AppointmentFactory(doctor=doctor, date=tomorrow, time=time(hour, 0), status=appointment_status)
+        # Lịch hẹn của ngày khác không được tính vào ô của ngày mai
+        AppointmentFactory(doctor=doctor, date=tomorrow + timedelta(days=1), time=time(8, 0))
+
+        response = api_client.get(reverse('schedule-capacity'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['date_from'] == date.today().isoformat()
+        assert response.data['date_to'] == (date.today() + timedelta(days=13)).isoformat()
+        [row] = response.data['doctors']
+        assert row['doctor_id'] == doctor.id
+        assert row['days'] == [{
+            "date": tomorrow.isoformat(), "max_patients": 4, "booked": 2,
+            "pending": 1, "confirmed": 1, "completed": 1, "canceled": 1, "utilization": 0.5,
+        }]
+
+    def test_rule_days_and_day_off_override(self, api_client, staff):
+        doctor = DoctorFactory()
+        monday = date.today() + timedelta(days=(0 - date.today().weekday()) % 7 + 7)
+        ScheduleRule.objects.create(
+            doctor=doctor, weekday=0, start_time=time(8, 0), end_time=time(12, 0),
+            max_patients=8, valid_from=date.today()
+        )
+        ScheduleFactory(doctor=doctor, date=monday + timedelta(days=7), is_available=False)
+
+        response = api_client.get(reverse('schedule-capacity'), {
+            'date_from': monday.isoformat(), 'date_to': (monday + timedelta(days=13)).isoformat(),
+        })
+
+        [row] = response.data['doctors']
+        assert [(day['date'], day['max_patients'], day['booked']) for day in row['days']] == [
+            (monday.isoformat(), 8, 0)
+        ]
+
+    def test_single_grouped_query_regardless_of_doctor_count(self, api_client, staff):
+        tomorrow = date.today() + timedelta(days=1)
+        for _ in range(3):
+            doctor = DoctorFactory()
+            for offset in range(3):
+                ScheduleFactory(doctor=doctor, date=tomorrow + timedelta(days=offset))
+            AppointmentFactory(doctor=doctor, date=tomorrow, patient=PatientFactory())
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.get(reverse('schedule-capacity'), {'date_from': tomorrow.isoformat()})
+
+        assert len(response.data['doctors']) == 3
+        # Lịch làm việc + lịch hẹn: 1 GROUP BY; lịch lặp: 1 truy vấn
+        assert len([q for q in ctx.captured_queries if 'GROUP BY' in q['sql']]) == 1
+        assert len(ctx.captured_queries) <= 3
+
+    def test_result_is_cached_briefly(self, api_client, staff):
+        tomorrow = date.today() + timedelta(days=1)
+        doctor = DoctorFactory()
+        ScheduleFactory(doctor=doctor, date=tomorrow)
+        url = reverse('schedule-capacity')
+        api_client.get(url)
+
+        AppointmentFactory(doctor=doctor, date=tomorrow)
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.get(url)
+
+        assert response.data['doctors'][0]['days'][0]['booked'] == 0
+        assert not [q for q in ctx.captured_queries if 'availability_schedule' in q['sql']]
+
+    def test_specialty_filter_and_validation(self, api_client, staff):
+        url = reverse('schedule-capacity')
+        today = date.today()
+        assert api_client.get(url, {'date_from': 'abc'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {
+            'date_from': today.isoformat(), 'date_to': (today - timedelta(days=1)).isoformat(),
+        }).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {
+            'date_from': today.isoformat(), 'date_to': (today + timedelta(days=92)).isoformat(),
+        }).status_code == status.HTTP_400_BAD_REQUEST
+
+        ScheduleFactory(date=today + timedelta(days=1))
+        response = api_client.get(url, {'specialty': 999})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['doctors'] == []
+
+    def test_non_staff_forbidden(self, api_client):
+        doctor = DoctorFactory()
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.get(reverse('schedule-capacity'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,125 @@
+import json
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from availability.models import Schedule, ScheduleRule
+
+def next_weekday(weekday, weeks_ahead=1):
+    today = date.today()
+    return today + timedelta(days=(weekday - today.weekday()) % 7 + 7 * weeks_ahead)
+
+@pytest.mark.django_db
+class TestScheduleRules:
+
+    @pytest.fixture
+    def doctor(self):
+        doctor = DoctorFactory()
+        ScheduleRule.objects.create(
+            doctor=doctor, weekday=0, start_time=time(8, 0), end_time=time(9, 30),
+            max_patients=1, valid_from=date.today()
+        )
+        return doctor
+
+    def test_slots_resolved_from_rule_without_schedule_rows(self, api_client, doctor):
+        monday = next_weekday(0)
+        url = reverse('appointment-available-slots')
+
+        response = api_client.get(url, {'doctor_id': doctor.id, 'date': monday.isoformat()})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['slots'] == ['08:00', '08:30', '09:00']
+
+        tuesday = monday + timedelta(days=1)
+        response = api_client.get(url, {'doctor_id': doctor.id, 'date': tuesday.isoformat()})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not Schedule.objects.exists()
+
+    def test_range_expands_rules(self, api_client, doctor):
+        monday = next_weekday(0)
+        response = api_client.get(reverse('appointment-available-slots-range'), {
+            'doctor_ids': str(doctor.id),
+            'date_from': monday.isoformat(),
+            'date_to': (monday + timedelta(days=13)).isoformat(),
+        })
+        body = json.loads(b''.join(response.streaming_content))
+
+        days = body['doctors'][0]['days']
+        assert [day['date'] for day in days] == [monday.isoformat(), (monday + timedelta(days=7)).isoformat()]
+
+    def test_first_booking_materializes_schedule(self, api_client, doctor):
+        monday = next_weekday(0)
+        url = reverse('appointment-list')
+        payload = {"doctor_id": doctor.id, "date": monday.isoformat(), "time": "08:30"}
+
+        api_client.force_authenticate(user=PatientFactory().user)
+        assert api_client.post(url, payload).status_code == status.HTTP_201_CREATED
+        schedule = Schedule.objects.get(doctor=doctor, date=monday)
+        assert (schedule.start_time, schedule.max_patients, schedule.booked_count) == (time(8, 0), 1, 1)
+
+        # max_patients của rule được áp dụng cho ngày đã tạo
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.post(url, {**payload, "time": "09:00"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_day_off_override_wins_over_rule(self, api_client, doctor):
+        monday = next_weekday(0)
+        Schedule.objects.create(
+            doctor=doctor, date=monday, start_time=time(8, 0), end_time=time(9, 0), is_available=False
+        )
+
+        response = api_client.get(reverse('appointment-available-slots'), {'doctor_id': doctor.id, 'date': monday.isoformat()})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.post(reverse('appointment-list'), {
+            "doctor_id": doctor.id, "date": monday.isoformat(), "time": "08:30"
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rule_crud_rejects_overlap_and_invalidates_cache(self, api_client, doctor, django_capture_on_commit_callbacks):
+        monday = next_weekday(0)
+        slots_url = reverse('appointment-available-slots')
+        params = {'doctor_id': doctor.id, 'date': monday.isoformat()}
+        assert api_client.get(slots_url, params).data['slots'][-1] == '09:00'
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.post(reverse('schedule-rule-list'), {
+            "weekday": 0, "start_time": "13:00", "end_time": "15:00",
+            "valid_from": (date.today() + timedelta(days=30)).isoformat(),
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        rule = ScheduleRule.objects.get(doctor=doctor)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.patch(
+                reverse('schedule-rule-detail', kwargs={'pk': rule.id}), {"end_time": "10:30"}
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert api_client.get(slots_url, params).data['slots'][-1] == '10:00'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestScheduleRuleDelete:
+
+    def test_delete_rule_clears_next_available_and_cached_slots(self, api_client):
+        """Ngoài transaction (autocommit): invalidate sau khi xoá rule, ngày sinh từ rule biến mất"""
+        from appointments import next_available
+        from doctor.models import Doctor
+
+        doctor = DoctorFactory()
+        rule = ScheduleRule.objects.create(
+            doctor=doctor, weekday=0, start_time=time(8, 0), end_time=time(9, 30), valid_from=date.today()
+        )
+        next_available.refresh([doctor.id])
+        assert Doctor.objects.get(pk=doctor.pk).next_available_at is not None
+        slots_url = reverse('appointment-available-slots')
+        params = {'doctor_id': doctor.id, 'date': next_weekday(0).isoformat()}
+        assert api_client.get(slots_url, params).status_code == status.HTTP_200_OK
+
+        api_client.force_authenticate(user=doctor.user)
+        response = api_client.delete(reverse('schedule-rule-detail', kwargs={'pk': rule.id}))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert Doctor.objects.get(pk=doctor.pk).next_available_at is None
+        assert api_client.get(slots_url, params).status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,99 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from availability.models import Schedule
+from appointments.models import Appointment, SlotHold
+
+@pytest.mark.django_db
+class TestSlotHolds:
+
+    def _setup_day(self):
+        doctor = DoctorFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        Schedule.objects.create(
+            doctor=doctor, date=tomorrow,
+            start_time=time(8, 0), end_time=time(10, 0)
+        )
+        return doctor, tomorrow
+
+    def test_hold_hides_slot_and_blocks_other_patients(self, api_client):
+        doctor, tomorrow = self._setup_day()
+        holder = PatientFactory()
+        other = PatientFactory()
+        payload = {"doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "08:30"}
+
+        api_client.force_authenticate(user=holder.user)
+        response = api_client.post(reverse('slot-hold-list'), payload)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['expires_at']
+
+        slots = api_client.get(
+            reverse('appointment-available-slots'),
+            {'doctor_id': doctor.id, 'date': tomorrow.isoformat()}
+        ).data['slots']
+        assert '08:30' not in slots
+
+        api_client.force_authenticate(user=other.user)
+        response = api_client.post(reverse('slot-hold-list'), payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.post(reverse('appointment-list'), payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['non_field_errors'][0].code == 'unique'
+
+    def test_holder_booking_consumes_hold(self, api_client):
+        doctor, tomorrow = self._setup_day()
+        holder = PatientFactory()
+        payload = {"doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "08:30"}
+
+        api_client.force_authenticate(user=holder.user)
+        api_client.post(reverse('slot-hold-list'), payload)
+        response = api_client.post(reverse('appointment-list'), payload)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert not SlotHold.objects.exists()
+        assert Appointment.objects.filter(patient=holder).count() == 1
+
+    def test_expired_hold_does_not_block_and_is_swept(self, api_client):
+        doctor, tomorrow = self._setup_day()
+        SlotHold.objects.create(
+            patient=PatientFactory(), doctor=doctor, date=tomorrow, time=time(9, 0),
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.post(reverse('appointment-list'), {
+            "doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "09:00"
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+
+        SlotHold.objects.create(
+            patient=PatientFactory(), doctor=doctor, date=tomorrow, time=time(9, 30),
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        call_command('sweep_slot_holds', stdout=StringIO())
+        assert not SlotHold.objects.exists()
+
+    def test_hold_changes_do_not_recompute_next_available(self, api_client, monkeypatch,
+                                                          django_capture_on_commit_callbacks):
+        """Hold không được tính vào next_available_at: đặt / nhả hold không tính lại giá trị đó"""
+        from appointments import next_available
+
+        calls = []
+        monkeypatch.setattr(next_available, 'refresh_after_change', lambda *args, **kwargs: calls.append(args))
+        doctor, tomorrow = self._setup_day()
+        api_client.force_authenticate(user=PatientFactory().user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(reverse('slot-hold-list'), {
+                "doctor_id": doctor.id, "date": tomorrow.isoformat(), "time": "08:30"
+            })
+        assert response.status_code == status.HTTP_201_CREATED
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.delete(reverse('slot-hold-detail', kwargs={'pk': response.data['id']}))
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert calls == []
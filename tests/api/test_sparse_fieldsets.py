@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from datetime import date, time, timedelta
+from tests.factories.user_factory import DoctorFactory, PatientFactory
+from tests.factories.appointment_factory import AppointmentFactory
+from specialities.models import Speciality
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+
+    def test_doctor_fields_prune_payload_and_columns(self, api_client):
+        specialty = Speciality.objects.create(name="Da liễu", description="")
+        doctor = DoctorFactory(specialty=specialty, user__first_name="Lan", user__avatar="x" * 1000)
+        api_client.force_authenticate(user=PatientFactory().user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.get(reverse('doctor-list'), {'fields': 'id,user.first_name,specialty'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"id": doctor.id, "user": {"first_name": "Lan"}, "specialty": specialty.id}]
+        [sql] = [q['sql'] for q in ctx.captured_queries if 'doctor_doctor' in q['sql']]
+        assert 'avatar' not in sql
+        assert 'description' not in sql
+
+    def test_appointment_expand_collapses_other_relations(self, api_client):
+        patient = PatientFactory()
+        appointment = AppointmentFactory(patient=patient, date=date.today() + timedelta(days=1))
+        api_client.force_authenticate(user=patient.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.get(reverse('appointment-list'), {'expand': 'doctor.user'})
+
+        [row] = response.data['results']
+        assert row['patient'] == patient.id
+        assert row['doctor']['id'] == appointment.doctor_id
+        assert row['doctor']['specialty'] is None
+        assert set(row['doctor']['user']) == {'id', 'first_name', 'last_name', 'email', 'phone'}
+        [sql] = [q['sql'] for q in ctx.captured_queries if 'appointments_appointment' in q['sql']]
+        assert 'patients_patient' not in sql
+        assert 'specialities_speciality' not in sql
+
+    def test_appointment_fields_keep_cursor_pagination(self, api_client):
+        patient = PatientFactory()
+        tomorrow = date.today() + timedelta(days=1)
+        for hour in (8, 9, 10):
+            AppointmentFactory(patient=patient, date=tomorrow, time=time(hour, 0))
+        api_client.force_authenticate(user=patient.user)
+        url = reverse('appointment-list')
+
+        first = api_client.get(url, {'fields': 'id,time', 'expand': '', 'page_size': 2})
+        assert [set(row) for row in first.data['results']] == [{'id', 'time'}] * 2
+        second = api_client.get(first.data['next'])
+        assert [row['time'] for row in second.data['results']] == ['08:00:00']
+        assert set(second.data['results'][0]) == {'id', 'time'}
+
+    def test_retrieve_supports_fields(self, api_client):
+        appointment = AppointmentFactory()
+        api_client.force_authenticate(user=appointment.patient.user)
+
+        response = api_client.get(
+            reverse('appointment-detail', args=[appointment.id]), {'fields': 'status,doctor.user.last_name'}
+        )
+        assert response.data == {
+            "status": appointment.status,
+            "doctor": {"user": {"last_name": appointment.doctor.user.last_name}},
+        }
+
+    def test_unknown_field_rejected(self, api_client):
+        api_client.force_authenticate(user=PatientFactory().user)
+        response = api_client.get(reverse('doctor-list'), {'fields': 'id,user.password'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'user.password' in str(response.data)
@@ -2,9 +2,17 @@ import pytest
 import csv
 import os
 from pathlib import Path
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from tests.factories.user_factory import UserFactory, DoctorFactory, PatientFactory
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Xoá cache giữa các test (ID trong DB test có thể bị tái sử dụng)"""
+    cache.clear()
+    yield
+    cache.clear()
+
 @pytest.fixture
 def api_client():
     return APIClient()